@@ -0,0 +1,96 @@
+"""Compare reading audio durations from whole files with memory-mapped headers and cache.
+
+WAV files of the synthetic library have minutes of sparse samples, so reading whole files
+shows the cost of touching samples, which header reading avoids.
+
+Usage: PYTHONPATH=src python benchmarks/audio.py
+"""
+
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from synthetic import make_library
+
+from music.audio import (
+    AudioError,
+    read_audio_info,
+    read_library_audio,
+)
+from music.cache import FileCache
+from music.crawler import Crawler
+from music.directories import (
+    MusicDir,
+    RootDir,
+)
+from music.files import MusicFileType
+
+ARTISTS = 20
+ALBUMS = 10
+
+
+def measure(name: str, run: Callable[[], int]) -> None:
+    start = time.perf_counter()
+    files = run()
+    print(f"{name:28} {time.perf_counter() - start:7.3f} s  ({files} files)")
+
+
+def read_whole_files(music_dirs: list[MusicDir]) -> int:
+    """Baseline: read every file to the end, like decoding it to get its length."""
+    files = 0
+    for mdir in music_dirs:
+        for music_file in mdir.get_files(MusicFileType.AUDIO):
+            with open(music_file.path, "rb") as f:
+                while f.read(1024 * 1024):
+                    pass
+            files += 1
+    return files
+
+
+def read_headers(music_dirs: list[MusicDir]) -> int:
+    files = 0
+    for mdir in music_dirs:
+        for music_file in mdir.get_files(MusicFileType.AUDIO):
+            try:
+                read_audio_info(music_file.path)
+                files += 1
+            except AudioError:
+                pass
+    return files
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = make_library(Path(tmp) / "library", ARTISTS, ALBUMS, audio=True)
+        root_dir = RootDir(name="Synthetic", path=root)
+        music_dirs = list(Crawler(root_dir).crawl())
+        size = sum(mdir.summary.size for mdir in music_dirs)
+        print(f"{len(music_dirs)} music dirs, {size / 1024**3:.1f} GB of audio (sparse)")
+
+        measure("whole files", lambda: read_whole_files(music_dirs))
+        measure("mmap headers", lambda: read_headers(music_dirs))
+
+        for workers in (1, 8):
+            measure(
+                f"library, {workers} workers",
+                lambda: sum(len(r.infos) for r in read_library_audio(music_dirs, None, workers)),
+            )
+
+        cache = FileCache(Path(tmp) / "cache.db", "audio")
+        measure(
+            "library, cold cache",
+            lambda: sum(len(r.infos) for r in read_library_audio(music_dirs, cache)),
+        )
+        cache.close()
+
+        cache = FileCache(Path(tmp) / "cache.db", "audio")
+        measure(
+            "library, warm cache",
+            lambda: sum(len(r.infos) for r in read_library_audio(music_dirs, cache)),
+        )
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Compare sequential and concurrent bulk tagging on a filesystem with I/O latency.
+
+Every tag file read and write is slowed down with a sleep to stand in for network storage.
+
+Usage: PYTHONPATH=src python benchmarks/bulk.py
+"""
+
+import builtins
+import itertools
+import tempfile
+import time
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    TypeVar,
+)
+
+from synthetic import make_library
+
+import music.tags
+from music.bulk import (
+    bulk_edit_tags,
+    parse_edits,
+)
+from music.crawler import Crawler
+from music.directories import RootDir
+from music.storage import TextFileStorage
+from music.tags import Tag
+
+LATENCY = 0.002
+TAG_OPTIONS = {
+    "state": Tag(name="state", values=["riff", "full"]),
+    "mood": Tag(name="mood", values=["epic", "sad"], multiselect=True),
+}
+
+R = TypeVar("R")
+
+
+def slowed(func: Callable[..., R]) -> Callable[..., R]:
+    def wrapper(*args: Any, **kwargs: Any) -> R:
+        time.sleep(LATENCY)
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = make_library(Path(tmp) / "root", artists=20, albums=20)
+        music_dirs = list(Crawler(RootDir(name="root", path=root)).crawl())
+
+        # Only tag files are read with `open` of `music.tags` module. They are written with
+        # `atomic_write`, which doesn't use `open`, so it's slowed down as a whole
+        setattr(music.tags, "open", slowed(builtins.open))
+        setattr(music.tags, "atomic_write", slowed(music.tags.atomic_write))
+
+        # Edits alternate, so every run changes every file
+        edit_sets = itertools.cycle(
+            [
+                parse_edits(["state=full", "mood+=epic"], TAG_OPTIONS),
+                parse_edits(["state=riff", "mood-=epic"], TAG_OPTIONS),
+            ]
+        )
+
+        storage = TextFileStorage(TAG_OPTIONS)
+
+        def run(workers: int) -> float:
+            edits = next(edit_sets)
+            start = time.perf_counter()
+            results = list(bulk_edit_tags(music_dirs, edits, TAG_OPTIONS, storage, workers))
+            assert all(result.changed for result in results)
+            return time.perf_counter() - start
+
+        # Files are created by first run, so next runs read and write them
+        run(1)
+        sequential = run(1)
+        print(f"latency: {LATENCY * 1000:.0f} ms per read or write, music dirs: {len(music_dirs)}")
+        print(f"workers  1: {sequential * 1000:.0f} ms")
+
+        for workers in (4, 8, 16):
+            elapsed = run(workers)
+            print(f"workers {workers:2}: {elapsed * 1000:.0f} ms ({sequential / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
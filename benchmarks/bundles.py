@@ -0,0 +1,54 @@
+"""Time inspecting Logic X bundles of a synthetic library, on threads and with cache.
+
+Warm cache only checks signatures of bundles, a few `stat` calls instead of a walk.
+
+Usage: PYTHONPATH=src python benchmarks/bundles.py
+"""
+
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from synthetic import make_library
+
+from music.bundles import (
+    BUNDLE_CACHE,
+    read_library_bundles,
+)
+from music.cache import FileCache
+from music.crawler import Crawler
+from music.directories import RootDir
+
+ARTISTS = 50
+ALBUMS = 20
+
+
+def measure(name: str, run: Callable[[], int]) -> None:
+    start = time.perf_counter()
+    bundles = run()
+    print(f"{name:24} {time.perf_counter() - start:7.3f} s  ({bundles} bundles)")
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = make_library(Path(tmp) / "library", ARTISTS, ALBUMS, audio=True)
+        music_dirs = list(Crawler(RootDir(name="Synthetic", path=root)).crawl())
+
+        for workers in (1, 8):
+            measure(
+                f"{workers} workers",
+                lambda: sum(len(r.infos) for r in read_library_bundles(music_dirs, None, workers)),
+            )
+
+        for name in ("cold cache", "warm cache"):
+            cache = FileCache(Path(tmp) / "cache.db", BUNDLE_CACHE)
+            measure(
+                name,
+                lambda: sum(len(r.infos) for r in read_library_bundles(music_dirs, cache, 8)),
+            )
+            cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Compare `os.scandir` crawler with the previous pathlib crawler.
+
+Usage: PYTHONPATH=src python benchmarks/crawl.py
+"""
+
+import tempfile
+import time
+from pathlib import Path
+from typing import (
+    Callable,
+    Iterator,
+)
+
+from synthetic import make_library
+
+from music.crawler import Crawler
+from music.directories import RootDir
+from music.files import (
+    IGNORED_FILES,
+    LOGICX_EXT,
+)
+
+
+def pathlib_find_music_dir(path: Path) -> Iterator[Path]:
+    """Previous implementation of `MusicClient.find_music_dir`."""
+    items = list(path.iterdir())
+    files = [f for f in items if f.name not in IGNORED_FILES and f.is_file()]
+    dirs = [d for d in items if not d.name.endswith(LOGICX_EXT) and d.is_dir()]
+
+    if files:
+        yield path
+    elif dirs:
+        for d in dirs:
+            yield from pathlib_find_music_dir(d)
+
+
+def pathlib_files(directory: Path) -> list[Path]:
+    """Previous implementation of `MusicDir.files`."""
+    result = []
+    for f in directory.iterdir():
+        if f.is_file() and f.name not in IGNORED_FILES:
+            result.append(f)
+        elif f.is_dir():
+            if f.name.endswith(LOGICX_EXT):
+                result.append(f)
+            else:
+                result.extend(pathlib_files(f))
+    return result
+
+
+def best_of(func: Callable[[], int], repeat: int = 5) -> tuple[float, int]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = make_library(Path(tmp), artists=50, albums=20)
+        root_dir = RootDir(name="bench", path=root)
+
+        def run_pathlib() -> int:
+            return sum(len(pathlib_files(p)) for p in pathlib_find_music_dir(root))
+
+        def run_scandir() -> int:
+            return sum(len(mdir.files) for mdir in Crawler(root_dir).crawl())
+
+        old, old_files = best_of(run_pathlib)
+        new, new_files = best_of(run_scandir)
+        assert old_files == new_files, (old_files, new_files)
+
+        print(f"files:   {new_files}")
+        print(f"pathlib: {old * 1000:.1f} ms")
+        print(f"scandir: {new * 1000:.1f} ms ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Time finding duplicate audio files by stages, in a process pool and with cached digests.
+
+Silent WAV files of the synthetic library with the same length are equal, so some of them
+are hashed completely. A copy of every tenth music directory adds duplicates across roots.
+
+Usage: PYTHONPATH=src python benchmarks/duplicates.py
+"""
+
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic import make_library
+
+from music.cache import FileCache
+from music.crawler import Crawler
+from music.directories import RootDir
+from music.duplicates import (
+    DIGEST_CACHE,
+    DuplicateFinder,
+    DuplicateReport,
+)
+from music.files import MusicFileType
+
+ARTISTS = 10
+ALBUMS = 10
+WORKERS = 4
+
+
+def measure(name: str, finder: DuplicateFinder, paths: list[str]) -> DuplicateReport:
+    start = time.perf_counter()
+    report = finder.find(paths)
+    hashed = ", ".join(f"{count} {stage}" for stage, count in report.hashed.items())
+    print(f"{name:24} {time.perf_counter() - start:7.3f} s  (hashed {hashed})")
+    return report
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = make_library(Path(tmp) / "library", ARTISTS, ALBUMS, audio=True)
+        copies = Path(tmp) / "copies"
+        for i, song in enumerate(sorted(root.glob("*/*"))):
+            if i % 10 == 0:
+                shutil.copytree(song, copies / song.name)
+
+        paths: list[str] = []
+        for root_dir in (RootDir("Synthetic", root), RootDir("Copies", copies)):
+            for mdir in Crawler(root_dir).crawl():
+                paths.extend(str(file.path) for file in mdir.get_files(MusicFileType.AUDIO))
+
+        report = measure("1 worker", DuplicateFinder(), paths)
+        measure(f"{WORKERS} workers", DuplicateFinder(workers=WORKERS), paths)
+
+        cache = FileCache(Path(tmp) / "cache.db", DIGEST_CACHE)
+        measure("cold cache", DuplicateFinder(cache, WORKERS), paths)
+        cache.close()
+
+        cache = FileCache(Path(tmp) / "cache.db", DIGEST_CACHE)
+        measure("warm cache", DuplicateFinder(cache, WORKERS), paths)
+        cache.close()
+
+        print(f"{len(paths)} files, {len(report.groups)} duplicated, {report.wasted >> 20} MB")
+
+
+if __name__ == "__main__":
+    main()
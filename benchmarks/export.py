@@ -0,0 +1,101 @@
+"""Time streaming export of a synthetic library and measure its peak memory.
+
+Streaming export writes every record as soon as its directory is crawled and its tags are
+read, so its peak memory doesn't grow with library. Materialized export, like scripts
+around `find_music_dirs`, collects all records before writing them.
+
+Usage: PYTHONPATH=src python benchmarks/export.py
+"""
+
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+from synthetic import (
+    make_library,
+    write_config,
+)
+
+from music.client import MusicClient
+from music.export import (
+    CSV_FORMAT,
+    EXPORT_FORMATS,
+    SQLITE_FORMAT,
+    CsvWriter,
+    ExportResult,
+    JsonLinesWriter,
+    RecordWriter,
+    SqliteWriter,
+    build_record,
+    get_columns,
+)
+from music.library import MusicLibrary
+
+ARTISTS = 50
+ALBUMS = 40
+
+
+def measure(name: str, run: Callable[[], int]) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    dirs = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:28} {elapsed:7.3f} s  peak {peak / 2**20:6.1f} MB  ({dirs} dirs)")
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = make_library(Path(tmp) / "library", ARTISTS, ALBUMS, tagged=0.7)
+        config = write_config(Path(tmp) / "config" / "local.toml", root)
+        output = Path(tmp) / "export"
+
+        def materialized() -> int:
+            library = MusicLibrary(MusicClient(config_path=str(config)))
+            records = [
+                build_record(mdir, library.get_tags(mdir), library.tag_options)
+                for mdir in library.client.find_music_dirs()
+            ]
+            with open(output, "w") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+            library.close()
+            os.remove(output)
+            return len(records)
+
+        def streaming(export_format: str, workers: int) -> Callable[[], int]:
+            def run() -> int:
+                library = MusicLibrary(MusicClient(config_path=str(config)))
+                columns = get_columns(library.tag_options)
+                result: ExportResult
+                if export_format == SQLITE_FORMAT:
+                    result = library.export(SqliteWriter(output, columns), workers)
+                else:
+                    with open(output, "w", newline="") as f:
+                        writer: RecordWriter
+                        if export_format == CSV_FORMAT:
+                            writer = CsvWriter(f, columns)
+                        else:
+                            writer = JsonLinesWriter(f, columns)
+                        result = library.export(writer, workers)
+
+                library.close()
+                os.remove(output)
+                return result.dirs
+
+            return run
+
+        measure("materialized jsonl", materialized)
+        for export_format in EXPORT_FORMATS:
+            for workers in (1, 8):
+                measure(f"{export_format}, {workers} workers", streaming(export_format, workers))
+
+
+if __name__ == "__main__":
+    main()
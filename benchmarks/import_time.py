@@ -0,0 +1,63 @@
+"""Guard startup time of headless commands against import regressions.
+
+Runs `python -X importtime` in a fresh interpreter, fails if the CLI pulls in
+Textual or Rich, or if imports take longer than the limit.
+
+Usage: PYTHONPATH=src python benchmarks/import_time.py
+"""
+
+import os
+import subprocess
+import sys
+
+MODULE = "music.cli"
+# Generous, imports take ~40 ms on a laptop, loading Textual alone adds ~150 ms
+LIMIT_MS = 100
+FORBIDDEN = ("textual", "rich")
+TOP = 10
+
+
+def measure(module: str) -> dict[str, int]:
+    """Cumulative import time of every imported module in microseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": "src"},
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def main() -> int:
+    times = measure(MODULE)
+    total_ms = times[MODULE] / 1000
+
+    print(f"import {MODULE}: {total_ms:.1f} ms ({len(times)} modules)")
+    for name, cumulative in sorted(times.items(), key=lambda x: -x[1])[:TOP]:
+        print(f"  {cumulative / 1000:6.1f} ms  {name}")
+
+    failed = False
+    forbidden = sorted(n for n in times if n.split(".")[0] in FORBIDDEN)
+    if forbidden:
+        print(f"FAIL: headless import pulls in {', '.join(forbidden[:5])}")
+        failed = True
+
+    if total_ms > LIMIT_MS:
+        print(f"FAIL: import takes longer than {LIMIT_MS} ms")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Compare memory used by files of music directories in the old and the compact model.
+
+Files are generated in memory, so the library can be as large as a real one without
+creating hundreds of thousands of files on disk.
+
+Usage: PYTHONPATH=src python benchmarks/memory.py
+"""
+
+import gc
+import tracemalloc
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import (
+    Callable,
+    Iterator,
+)
+
+from music.files import (
+    MusicFiles,
+    MusicFileType,
+    get_ext,
+)
+
+DIRS = 2000
+FILES_PER_DIR = 100
+EXTENSIONS = [".wav", ".wav", ".wav", ".mp3", ".png", ".gp5", ".txt", ".logicx"]
+
+
+@dataclass
+class LegacyMusicFile:
+    """`MusicFile` before it was slotted, with its own `Path` and `__dict__`."""
+
+    path: Path
+
+    @cached_property
+    def file_type(self) -> MusicFileType:
+        return MusicFileType.from_ext(get_ext(self.path.name))
+
+
+def iter_paths() -> Iterator[tuple[str, list[tuple[str, str]]]]:
+    """Music dir path and (parent, name) pairs of its files, stems are in a subdirectory."""
+    for d in range(DIRS):
+        path = f"/Music/Artist {d // 10}/Song {d} (riff, fast)"
+        files = []
+        for f in range(FILES_PER_DIR):
+            parent = path if f % 2 else f"{path}/Stems"
+            files.append((parent, f"Track {f}{EXTENSIONS[f % len(EXTENSIONS)]}"))
+        yield path, files
+
+
+def build_legacy() -> list[list[LegacyMusicFile]]:
+    result = []
+    for _, files in iter_paths():
+        music_files = [LegacyMusicFile(Path(parent, name)) for parent, name in files]
+        for music_file in music_files:
+            # Type is cached on first access, e.g. when files are counted
+            music_file.file_type
+        result.append(music_files)
+    return result
+
+
+def build_compact() -> list[MusicFiles]:
+    result = []
+    for _, files in iter_paths():
+        music_files = MusicFiles()
+        for parent, name in files:
+            music_files.append(parent, name)
+        result.append(music_files)
+    return result
+
+
+def measure(build: Callable[[], list]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> None:
+    files = DIRS * FILES_PER_DIR
+    legacy = measure(build_legacy)
+    compact = measure(build_compact)
+
+    print(f"{files} files in {DIRS} music dirs")
+    print(f"legacy:  {legacy / 2**20:7.1f} MB, {legacy / files:5.0f} B per file")
+    print(f"compact: {compact / 2**20:7.1f} MB, {compact / files:5.0f} B per file")
+    print(f"{legacy / compact:.1f}x less memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare sequential and concurrent crawl on a filesystem with I/O latency.
+
+Network and FUSE storage spend most of the time waiting for every directory listing,
+so listings are slowed down with a sleep to stand in for such filesystem.
+
+Usage: PYTHONPATH=src python benchmarks/parallel.py
+"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import (
+    Callable,
+    Iterator,
+)
+
+from synthetic import make_library
+
+from music.crawler import (
+    Crawler,
+    crawl_concurrently,
+)
+from music.directories import RootDir
+
+LATENCY = 0.002
+
+ScanDir = Callable[[str | Path], Iterator[os.DirEntry]]
+
+
+def slow_scandir(scandir: ScanDir) -> ScanDir:
+    def wrapper(path: str | Path) -> Iterator[os.DirEntry]:
+        time.sleep(LATENCY)
+        return scandir(path)
+
+    return wrapper
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        crawlers = []
+        for i in range(3):
+            root = make_library(Path(tmp) / f"root{i}", artists=10, albums=10, seed=i)
+            crawlers.append(Crawler(RootDir(name=f"root{i}", path=root)))
+
+        # Crawler calls `os.scandir` at runtime, so it is patched in the module
+        os.scandir = slow_scandir(os.scandir)  # type: ignore[assignment]
+
+        def run(workers: int) -> tuple[float, int]:
+            start = time.perf_counter()
+            if workers == 1:
+                mdirs = [mdir for crawler in crawlers for mdir in crawler.crawl()]
+            else:
+                mdirs = list(crawl_concurrently(crawlers, workers=workers))
+            return time.perf_counter() - start, len(mdirs)
+
+        sequential, count = run(1)
+        print(f"latency: {LATENCY * 1000:.0f} ms per listing, music dirs: {count}")
+        print(f"workers  1: {sequential * 1000:.0f} ms")
+
+        for workers in (4, 8, 16):
+            elapsed, result = run(workers)
+            assert result == count
+            print(f"workers {workers:2}: {elapsed * 1000:.0f} ms ({sequential / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
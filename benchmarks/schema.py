@@ -0,0 +1,115 @@
+"""Compare parsed tags and tags encoded with tag schema on 100k music directories.
+
+Tags are generated like tag files of the synthetic library. Parsed tags keep a dict of
+strings and lists per directory, encoded tags keep one row of 64-bit words per directory.
+
+Usage: PYTHONPATH=src python benchmarks/schema.py
+"""
+
+import random
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+)
+
+from synthetic import (
+    TAGS,
+    make_tag_text,
+)
+
+from music.schema import (
+    TagMatrix,
+    TagSchema,
+)
+from music.tags import (
+    TAG_FILE,
+    MusicDirTags,
+    Tag,
+)
+
+DIRS = 100_000
+# Directories with heavy type and epic mood, but not fast
+REQUIRED = [("type", "heavy"), ("mood", "epic")]
+EXCLUDED = [("speed", "fast")]
+
+
+def measure(name: str, run: Callable[[], Any]) -> Any:
+    start = time.perf_counter()
+    result = run()
+    print(f"{name:28} {(time.perf_counter() - start) * 1000:8.1f} ms")
+    return result
+
+
+def measure_memory(name: str, build: Callable[[], Any]) -> Any:
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:28} {size / 2**20:8.1f} MB")
+    return result
+
+
+def count_tags(parsed: list[MusicDirTags]) -> dict[str, Counter[str]]:
+    result: dict[str, Counter[str]] = {}
+    for tags in parsed:
+        for tag, value in tags.tags.items():
+            for v in [value] if isinstance(value, str) else value:
+                result.setdefault(tag.name, Counter())[v] += 1
+    return result
+
+
+def select_tags(parsed: list[MusicDirTags]) -> list[Path]:
+    return [
+        tags.path
+        for tags in parsed
+        if all(tags.is_selected(tag_options[name], value) for name, value in REQUIRED)
+        and not any(tags.is_selected(tag_options[name], value) for name, value in EXCLUDED)
+    ]
+
+
+tag_options = {
+    name: Tag(name=name, values=values, multiselect=multiselect)
+    for name, (values, multiselect) in TAGS.items()
+}
+
+
+def main() -> None:
+    rnd = random.Random(0)
+    texts = [(Path(f"/Music/{i}/{TAG_FILE}"), make_tag_text(rnd)) for i in range(DIRS)]
+    schema = TagSchema(tag_options)
+    print(f"{len(schema)} tag values in {schema.words} word(s)")
+
+    parsed = measure_memory(
+        "parsed tags",
+        lambda: [MusicDirTags.from_text(path, text, tag_options) for path, text in texts],
+    )
+
+    def encode() -> TagMatrix:
+        matrix = TagMatrix(schema)
+        for tags in parsed:
+            matrix.set(tags.path, schema.encode(tags))
+        return matrix
+
+    matrix = measure_memory("encoded tags with paths", encode)
+    print(f"{'encoded rows':28} {len(matrix.rows.tobytes()) / 2**20:8.1f} MB")
+
+    tag = tag_options["mood"]
+    jazz = schema.mask(("mood", "jazz"))
+    measure("parsed membership", lambda: [tags.is_selected(tag, "jazz") for tags in parsed])
+    measure("encoded membership", lambda: [bool(bits & jazz) for bits in matrix.iter_rows()])
+
+    expected = measure("parsed count", lambda: count_tags(parsed))
+    assert measure("encoded count", matrix.count) == expected
+
+    required = schema.mask(*REQUIRED)
+    excluded = schema.mask(*EXCLUDED)
+    expected = measure("parsed select", lambda: select_tags(parsed))
+    assert measure("encoded select", lambda: matrix.select(required, excluded)) == expected
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare reading tags of the whole library from tag files and from JSON lines log.
+
+Every tag file open is slowed down with a sleep to stand in for cloud-synced storage,
+the log is opened once.
+
+Usage: PYTHONPATH=src python benchmarks/storage.py
+"""
+
+import builtins
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from bulk import (
+    LATENCY,
+    TAG_OPTIONS,
+    slow_open,
+)
+from synthetic import make_library
+
+import music.storage
+import music.tags
+from music.bulk import (
+    bulk_edit_tags,
+    parse_edits,
+)
+from music.crawler import Crawler
+from music.directories import RootDir
+from music.storage import (
+    JsonLinesStorage,
+    TagStorage,
+    TextFileStorage,
+    copy_tags,
+)
+from music.tags import tag_cache
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = make_library(Path(tmp) / "root", artists=20, albums=20)
+        music_dirs = list(Crawler(RootDir(name="root", path=root)).crawl())
+        paths = [mdir.path for mdir in music_dirs]
+        log_path = Path(tmp) / "tags.jsonl"
+
+        text = TextFileStorage(TAG_OPTIONS)
+        edits = parse_edits(["state=full", "mood+=epic"], TAG_OPTIONS)
+        list(bulk_edit_tags(music_dirs, edits, TAG_OPTIONS, text))
+        copy_tags(text, JsonLinesStorage(log_path, TAG_OPTIONS), paths)
+
+        slow = slow_open(builtins.open)
+        setattr(music.tags, "open", slow)
+        setattr(music.storage, "open", slow)
+
+        def run(create: Callable[[], TagStorage]) -> float:
+            tag_cache.entries.clear()
+            start = time.perf_counter()
+            storage = create()
+            assert all(storage.read(path) for path in paths)
+            return time.perf_counter() - start
+
+        text_time = run(lambda: text)
+        log_time = run(lambda: JsonLinesStorage(log_path, TAG_OPTIONS))
+        print(f"latency: {LATENCY * 1000:.0f} ms per open, music dirs: {len(paths)}")
+        print(f"text files: {text_time * 1000:.0f} ms")
+        print(f"JSON lines: {log_time * 1000:.0f} ms ({text_time / log_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Time the main library operations on a synthetic library and flag regressions.
+
+Every case runs several times on fresh objects and its best time is compared with the
+baseline saved by `--save`. Timings depend on the machine, so baselines are kept locally
+and a case is flagged when it's slower than the baseline by more than `--threshold`.
+
+Usage:
+    PYTHONPATH=src python benchmarks/suite.py --save   # save baseline before a change
+    PYTHONPATH=src python benchmarks/suite.py          # compare with it after the change
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+)
+
+from synthetic import (
+    make_library,
+    write_config,
+)
+
+from music import (
+    MusicClient,
+    MusicLibrary,
+)
+from music.audio import read_library_audio
+from music.directories import MusicDir
+from music.files import MusicFileType
+from music.statistics import LibraryStats
+from music.tags import (
+    TAG_FILE,
+    MusicDirTags,
+    tag_cache,
+)
+
+BASELINE_FILE = Path(__file__).with_name("baseline.json")
+# Slowdown relative to baseline that is reported as regression
+THRESHOLD = 0.2
+# Smaller slowdowns are noise of fast cases, e.g. scheduling or disk cache
+MIN_SLOWDOWN = 0.005
+
+
+@dataclass
+class Case:
+    """Benchmark case, `setup` prepares fresh input that `run` takes and isn't timed."""
+
+    name: str
+    run: Callable[[Any], int]
+    setup: Callable[[], Any] = lambda: None
+
+
+def best_of(case: Case, repeat: int) -> tuple[float, int]:
+    timings = []
+    for _ in range(repeat):
+        data = case.setup()
+        start = time.perf_counter()
+        result = case.run(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def make_cases(config_path: Path) -> list[Case]:
+    def new_client() -> MusicClient:
+        # Fresh client doesn't share crawled dirs or cached settings with previous run
+        return MusicClient(str(config_path))
+
+    def crawl() -> list[MusicDir]:
+        tag_cache.entries.clear()
+        return list(new_client().find_music_dirs())
+
+    tag_options = new_client().tag_options
+    tag_files = [mdir.path / TAG_FILE for mdir in crawl() if (mdir.path / TAG_FILE).exists()]
+
+    def run_crawl(client: MusicClient) -> int:
+        return sum(1 for _ in client.find_music_dirs())
+
+    def run_files(music_dirs: list[MusicDir]) -> int:
+        return sum(len(mdir.files) for mdir in music_dirs)
+
+    def run_count(music_dirs: list[MusicDir]) -> int:
+        return sum(mdir.count_files(MusicFileType.AUDIO) for mdir in music_dirs)
+
+    def run_tags(_: None) -> int:
+        return sum(len(MusicDirTags.from_file(path, tag_options).tags) for path in tag_files)
+
+    def run_stats(music_dirs: list[MusicDir]) -> int:
+        library = MusicLibrary(new_client())
+        return LibraryStats.collect(library.iter_tags(music_dirs)).tagged
+
+    def run_audio(music_dirs: list[MusicDir]) -> int:
+        # Without cache, so every header is read
+        return sum(len(result.infos) for result in read_library_audio(music_dirs, workers=1))
+
+    return [
+        Case("crawl", run_crawl, new_client),
+        Case("files", run_files, crawl),
+        Case("count", run_count, crawl),
+        Case("tags", run_tags),
+        Case("stats", run_stats, crawl),
+        Case("audio", run_audio, crawl),
+        Case("library_screen", lambda _: asyncio.run(open_library_screen(new_client()))),
+    ]
+
+
+async def open_library_screen(client: MusicClient) -> int:
+    """Time from opening library screen until all rows are loaded and sorted."""
+    # Imported here, because other cases don't need UI
+    from textual.app import App
+
+    from app.library import LibraryScreen
+
+    library = MusicLibrary(client)
+    app: App = App()
+    async with app.run_test(size=(120, 40)) as pilot:
+        screen = LibraryScreen(library)
+        await app.push_screen(screen)
+        while not screen.loaded:
+            await pilot.pause(0.01)
+        return screen.model.total
+
+
+def load_baseline(path: Path) -> dict:
+    try:
+        baseline = json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+
+    if not isinstance(baseline, dict):
+        raise ValueError(f"Baseline {path} must be a JSON object")
+    return baseline
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--artists", type=int, default=50)
+    parser.add_argument("--albums", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", metavar="CASE", help="Run only these cases")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="Save results as baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    params = {"artists": args.artists, "albums": args.albums, "seed": args.seed, "audio": True}
+    baseline = load_baseline(args.baseline)
+    if baseline and baseline["params"] != params:
+        print(f"Baseline was saved with {baseline['params']}, it's ignored", file=sys.stderr)
+        baseline = {}
+    baseline_results = baseline.get("results", {})
+
+    results: dict[str, float] = {}
+    regressions = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = make_library(Path(tmp) / "library", **params, depth=3, tagged=0.5, ignored=True)
+        config_path = write_config(Path(tmp) / "config" / "local.toml", root)
+
+        print(f"{args.artists * args.albums} music dirs, best of {args.repeat} runs")
+        print(f"{'case':16} {'time':>10} {'baseline':>10} {'change':>8}")
+        for case in make_cases(config_path):
+            if args.only and case.name not in args.only:
+                continue
+
+            elapsed, _ = best_of(case, args.repeat)
+            results[case.name] = elapsed
+            line = f"{case.name:16} {elapsed * 1000:7.1f} ms"
+
+            if case.name in baseline_results:
+                previous = baseline_results[case.name]
+                change = elapsed / previous - 1
+                line += f" {previous * 1000:7.1f} ms {change:+7.0%}"
+                if change > args.threshold and elapsed - previous > MIN_SLOWDOWN:
+                    regressions.append(case.name)
+                    line += "  REGRESSION"
+
+            print(line)
+
+    if args.save:
+        # Cases that weren't run keep their previous baseline
+        results = {**baseline_results, **results}
+        args.baseline.write_text(json.dumps({"params": params, "results": results}, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"Slower than baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Synthetic music library used by benchmarks.
+
+Libraries are reproducible: the same arguments and seed build the same directories, files
+and tag files. Run as a script to build a library with a config for trying the app on it.
+
+Usage: PYTHONPATH=src python benchmarks/synthetic.py DIR [--artists N] [--albums N]
+"""
+
+import argparse
+import random
+import struct
+from pathlib import Path
+
+import toml
+
+AUDIO_NAMES = ["bounce.wav", "demo.mp3", "take.m4a"]
+OTHER_NAMES = ["cover.png", "tab.gp5", "notes.txt", ".DS_Store"]
+# Directory skipped by `ignored_dirs` of root dir in config written by `write_config`
+IGNORED_DIR = "Various Other Things"
+# Tags of tag files, (values, multiselect)
+TAGS = {
+    "type": (["acoustic", "heavy", "piano"], False),
+    "speed": (["slow", "normal", "fast"], False),
+    "mood": (["epic", "sad", "punk", "jazz"], True),
+    "state": (["riff", "melody", "full"], False),
+    "rating": (["dream", "cool", "bad"], False),
+}
+
+
+def make_tag_text(rnd: random.Random) -> str:
+    lines = []
+    for name, (values, multiselect) in TAGS.items():
+        if multiselect:
+            lines.append(f"{name}={','.join(rnd.sample(values, rnd.randint(1, 2)))}")
+        elif rnd.random() < 0.8:
+            lines.append(f"{name}={rnd.choice(values)}")
+
+    lines.append("--- Music Description ---")
+    lines.append(f"Take {rnd.randrange(100)}, needs a bridge")
+    return "\n".join(lines) + "\n"
+
+
+def write_wav(path: Path, seconds: int, sample_rate: int = 44100, channels: int = 2) -> None:
+    """Write WAV file with silent samples, they aren't written, so the file is sparse."""
+    block_align = channels * 2
+    data_size = seconds * sample_rate * block_align
+    fmt = struct.pack(
+        "<HHIIHH", 1, channels, sample_rate, sample_rate * block_align, block_align, 16
+    )
+    header = b"".join(
+        [
+            struct.pack("<4sI4s", b"RIFF", 36 + data_size, b"WAVE"),
+            struct.pack("<4sI", b"fmt ", len(fmt)),
+            fmt,
+            struct.pack("<4sI", b"data", data_size),
+        ]
+    )
+    with open(path, "wb") as f:
+        f.write(header)
+        f.truncate(len(header) + data_size)
+
+
+def make_library(
+    root: Path,
+    artists: int = 20,
+    albums: int = 10,
+    seed: int = 0,
+    depth: int = 1,
+    tagged: float = 0.0,
+    ignored: bool = False,
+    audio: bool = False,
+) -> Path:
+    """Build `artists * albums` music directories with files, bundles and nested dirs.
+
+    Stems are nested `depth` levels deep, `tagged` is the share of music directories with
+    tag files and `ignored` adds a directory of music dirs that crawl must skip. With
+    `audio` WAV files have valid headers and minutes of (sparse) samples.
+    """
+    rnd = random.Random(seed)
+
+    for a in range(artists):
+        for b in range(albums):
+            mdir = root / f"Artist {a}" / f"Song {a}-{b} (riff, fast)"
+            mdir.mkdir(parents=True)
+
+            for i in range(rnd.randint(1, 5)):
+                path = mdir / f"{i} {rnd.choice(AUDIO_NAMES)}"
+                if audio and path.suffix == ".wav":
+                    write_wav(path, rnd.randint(30, 300))
+                else:
+                    path.write_bytes(b"\0" * 64)
+
+            for name in rnd.sample(OTHER_NAMES, 2):
+                (mdir / name).write_bytes(b"")
+
+            bundle = mdir / f"Project {b}.logicx"
+            (bundle / "Alternatives" / "000").mkdir(parents=True)
+            (bundle / "Alternatives" / "000" / "ProjectData").write_bytes(b"\0" * 1024)
+            (bundle / "Resources").mkdir()
+            (bundle / "Resources" / "ProjectInformation.plist").write_bytes(b"")
+            if audio:
+                undo = bundle / "Alternatives" / "000" / "Undo Data"
+                undo.mkdir()
+                for i in range(20):
+                    (undo / f"{i}.nosync").write_bytes(b"\0" * 256)
+                (bundle / "Media" / "Audio Files").mkdir(parents=True)
+                write_wav(bundle / "Media" / "Audio Files" / "Take 1.wav", rnd.randint(30, 300))
+
+            stems = mdir / "Stems"
+            for level in range(1, depth):
+                stems = stems / f"Take {level}"
+            stems.mkdir(parents=True)
+            for i in range(rnd.randint(0, 3)):
+                if audio:
+                    write_wav(stems / f"stem {i}.wav", rnd.randint(30, 300), channels=1)
+                else:
+                    (stems / f"stem {i}.wav").write_bytes(b"\0" * 64)
+
+            if rnd.random() < tagged:
+                (mdir / "music_tag.txt").write_text(make_tag_text(rnd))
+
+    if ignored:
+        make_library(root / IGNORED_DIR, artists=1, albums=albums, seed=seed)
+
+    return root
+
+
+def write_config(path: Path, root: Path, **library: object) -> Path:
+    """Write app config with library at `root` and tags used in synthetic tag files."""
+    config = {
+        "library": {"index": False, "workers": 1, "watch": False, **library},
+        "root_dir": {
+            "synthetic": {"name": "Synthetic", "path": str(root), "ignored_dirs": [IGNORED_DIR]},
+        },
+        "tag": {
+            name: {"values": values, "multiselect": multiselect, "required": False}
+            for name, (values, multiselect) in TAGS.items()
+        },
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(toml.dumps(config))
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("path", type=Path, help="Directory to create, must not exist")
+    parser.add_argument("--artists", type=int, default=20)
+    parser.add_argument("--albums", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--depth", type=int, default=1, help="Nesting of stem dirs")
+    parser.add_argument("--tagged", type=float, default=0.5, help="Share of tagged dirs")
+    parser.add_argument("--audio", action="store_true", help="Write WAV files with headers")
+    args = parser.parse_args()
+
+    root = make_library(
+        args.path / "library",
+        artists=args.artists,
+        albums=args.albums,
+        seed=args.seed,
+        depth=args.depth,
+        tagged=args.tagged,
+        ignored=True,
+        audio=args.audio,
+    )
+    config = write_config(args.path / "config" / "local.toml", root)
+    print(f"Library: {root}")
+    print(f"Run app with it: cd {args.path} && python {Path(__file__).parent.parent}/src/main.py")
+    print(f"Config: {config}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Compare DataTable and virtualized LibraryTable with a library of 50k music directories.
+
+Both tables run in headless apps, rows are added in batches like LibraryScreen loads them,
+then sorted by two columns and scrolled page by page.
+
+Usage: PYTHONPATH=src python benchmarks/table.py
+"""
+
+import asyncio
+import random
+import time
+from typing import Callable
+
+from textual.app import (
+    App,
+    ComposeResult,
+)
+from textual.widget import Widget
+from textual.widgets import DataTable
+
+from app.widgets import (
+    Column,
+    LibraryTable,
+    LibraryTableModel,
+)
+
+ROWS = 50_000
+BATCH_SIZE = 200
+PAGES = 50
+COLUMNS = [
+    Column("Name", "name"),
+    Column("Audio", "audio", numeric=True),
+    Column("LogicX", "logicx", numeric=True),
+    Column("GTP", "gtp", numeric=True),
+    Column("Other", "other", numeric=True),
+    Column("Path", "path", highlight_prefix=True),
+]
+
+
+def make_rows(seed: int = 0) -> list[tuple[str, tuple]]:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(ROWS):
+        name = f"Song {rng.randrange(ROWS)}"
+        counts = tuple(rng.randrange(20) for _ in range(4))
+        rows.append((f"/Music/{i}", (name, *counts, f"Music/Artist {i // 10}")))
+    return rows
+
+
+class TableApp(App):
+    def __init__(self, table: Widget):
+        """Initialize class instance."""
+        super().__init__()
+        self.table = table
+
+    def compose(self) -> ComposeResult:
+        yield self.table
+
+
+async def measure(
+    table: Widget,
+    add: Callable[[list[tuple[str, tuple]]], None],
+    sort: Callable[[], None],
+    rows: list[tuple[str, tuple]],
+) -> tuple[float, float, float]:
+    app = TableApp(table)
+    async with app.run_test(size=(160, 50)) as pilot:
+        table.focus()
+        start = time.perf_counter()
+        for i in range(0, len(rows), BATCH_SIZE):
+            add(rows[i : i + BATCH_SIZE])
+            await pilot.pause()
+        populate = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sort()
+        await pilot.pause()
+        sort_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(PAGES):
+            await pilot.press("pagedown")
+        scroll = time.perf_counter() - start
+
+    return populate, sort_time, scroll
+
+
+async def measure_data_table(rows: list[tuple[str, tuple]]) -> tuple[float, float, float]:
+    table: DataTable = DataTable()
+
+    def add(batch: list[tuple[str, tuple]]) -> None:
+        # Columns can be added only when app is running
+        if not table.columns:
+            for column in COLUMNS:
+                table.add_column(column.label, key=column.key)
+
+        for key, row in batch:
+            table.add_row(*row, key=key)
+
+    def sort_table() -> None:
+        table.sort("audio", "name")
+
+    return await measure(table, add, sort_table, rows)
+
+
+async def measure_library_table(rows: list[tuple[str, tuple]]) -> tuple[float, float, float]:
+    model = LibraryTableModel(COLUMNS)
+    table = LibraryTable(model)
+
+    def add(batch: list[tuple[str, tuple]]) -> None:
+        for key, row in batch:
+            model.add(key, row)
+        table.refresh_rows()
+
+    def sort() -> None:
+        model.sort_by("name")
+        model.sort_by("audio")
+        table.refresh_rows()
+
+    return await measure(table, add, sort, rows)
+
+
+def main() -> None:
+    rows = make_rows()
+    data_table = asyncio.run(measure_data_table(rows))
+    library_table = asyncio.run(measure_library_table(rows))
+
+    print(f"{ROWS} rows, {PAGES} pages scrolled")
+    print("              populate     sort   scroll")
+    for name, (populate, sort, scroll) in (
+        ("DataTable", data_table),
+        ("LibraryTable", library_table),
+    ):
+        print(f"{name:12} {populate:8.2f} s {sort:6.2f} s {scroll:6.2f} s")
+    print(f"populated {data_table[0] / library_table[0]:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
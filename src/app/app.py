@@ -1,7 +1,11 @@
+from pathlib import Path
+
+from textual import work
 from textual.app import (
     App,
     ComposeResult,
 )
+from textual.binding import Binding
 from textual.containers import Container
 from textual.widgets import (
     Footer,
@@ -10,10 +14,27 @@ from textual.widgets import (
     ListItem,
     ListView,
 )
+from textual.worker import get_current_worker
 
-from music import MusicClient
+from music import (
+    MusicClient,
+    MusicDirTags,
+    MusicLibrary,
+)
+from music.profiling import (
+    PROFILE_ENV,
+    enable_from_env,
+    profiler,
+    timed,
+)
+from music.watcher import (
+    Watcher,
+    create_watcher,
+)
 
+from .duplicates import DuplicatesScreen
 from .library import LibraryScreen
+from .profiling import ProfileScreen
 from .statistics import StatsScreen
 from .tagging import TaggingScreen
 
@@ -25,12 +46,16 @@ class TaggingApp(App):
     BINDINGS = [
         ("q", "quit", "Quit"),
         ("enter", "select_item", "Select"),
+        Binding("f12", "show_profile", "Profile", show=False),
     ]
 
     def __init__(self) -> None:
         """Initialize class instance."""
         super().__init__()
+        enable_from_env()
         self.client = MusicClient()
+        self.library = MusicLibrary(self.client)
+        self.watcher: Watcher | None = None
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -39,12 +64,88 @@ class TaggingApp(App):
                 ListItem(Label("Add tags"), id="tagging"),
                 ListItem(Label("Library"), id="library"),
                 ListItem(Label("Statistics"), id="statistics"),
+                ListItem(Label("Duplicates"), id="duplicates"),
                 id="main_menu",
             ),
             id="main_container",
         )
         yield Footer()
 
+    @timed("TaggingApp.on_mount")
+    def on_mount(self) -> None:
+        self.library.writer.on_error = self.on_save_error
+
+        if self.client.settings.get("watch", False):
+            self.start_watcher()
+
+    @work(thread=True, group="watcher")
+    def start_watcher(self) -> None:
+        """Create watcher in background, because it walks every directory of library."""
+        try:
+            watcher = create_watcher(
+                paths=[root_dir.path for root_dir in self.client.root_dirs],
+                callback=self.on_paths_changed,
+                on_rescan=self.on_rescan,
+                on_error=self.on_watch_error,
+                interval=self.client.settings.get("watch_interval", 5.0),
+            )
+        except OSError as e:
+            self.on_watch_error(e)
+            return
+
+        self.watcher = watcher
+        # App could be closed while directories were walked
+        if not get_current_worker().is_cancelled:
+            watcher.start()
+
+    def on_paths_changed(self, paths: set[Path]) -> None:
+        """Called from watcher thread, only collected changes are applied on UI thread."""
+        changes = self.library.collect_changes(paths)
+        if changes:
+            self.call_from_thread(self.library.commit_changes, changes)
+
+    def on_rescan(self) -> None:
+        """Called from watcher thread when changes were lost."""
+        changes = self.library.collect_rescan()
+        if changes:
+            self.call_from_thread(self.library.commit_changes, changes)
+
+    def on_watch_error(self, error: Exception) -> None:
+        """Called from watcher thread."""
+        self.call_from_thread(
+            self.notify,
+            str(error),
+            title="Library watcher failed",
+            severity="error",
+        )
+
+    def on_unmount(self) -> None:
+        if self.watcher:
+            self.watcher.stop()
+
+        # Errors can't be shown anymore and reporting them would block exit
+        self.library.writer.on_error = None
+        self.library.close()
+
+    def on_save_error(self, tags: MusicDirTags, error: Exception) -> None:
+        """Called from tag writer thread."""
+        self.call_from_thread(
+            self.notify,
+            str(error),
+            title=f"Failed to save {tags.path.parent.name}",
+            severity="error",
+        )
+
+    def action_show_profile(self) -> None:
+        if not profiler.enabled:
+            self.notify(
+                f"Start app with {PROFILE_ENV}=1 to collect profile", title="Profiling is off"
+            )
+            return
+
+        if not isinstance(self.screen, ProfileScreen):
+            self.push_screen(ProfileScreen())
+
     def on_list_view_selected(self, event: ListView.Selected) -> None:
         self.handle_selection(event.item.id)
 
@@ -58,11 +159,13 @@ class TaggingApp(App):
     def handle_selection(self, item_id: str | None) -> None:
         # Common handler for both selection methods
         if item_id == "statistics":
-            self.push_screen(StatsScreen())
+            self.push_screen(StatsScreen(self.library))
         elif item_id == "library":
-            self.push_screen(LibraryScreen())
+            self.push_screen(LibraryScreen(self.library))
+        elif item_id == "duplicates":
+            self.push_screen(DuplicatesScreen(self.library))
         elif item_id == "tagging":
-            self.push_screen(TaggingScreen())
+            self.push_screen(TaggingScreen(self.library))
         else:
             raise ValueError("invalid id")
 
@@ -0,0 +1,66 @@
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import Vertical
+from textual.screen import ModalScreen
+from textual.widgets import (
+    Input,
+    Label,
+)
+
+from music.bulk import (
+    TagEdit,
+    TagEditError,
+    parse_edits,
+)
+from music.tags import TagOptions
+
+
+class BulkTagScreen(ModalScreen[list[TagEdit] | None]):
+    """Dialog asking for tag edits applied to selected music directories."""
+
+    CSS = """
+    BulkTagScreen {
+        align: center middle;
+    }
+
+    #bulk_dialog {
+        width: 80;
+        height: auto;
+        padding: 0 1;
+        border: round orange;
+        background: $background;
+    }
+
+    #bulk_error {
+        color: $error;
+    }
+    """
+
+    BINDINGS = [
+        Binding("escape", "cancel", "Cancel"),
+    ]
+
+    def __init__(self, tag_options: TagOptions, count: int) -> None:
+        """Initialize class instance."""
+        super().__init__()
+        self.tag_options = tag_options
+        self.count = count
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="bulk_dialog") as dialog:
+            dialog.border_title = f"Edit tags of {self.count} dirs"
+            yield Label("Edits: tag=value sets, tag+=value adds, tag-=value removes value")
+            yield Input(placeholder="e.g. state=full mood+=epic mood-=sad_like_kind", id="edits")
+            yield Label("", id="bulk_error")
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        try:
+            edits = parse_edits(event.value.split(), self.tag_options)
+        except TagEditError as e:
+            self.query_one("#bulk_error", Label).update(str(e))
+            return
+
+        self.dismiss(edits)
+
+    def action_cancel(self) -> None:
+        self.dismiss(None)
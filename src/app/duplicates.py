@@ -0,0 +1,101 @@
+from rich.table import Table
+from rich.text import Text
+from textual import work
+from textual.app import ComposeResult
+from textual.containers import VerticalScroll
+from textual.screen import Screen
+from textual.widgets import (
+    Footer,
+    Header,
+    Label,
+    Static,
+)
+from textual.worker import Worker
+
+from music import MusicLibrary
+from music.duplicates import DuplicateReport
+from music.profiling import timed
+from music.statistics import format_size
+
+
+class DuplicatesScreen(Screen):
+    """Audio files with the same content, the most wasted space first."""
+
+    BINDINGS = [
+        ("q", "quit_screen", "Back to Menu"),
+        ("r", "find_duplicates", "Find again"),
+    ]
+
+    def __init__(self, library: MusicLibrary) -> None:
+        """Initialize class instance."""
+        super().__init__()
+        self.library = library
+        self.worker: Worker | None = None
+
+    def action_quit_screen(self) -> None:
+        self.app.pop_screen()
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        yield VerticalScroll(
+            Label("Duplicates", classes="heading"),
+            Static("Looking for duplicates...", id="duplicates"),
+        )
+        yield Footer()
+
+    @timed("DuplicatesScreen.on_mount")
+    def on_mount(self) -> None:
+        self.sub_title = "Duplicates"
+        self.action_find_duplicates()
+
+    def action_find_duplicates(self) -> None:
+        if self.worker is not None and self.worker.is_running:
+            # Finding again would cancel hashing that is almost done
+            return
+
+        self.sub_title = "Duplicates (crawling library)"
+        self.worker = self.find_duplicates()
+
+    @work(thread=True, exclusive=True)
+    def find_duplicates(self) -> None:
+        # Files are hashed only if they changed since digests were cached
+        try:
+            report = self.library.find_duplicates(self.on_progress)
+        except Exception as e:
+            # E.g. hashing process was killed and pool is broken, app keeps running
+            self.app.call_from_thread(self.show_error, e)
+            return
+
+        self.app.call_from_thread(self.show_report, report)
+
+    def on_progress(self, stage: str, done: int, total: int) -> None:
+        """Called from hashing worker."""
+        self.app.call_from_thread(
+            setattr, self, "sub_title", f"Duplicates (hashing {stage}: {done} of {total} files)"
+        )
+
+    def show_error(self, error: Exception) -> None:
+        self.sub_title = "Duplicates (failed)"
+        self.query_one("#duplicates", Static).update(Text(f"Press r to find again: {error}", "red"))
+        self.notify(
+            str(error) or type(error).__name__, title="Finding duplicates failed", severity="error"
+        )
+
+    def show_report(self, report: DuplicateReport) -> None:
+        self.sub_title = (
+            f"Duplicates ({len(report.groups)} groups in {report.files} files, "
+            f"{format_size(report.wasted)} wasted)"
+        )
+
+        table = Table("Size", "Copies", "Wasted", "Paths", expand=True)
+        for group in report.groups:
+            table.add_row(
+                format_size(group.size),
+                str(len(group.paths)),
+                format_size(group.wasted),
+                "\n".join(group.paths),
+            )
+        for path, error in report.errors.items():
+            table.add_row("", "", "", Text(f"{path}: {error}", "red"))
+
+        self.query_one("#duplicates", Static).update(table)
@@ -1,49 +1,112 @@
 import subprocess
+from typing import Iterable
 
-from rich.text import Text
+from textual import work
 from textual.app import ComposeResult
+from textual.binding import Binding
 from textual.screen import Screen
 from textual.widgets import (
     Button,
-    DataTable,
     Footer,
     Header,
+    Input,
 )
+from textual.worker import get_current_worker
 
-from music import MusicClient
+from music import MusicLibrary
+from music.audio import format_duration
+from music.bulk import TagEdit
 from music.directories import (
     MusicDir,
     MusicFileType,
 )
+from music.library import LibraryChanges
+from music.profiling import timed
+from music.query import QueryError
+from music.search import (
+    SearchIndex,
+    SearchResult,
+)
+from music.statistics import format_size
+from music.tags import MusicDirTags
+
+from .bulk import BulkTagScreen
+from .widgets import (
+    Column,
+    LibraryTable,
+    LibraryTableModel,
+)
+
+# Rows are sent from loading worker to the table in batches of this size
+ROWS_BATCH_SIZE = 200
+# Progress of bulk tagging is shown after this many directories
+BULK_PROGRESS_STEP = 50
+# Failed directories listed in notification after bulk tagging
+BULK_ERRORS_SHOWN = 5
+# Value of column read after rows are shown, e.g. duration, until it's read
+UNKNOWN = -1
+
+
+def format_dir_duration(seconds: int) -> str:
+    return format_duration(seconds) if seconds != UNKNOWN else ""
+
+
+def format_projects_size(size: int) -> str:
+    return format_size(size) if size != UNKNOWN else ""
 
 
 class LibraryScreen(Screen):
     """Library screen showing a table of items."""
 
+    CSS = """
+    #query, #search {
+        border: round orange;
+        background: $background;
+    }
+    """
+
     COLUMNS = [
-        ("Name", "name"),
-        ("Audio", "audio"),
-        ("LogicX", "logicx"),
-        ("GTP", "gtp"),
-        ("Other", "other"),
-        ("Path", "path"),
+        Column("Name", "name"),
+        Column("Audio", "audio", numeric=True),
+        Column("Duration", "duration", numeric=True, format=format_dir_duration),
+        Column("LogicX", "logicx", numeric=True),
+        Column("Size", "projects", numeric=True, format=format_projects_size),
+        Column("GTP", "gtp", numeric=True),
+        Column("Other", "other", numeric=True),
+        Column("Path", "path", highlight_prefix=True),
     ]
 
     BINDINGS = [
         ("q", "quit_screen", "Back to Menu"),
         ("n", "sort_by_name", "Name"),
         ("a", "sort_by_audio", "Audio"),
+        ("d", "sort_by_duration", "Duration"),
         ("l", "sort_by_logicx", "LogicX"),
+        ("s", "sort_by_projects", "Projects size"),
         ("o", "sort_by_other", "Other"),
         ("g", "sort_by_gtp", "GTP"),
         ("f", "open_in_finder", "Open in Finder"),
+        ("t", "focus_query", "Tag query"),
+        ("slash", "focus_search", "Search"),
+        ("space", "toggle_selected", "Select"),
+        ("v", "select_all", "Select all"),
+        ("b", "bulk_tag", "Bulk tag"),
+        Binding("escape", "focus_table", "Back to table", show=False),
     ]
 
-    def __init__(self) -> None:
+    def __init__(self, library: MusicLibrary) -> None:
         """Initialize class instance."""
         super().__init__()
-        self.client = MusicClient()
-        self.current_sorts: set = set()
+        self.library = library
+        self.mdirs: dict[str, MusicDir] = {}
+        self.model = LibraryTableModel(self.COLUMNS)
+        self.loaded = False
+        self.search_index = SearchIndex()
+        # Filters of rows, rows of search are ranked and only those that match query are shown
+        self.search: SearchResult | None = None
+        self.query_keys: list[str] | None = None
+        # Music dirs whose column isn't read from files yet, by column key and row key
+        self.unread: dict[str, dict[str, MusicDir]] = {"duration": {}, "projects": {}}
 
     # Sorting actions
 
@@ -53,9 +116,15 @@ class LibraryScreen(Screen):
     def action_sort_by_audio(self) -> None:
         self._sort_column("audio")
 
+    def action_sort_by_duration(self) -> None:
+        self._sort_column("duration")
+
     def action_sort_by_logicx(self) -> None:
         self._sort_column("logicx")
 
+    def action_sort_by_projects(self) -> None:
+        self._sort_column("projects")
+
     def action_sort_by_gtp(self) -> None:
         self._sort_column("gtp")
 
@@ -63,67 +132,386 @@ class LibraryScreen(Screen):
         self._sort_column("other")
 
     def _sort_column(self, name: str) -> None:
-        dt = self.query_one(DataTable)
-        reverse = self.sort_reverse(name)
-        dt.sort(name, reverse=reverse)
+        """Sort by column first, rows with equal values keep order of previous sorts."""
+        table = self.query_one(LibraryTable)
+        key = table.cursor_key
+        self.model.sort_by(name)
+        table.refresh_rows()
+        if key:
+            table.move_cursor_to(key)
 
         self.app.notify(
             title=f"Sorted by {name} column",
-            message="Descending" if reverse else "Ascending",
+            message=", ".join(
+                f"{column} {'descending' if reverse else 'ascending'}"
+                for column, reverse in self.model.sort_columns
+            ),
         )
 
-    def sort_reverse(self, sort_type: str) -> bool:
-        """Determine if `sort_type` is ascending or descending."""
-        reverse = sort_type in self.current_sorts
-        if reverse:
-            self.current_sorts.remove(sort_type)
-        else:
-            self.current_sorts.add(sort_type)
-        return reverse
-
     def action_quit_screen(self) -> None:
         self.app.pop_screen()
 
     def compose(self) -> ComposeResult:
         yield Header()
-        yield DataTable(id="library_table")
+        yield Input(
+            placeholder='Tag query, e.g. type=heavy AND mood=epic AND sounds_like="Tool"',
+            id="query",
+        )
+        yield Input(placeholder="Search names, tags and paths, e.g. light riff", id="search")
+        yield LibraryTable(self.model, id="library_table")
         yield Footer()
 
-    def on_mount(self) -> None:
-        self.sub_title = "Library"
+    # Tag query
 
-        # Set up the table
-        table = self.query_one(DataTable)
+    def action_focus_query(self) -> None:
+        self.query_one("#query", Input).focus()
 
-        for label, key in self.COLUMNS:
-            text = Text(label)
-            text.stylize("bold yellow", 0, 1)
-            table.add_column(text, key=key)
+    def action_focus_table(self) -> None:
+        self.query_one(LibraryTable).focus()
 
-        self.mdirs: list[MusicDir] = sorted(
-            self.client.find_music_dirs(),
-            key=lambda mdir: mdir.name_without_tags,
-        )
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        if event.input.id == "search":
+            self.action_focus_table()
+            return
+
+        if event.input.id != "query":
+            return
+
+        if not self.loaded:
+            self.notify("Library is still loading", severity="warning")
+            return
+
+        if event.value.strip():
+            self.run_query(event.value)
+        else:
+            self.show_rows(None)
 
-        self.mdirs_index: dict[str, int] = {}
+        self.action_focus_table()
 
-        for i, mdir in enumerate(self.mdirs, start=1):
-            root_dir = mdir.root_dir
-            folder = mdir.parent_dir.relative_to(root_dir.path)
-            colored_path = Text(f"{root_dir.name}/{folder}")
-            colored_path.stylize("yellow", 0, len(root_dir.name))
+    @work(thread=True, exclusive=True, group="query")
+    def run_query(self, expression: str) -> None:
+        # First query builds tag index, so it's run in background
+        try:
+            matches = self.library.query(expression)
+        except QueryError as e:
+            self.app.call_from_thread(self.notify, str(e), severity="error")
+            return
+
+        self.app.call_from_thread(self.show_rows, [str(mdir.path) for mdir in matches])
+
+    def show_rows(self, keys: list[str] | None) -> None:
+        """Show only rows with given keys, or all rows if keys are None."""
+        self.query_keys = keys
+        self.apply_filters()
+
+    # Type-ahead search
+
+    def action_focus_search(self) -> None:
+        self.query_one("#search", Input).focus()
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        # Search before loading is finished would miss rows, it's run when loading finishes
+        if event.input.id != "search" or not self.loaded:
+            return
+
+        self.update_search(event.value)
+        self.query_one(LibraryTable).cursor_row = 0
+
+    @timed("LibraryScreen.update_search")
+    def update_search(self, query: str) -> None:
+        """Search on every keystroke, narrowing matches of the previous one."""
+        if query.strip():
+            self.search = self.search_index.search(query, self.search)
+        else:
+            self.search = None
+        self.apply_filters()
+
+    def apply_filters(self) -> None:
+        """Show rows that match both search and tag query, best search matches first."""
+        if self.search is None:
+            self.model.set_filter(self.query_keys)
+        elif self.query_keys is None:
+            self.model.set_filter(self.search.keys, ranked=True)
+        else:
+            matches = set(self.query_keys)
+            keys = [key for key in self.search.keys if key in matches]
+            self.model.set_filter(keys, ranked=True)
 
-            self.mdirs_index[mdir.name_without_tags] = i - 1
+        self.query_one(LibraryTable).refresh_rows()
 
-            table.add_row(
-                mdir.name_without_tags,
-                mdir.count_files(MusicFileType.AUDIO),
-                mdir.count_files(MusicFileType.LOGIC_X),
-                mdir.count_files(MusicFileType.GUITAR_PRO),
-                mdir.count_files(MusicFileType.OTHER),
-                colored_path,
-                label=str(i),
+        if self.model.filter is None:
+            self.sub_title = f"Library ({self.model.total} dirs)"
+        elif self.search is not None and self.search.fuzzy:
+            self.sub_title = (
+                f"Library ({len(self.model)} of {self.model.total} dirs, similar to search)"
             )
+        else:
+            self.sub_title = f"Library ({len(self.model)} of {self.model.total} dirs)"
+
+    @timed("LibraryScreen.on_mount")
+    def on_mount(self) -> None:
+        self.sub_title = "Library"
+        self.query_one(LibraryTable).focus()
+        self.load_rows()
+        self.library.subscribe(self.on_library_changed)
+
+    def on_unmount(self) -> None:
+        self.library.unsubscribe(self.on_library_changed)
+
+    def on_library_changed(self, changes: LibraryChanges) -> None:
+        """Update rows of changed music directories in place."""
+        if not self.loaded:
+            return
+
+        removed = [str(path) for path in changes.removed]
+        self.model.remove(removed)
+        for key in removed:
+            self.mdirs.pop(key, None)
+            self.search_index.remove(key)
+            for unread in self.unread.values():
+                unread.pop(key, None)
+
+        changed = changes.updated + changes.added
+        for mdir in changed:
+            key = str(mdir.path)
+            self.mdirs[key] = mdir
+            self.model.add(key, self.build_row(mdir))
+            self.index_dir(mdir)
+
+        if self.search is not None:
+            # Renamed rows could match search or stop matching it
+            self.update_search(self.search.query)
+        else:
+            # Changed rows are moved to their places in current sort order
+            self.model.rebuild_view()
+            self.query_one(LibraryTable).refresh_rows()
+            self.sub_title = f"Library ({self.model.total} dirs)"
+
+        if changed:
+            self.load_columns(changed)
+
+    @work(thread=True, exclusive=True)
+    def load_rows(self) -> None:
+        """Crawl library in background and stream rows to the table."""
+        worker = get_current_worker()
+        batch: list[tuple[MusicDir, tuple]] = []
+
+        for mdir in self.library.stream():
+            if worker.is_cancelled:
+                return
+
+            # Files are counted and names indexed here, so UI thread only adds ready rows
+            batch.append((mdir, self.build_row(mdir)))
+            self.index_dir(mdir)
+            if len(batch) == ROWS_BATCH_SIZE:
+                self.app.call_from_thread(self.add_rows, batch)
+                batch = []
+
+        if not worker.is_cancelled:
+            self.search_index.prepare()
+            self.app.call_from_thread(self.add_rows, batch)
+            self.app.call_from_thread(self.finish_loading)
+
+    def index_dir(self, mdir: MusicDir) -> None:
+        path = mdir.path.relative_to(mdir.root_dir.path)
+        self.search_index.add(str(mdir.path), mdir.name_without_tags, mdir.name_tags, str(path))
+
+    def build_row(self, mdir: MusicDir) -> tuple:
+        """Plain values of row, root dir name in path is highlighted when row is rendered."""
+        root_dir = mdir.root_dir
+        folder = mdir.parent_dir.relative_to(root_dir.path)
+        summary = mdir.summary
+
+        return (
+            mdir.name_without_tags,
+            summary.count(MusicFileType.AUDIO),
+            UNKNOWN,
+            summary.count(MusicFileType.LOGIC_X),
+            UNKNOWN if summary.count(MusicFileType.LOGIC_X) else 0,
+            summary.count(MusicFileType.GUITAR_PRO),
+            summary.count(MusicFileType.OTHER),
+            f"{root_dir.name}/{folder}",
+        )
+
+    def add_rows(self, rows: list[tuple[MusicDir, tuple]]) -> None:
+        for mdir, row in rows:
+            key = str(mdir.path)
+            self.mdirs[key] = mdir
+            self.model.add(key, row)
+
+        self.query_one(LibraryTable).refresh_rows()
+        self.sub_title = f"Library (loading: {len(self.mdirs)} dirs)"
+
+    def finish_loading(self) -> None:
+        self.loaded = True
+        self.sub_title = f"Library ({len(self.mdirs)} dirs)"
+
+        # Keep order chosen by user while loading, otherwise sort by name as usual
+        if not self.model.sort_columns:
+            self.model.sort_columns = [("name", False)]
+        self.model.sort()
+        self.query_one(LibraryTable).refresh_rows()
+
+        search = self.query_one("#search", Input).value
+        if search.strip():
+            self.update_search(search)
+
+        self.load_columns(self.mdirs.values())
+
+    # Columns read from files after rows are shown
+
+    def load_columns(self, music_dirs: Iterable[MusicDir]) -> None:
+        """Read columns of music dirs, together with dirs a cancelled load didn't get to."""
+        for mdir in music_dirs:
+            for unread in self.unread.values():
+                unread[str(mdir.path)] = mdir
+
+        # Loads are exclusive, new one replaces the running one and reads what it didn't
+        self.load_durations(list(self.unread["duration"].values()))
+        self.load_projects(list(self.unread["projects"].values()))
+
+    @work(thread=True, group="durations", exclusive=True)
+    def load_durations(self, music_dirs: list[MusicDir]) -> None:
+        """Read durations from headers of audio files after rows are shown."""
+        worker = get_current_worker()
+        batch: list[tuple[str, int]] = []
+
+        for result in self.library.read_audio(music_dirs):
+            if worker.is_cancelled:
+                return
+
+            duration = round(result.duration) if result.infos else UNKNOWN
+            batch.append((str(result.mdir.path), duration))
+            if len(batch) == ROWS_BATCH_SIZE:
+                self.app.call_from_thread(self.set_column, "duration", batch)
+                batch = []
+
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self.set_column, "duration", batch)
+
+    @work(thread=True, group="projects", exclusive=True)
+    def load_projects(self, music_dirs: list[MusicDir]) -> None:
+        """Sum sizes of Logic X bundles, unchanged bundles aren't walked again."""
+        worker = get_current_worker()
+        batch: list[tuple[str, int]] = []
+
+        for result in self.library.read_bundles(music_dirs):
+            if worker.is_cancelled:
+                return
+
+            batch.append((str(result.mdir.path), result.size if result.infos else UNKNOWN))
+            if len(batch) == ROWS_BATCH_SIZE:
+                self.app.call_from_thread(self.set_column, "projects", batch)
+                batch = []
+
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self.set_column, "projects", batch)
+
+    def set_column(self, column_key: str, values: list[tuple[str, int]]) -> None:
+        unread = self.unread[column_key]
+        for key, value in values:
+            unread.pop(key, None)
+            # Row could be removed while its files were read
+            if key in self.model:
+                self.model.set_value(key, column_key, value)
+
+        table = self.query_one(LibraryTable)
+        if any(key == column_key for key, _ in self.model.sort_columns):
+            cursor_key = table.cursor_key
+            self.model.sort()
+            if cursor_key:
+                table.move_cursor_to(cursor_key)
+
+        table.refresh_rows()
+
+    # Bulk tagging
+
+    def action_toggle_selected(self) -> None:
+        table = self.query_one(LibraryTable)
+        key = table.cursor_key
+        if key is None:
+            return
+
+        self.set_selected([key], key not in self.model.selected)
+        table.action_cursor_down()
+
+    def action_select_all(self) -> None:
+        """Select all shown rows or clear selection if they are already selected."""
+        keys = self.model.visible_keys()
+        self.set_selected(keys, not self.model.selected.issuperset(keys))
+
+    def set_selected(self, keys: list[str], selected: bool) -> None:
+        if selected:
+            self.model.selected.update(keys)
+        else:
+            self.model.selected.difference_update(keys)
+
+        self.query_one(LibraryTable).refresh()
+        self.sub_title = f"Library ({len(self.model.selected)} of {self.model.total} dirs selected)"
+
+    def action_bulk_tag(self) -> None:
+        """Edit tags of selected rows, or of all shown rows if nothing is selected."""
+        if not self.loaded:
+            self.notify("Library is still loading", severity="warning")
+            return
+
+        keys = list(self.model.selected) or self.model.visible_keys()
+        if not keys:
+            return
+
+        music_dirs = [self.mdirs[key] for key in keys]
+
+        def apply(edits: list[TagEdit] | None) -> None:
+            if edits:
+                self.run_bulk_tag(music_dirs, edits)
+
+        self.app.push_screen(BulkTagScreen(self.library.tag_options, len(music_dirs)), apply)
+
+    @work(thread=True, exclusive=True, group="bulk")
+    def run_bulk_tag(self, music_dirs: list[MusicDir], edits: list[TagEdit]) -> None:
+        changed = done = 0
+        errors = []
+        # Statistics and tag index are shared with UI, so they are updated on UI thread
+        updated: list[tuple[MusicDir, MusicDirTags]] = []
+
+        for result in self.library.bulk_tag(music_dirs, edits, update_tags=False):
+            done += 1
+            changed += result.changed
+            if not result.ok:
+                errors.append(f"{result.mdir.name}: {result.error}")
+            elif result.changed and result.tags:
+                updated.append((result.mdir, result.tags))
+
+            if done % BULK_PROGRESS_STEP == 0:
+                self.app.call_from_thread(self.show_bulk_progress, done, len(music_dirs), updated)
+                updated = []
+
+        self.app.call_from_thread(self.show_bulk_progress, done, len(music_dirs), updated)
+        self.app.call_from_thread(self.finish_bulk_tag, len(music_dirs), changed, errors)
+
+    def show_bulk_progress(
+        self,
+        done: int,
+        total: int,
+        updated: list[tuple[MusicDir, MusicDirTags]],
+    ) -> None:
+        for mdir, tags in updated:
+            self.library.update_tags(mdir, tags)
+        self.sub_title = f"Tagging: {done} of {total} dirs"
+
+    def finish_bulk_tag(self, total: int, changed: int, errors: list[str]) -> None:
+        self.sub_title = f"Library ({self.model.total} dirs)"
+        message = f"{changed} of {total} dirs changed"
+
+        if errors:
+            shown = "\n".join(errors[:BULK_ERRORS_SHOWN])
+            more = len(errors) - BULK_ERRORS_SHOWN
+            if more > 0:
+                shown += f"\n...and {more} more"
+            self.notify(f"{message}\n{shown}", title=f"{len(errors)} failed", severity="error")
+        else:
+            self.notify(message, title="Tags saved")
+            self.set_selected(list(self.model.selected), False)
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "back_button":
@@ -131,13 +519,12 @@ class LibraryScreen(Screen):
 
     def action_open_in_finder(self) -> None:
         """Open the directory of the selected row in Finder."""
-        dt = self.query_one(DataTable)
-
-        name_without_tags = dt.get_row_at(dt.cursor_row)[0]
+        key = self.query_one(LibraryTable).cursor_key
+        if key is None:
+            return
 
         # Get the music directory corresponding to the selected row
-        index = self.mdirs_index[name_without_tags]
-        selected_mdir = self.mdirs[index]
+        selected_mdir = self.mdirs[key]
 
         # Get the path from the selected music directory
         path = selected_mdir.path
@@ -0,0 +1,76 @@
+from rich.table import Table
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import VerticalScroll
+from textual.screen import ModalScreen
+from textual.widgets import Static
+
+from music.profiling import profiler
+
+# Seconds between updates of shown profile
+REFRESH_INTERVAL = 1.0
+
+
+class ProfileScreen(ModalScreen[None]):
+    """Overlay with timing spans and counters collected by profiler so far."""
+
+    CSS = """
+    ProfileScreen {
+        align: center middle;
+    }
+
+    #profile_dialog {
+        width: 100;
+        max-height: 80%;
+        padding: 0 1;
+        border: round orange;
+        background: $background;
+    }
+    """
+
+    BINDINGS = [
+        Binding("escape", "close", "Close"),
+        Binding("r", "reset", "Reset"),
+    ]
+
+    def compose(self) -> ComposeResult:
+        with VerticalScroll(id="profile_dialog") as dialog:
+            dialog.border_title = "Profile"
+            yield Static(id="profile")
+
+    def on_mount(self) -> None:
+        self.show_profile()
+        self.set_interval(REFRESH_INTERVAL, self.show_profile)
+
+    def show_profile(self) -> None:
+        report = profiler.to_dict()
+
+        spans = Table("Span", "Calls", "Total ms", "Mean ms", "Max ms", expand=True)
+        for name, totals in sorted(report["spans"].items(), key=lambda i: -i[1]["total_ms"]):
+            spans.add_row(
+                name,
+                str(totals["count"]),
+                f"{totals['total_ms']:.1f}",
+                f"{totals['mean_ms']:.2f}",
+                f"{totals['max_ms']:.1f}",
+            )
+
+        counters = Table("Counter", "Value", expand=True)
+        for name, value in sorted(report["counters"].items()):
+            counters.add_row(name, f"{value:,}")
+
+        self.query_one("#profile", Static).update(self.build_grid(spans, counters))
+
+    @staticmethod
+    def build_grid(*tables: Table) -> Table:
+        grid = Table.grid(expand=True)
+        for table in tables:
+            grid.add_row(table)
+        return grid
+
+    def action_reset(self) -> None:
+        profiler.reset()
+        self.show_profile()
+
+    def action_close(self) -> None:
+        self.dismiss()
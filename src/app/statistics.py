@@ -1,5 +1,7 @@
+from rich.text import Text
+from textual import work
 from textual.app import ComposeResult
-from textual.containers import Container
+from textual.containers import VerticalScroll
 from textual.screen import Screen
 from textual.widgets import (
     Button,
@@ -8,32 +10,125 @@ from textual.widgets import (
     Label,
     Static,
 )
+from textual.worker import get_current_worker
+
+from music import (
+    MusicFileType,
+    MusicLibrary,
+)
+from music.audio import (
+    AudioStats,
+    format_duration,
+)
+from music.profiling import timed
+from music.statistics import (
+    LibraryStats,
+    format_size,
+)
+
+# Number of most used values shown for every tag
+TOP_TAG_VALUES = 5
 
 
 class StatsScreen(Screen):
-    """Statistics screen showing sample stats."""
+    """Statistics screen showing library stats."""
 
     BINDINGS = [
         ("q", "quit_screen", "Back to Menu"),
     ]
 
+    def __init__(self, library: MusicLibrary) -> None:
+        """Initialize class instance."""
+        super().__init__()
+        self.library = library
+
     def action_quit_screen(self) -> None:
         self.app.pop_screen()
 
     def compose(self) -> ComposeResult:
         yield Header(show_clock=True)
-        yield Container(
-            Label("Sample Statistics", classes="heading"),
-            Static("Total Files: 324"),
-            Static("Tagged Files: 187"),
-            Static("Untagged Files: 137"),
-            Static("Most Common Tag: 'important' (42 files)"),
-            Static("Average Tags Per File: 2.3"),
+        yield VerticalScroll(
+            Label("Statistics", classes="heading"),
+            Static("Collecting statistics...", id="stats"),
+            Static("Reading audio files...", id="audio_stats"),
             Button("Back to Main Menu", id="back_button"),
             id="stats_container",
         )
         yield Footer()
 
+    @timed("StatsScreen.on_mount")
+    def on_mount(self) -> None:
+        self.sub_title = "Statistics"
+
+        # Statistics are kept by library, so only first opening collects them
+        if self.library.stats is not None:
+            self.show_stats(self.library.stats)
+        self.collect_stats()
+
+    @work(thread=True, exclusive=True)
+    def collect_stats(self) -> None:
+        worker = get_current_worker()
+        if self.library.stats is None:
+            self.app.call_from_thread(self.show_stats, self.library.get_stats())
+
+        # Audio headers are read after library is crawled, cached files aren't read again
+        audio_stats = AudioStats()
+        for result in self.library.read_audio(self.library.load()):
+            if worker.is_cancelled:
+                return
+            audio_stats.add(result)
+        self.app.call_from_thread(self.show_audio_stats, audio_stats)
+
+    def show_audio_stats(self, stats: AudioStats) -> None:
+        text = Text()
+        text.append(f"\nAudio: {stats.files} files ({format_duration(stats.duration)})\n", "bold")
+        if stats.failed:
+            text.append(f"  Unreadable: {stats.failed} files\n", "red")
+        for name, duration in stats.roots.items():
+            text.append(f"  {name}: {format_duration(duration)}\n")
+
+        rates = ", ".join(
+            f"{rate} Hz ({count})" for rate, count in stats.sample_rates.most_common()
+        )
+        text.append(f"  Sample rates: {rates or '-'}\n")
+
+        self.query_one("#audio_stats", Static).update(text)
+
+    def show_stats(self, stats: LibraryStats) -> None:
+        text = Text()
+        text.append(f"Music dirs: {stats.dirs}\n", "bold")
+        text.append(f"Tagged: {stats.tagged}\n", "green")
+        text.append(f"Untagged: {stats.untagged}\n", "bright_black")
+        text.append(f"Average tags per dir: {stats.average_tags:.1f}\n")
+
+        most_common = stats.most_common_tag()
+        if most_common:
+            name, value, count = most_common
+            text.append(f"Most common tag: {name}={value} ({count} dirs)\n")
+
+        text.append(f"\nFiles: {stats.files} ({format_size(stats.size)})\n", "bold")
+        for file_type in MusicFileType:
+            text.append(f"  {file_type.emoji} {file_type.name}: {stats.file_types[file_type]}\n")
+
+        text.append("\nRoot dirs\n", "bold")
+        for name, root in stats.roots.items():
+            text.append(
+                f"  {name}: {root.dirs} dirs, {root.tagged} tagged, "
+                f"{root.files} files ({format_size(root.size)})\n",
+            )
+
+        text.append("\nTags\n", "bold")
+        for name, counter in stats.tag_values.items():
+            values = ", ".join(
+                f"{value} ({count})"
+                for value, count in counter.most_common(TOP_TAG_VALUES)
+                if count
+            )
+            text.append(f"  {name}: ", "bold bright_cyan")
+            text.append(f"{values}\n")
+
+        self.query_one("#stats", Static).update(text)
+
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "back_button":
             self.app.pop_screen()
@@ -23,12 +23,18 @@ from textual.widgets import (
 from textual.widgets.selection_list import Selection
 
 from music import (
-    MusicClient,
     MusicDir,
     MusicDirTags,
     MusicFileType,
+    MusicLibrary,
     Tag,
 )
+from music.library import LibraryChanges
+from music.profiling import timed
+from music.tags import (
+    TAG_FILE,
+    TagValue,
+)
 
 from .widgets import MusicDirectoryTree
 
@@ -75,30 +81,53 @@ class TaggingScreen(Screen):
 
     current_path = os.path.expanduser("~/Documents")  # Default path
 
+    # Actions that need a music dir, they are disabled while library is empty
+    MUSIC_DIR_ACTIONS = {"open_in_finder", "save_changes", "prev_item", "next_item"}
+
     def __init__(
         self,
+        library: MusicLibrary,
         current_index: int = 0,
         edit_mode: bool = True,
     ) -> None:
         """Initialize class instance."""
         super().__init__()
-        self.client = MusicClient()
-        self.music_dirs = list(self.client.find_music_dirs())
+        self.library = library
         self.current_index = current_index
+        # Music dir is kept, because its position changes when other dirs are removed.
+        # It's None when library is empty
+        self.current_dir: MusicDir | None = None
+        if len(self.library):
+            self.current_index = current_index % len(self.library)
+            self.current_dir = self.library[self.current_index]
         self.edit_mode = edit_mode
         self.changed = False
+        self.current_tags: MusicDirTags | None = None
 
     @property
     def music_dir(self) -> MusicDir:
-        return self.music_dirs[self.current_index]
+        if self.current_dir is None:
+            raise LookupError("Library is empty")
+        return self.current_dir
 
-    @property
-    def music_dir_tags(self) -> MusicDirTags:
-        return self.music_dir.get_tags(self.client.tag_options)
+    def check_action(self, action: str, parameters: tuple[object, ...]) -> bool | None:
+        return self.current_dir is not None or action not in self.MUSIC_DIR_ACTIONS
+
+    def load_tags(self) -> MusicDirTags | None:
+        """Get tags of current music dir or None if it's not tagged yet."""
+        return self.library.get_tags(self.music_dir)
 
     def compose(self) -> ComposeResult:
         yield Header()
 
+        if self.current_dir is None:
+            yield Label("No music directories in library", id="empty")
+            yield Footer()
+            return
+
+        # Tags are read once per visit and shared by all widgets
+        self.current_tags = self.load_tags()
+
         with Horizontal():
             with Vertical(id="tree_container"):
                 yield from self.compose_info()
@@ -121,7 +150,7 @@ class TaggingScreen(Screen):
 
     def compose_info(self) -> ComposeResult:
         text = Text()
-        if self.music_dir.is_tagged:
+        if self.current_tags:
             text.append("Tagged", "bold green")
         else:
             text.append("Untagged", "bright_black")
@@ -137,7 +166,7 @@ class TaggingScreen(Screen):
         yield info
 
     def compose_tags(self) -> ComposeResult:
-        for tag_name, tag in self.client.tag_options.items():
+        for tag_name, tag in self.library.tag_options.items():
             obj: Widget
 
             if tag.multiselect:
@@ -149,8 +178,8 @@ class TaggingScreen(Screen):
             yield obj
 
         text = ""
-        if self.music_dir.is_tagged:
-            text = self.music_dir_tags.description
+        if self.current_tags:
+            text = self.current_tags.description
 
         yield TextArea(
             text=text,
@@ -160,9 +189,9 @@ class TaggingScreen(Screen):
     def compose_selection_list(self, tag: Tag) -> SelectionList:
         selections: list[Selection]
 
-        if self.music_dir.is_tagged:
+        if self.current_tags:
             selections = [
-                Selection(value, i, self.music_dir_tags.is_selected(tag, value))
+                Selection(value, i, self.current_tags.is_selected(tag, value))
                 for i, value in enumerate(tag.values)
             ]
         else:
@@ -179,9 +208,9 @@ class TaggingScreen(Screen):
     def compose_radio_set(self, tag: Tag) -> RadioSet:
         buttons: list[RadioButton]
 
-        if self.music_dir.is_tagged:
+        if self.current_tags:
             buttons = [
-                RadioButton(v, value=self.music_dir_tags.is_selected(tag, v)) for v in tag.values
+                RadioButton(v, value=self.current_tags.is_selected(tag, v)) for v in tag.values
             ]
         else:
             buttons = [RadioButton(v, value=(v == tag.default)) for v in tag.values]
@@ -192,10 +221,34 @@ class TaggingScreen(Screen):
             disabled=not self.edit_mode,
         )
 
+    @timed("TaggingScreen.on_mount")
     def on_mount(self) -> None:
         self.sub_title = "Tagging"
-        scroll = self.query_one("#tags_container")
-        scroll.focus()
+        self.focus_tags()
+        self.library.subscribe(self.on_library_changed)
+
+    def on_unmount(self) -> None:
+        self.library.unsubscribe(self.on_library_changed)
+
+    def on_library_changed(self, changes: LibraryChanges) -> None:
+        """Find position of current music dir again, or show the next one if it's removed."""
+        if self.current_dir is None:
+            if changes.added:
+                self.go_to_index(0, force=True)
+            return
+
+        path = self.current_dir.path
+        if path in changes.removed:
+            self.notify(f"{self.current_dir.name} was removed", severity="warning")
+            self.go_to_index(min(self.current_index, len(self.library) - 1), force=True)
+            return
+
+        self.current_index = self.library.index_of(path)
+        self.current_dir = self.library[self.current_index]
+
+    def focus_tags(self) -> None:
+        if self.current_dir is not None:
+            self.query_one("#tags_container").focus()
 
     def on_radio_set_changed(self, pressed: RadioButton) -> None:
         self.changed = True
@@ -223,16 +276,53 @@ class TaggingScreen(Screen):
         self.go_to_index(self.current_index - 1)
 
     def action_save_changes(self) -> None:
+        tags = self.collect_tags()
+        self.library.save_tags(self.music_dir, tags)
+        self.current_tags = tags
+
         self.notify(f"Saved tags for {self.music_dir.name}")
         self.changed = False
 
+    def collect_tags(self) -> MusicDirTags:
+        """Build tags of current music dir from values selected in widgets."""
+        tags: dict[Tag, TagValue] = {}
+
+        for tag in self.library.tag_options.values():
+            value: TagValue
+            if tag.multiselect:
+                selected = self.query_one(f"#tag_{tag.name}", SelectionList).selected
+                value = [tag.values[i] for i in sorted(selected)]
+            else:
+                index = self.query_one(f"#tag_{tag.name}", RadioSet).pressed_index
+                value = tag.values[index] if index >= 0 else ""
+
+            if value:
+                tags[tag] = value
+
+        return MusicDirTags(
+            path=self.music_dir.path / TAG_FILE,
+            tags=tags,
+            description=self.query_one("#description", TextArea).text,
+        )
+
     def go_to_index(self, index: int, force: bool = False) -> None:
         if self.changed and not force:
             self.notify("You have unsaved changes", severity="error")
             return
 
-        new_screen = self.__class__(current_index=index)
-        self.app.switch_screen(new_screen)
+        # Library is already crawled, so only widgets of this screen are rebuilt
+        if len(self.library):
+            self.current_index = index % len(self.library)
+            self.current_dir = self.library[self.current_index]
+        else:
+            self.current_index = 0
+            self.current_dir = None
+            self.current_tags = None
+
+        self.changed = False
+        self.refresh(recompose=True)
+        self.refresh_bindings()
+        self.call_after_refresh(self.focus_tags)
 
     def save_and_continue(self) -> None:
         self.action_save_changes()
@@ -1 +1,6 @@
+from .table import (
+    Column,
+    LibraryTable,
+    LibraryTableModel,
+)
 from .tree import MusicDirectoryTree
@@ -0,0 +1,465 @@
+from array import array
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+)
+
+from rich.cells import (
+    cell_len,
+    set_cell_size,
+)
+from rich.segment import Segment
+from textual import events
+from textual.binding import Binding
+from textual.geometry import Size
+from textual.reactive import reactive
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+# Spaces between columns
+CELL_PADDING = 2
+# Long text columns are cropped, except the last one
+MAX_COLUMN_WIDTH = 60
+# Columns used for sorting at once, older ones are dropped
+MAX_SORT_COLUMNS = 3
+SELECTED_MARK = "●"
+# Room for sort arrow and order of column after label, e.g. " ▲2"
+SORT_MARK_WIDTH = 3
+# Values of removed rows are dropped once there are more of them than this share of
+# live rows, but not before there are at least this many of them
+COMPACT_RATIO = 0.25
+COMPACT_MIN_REMOVED = 1000
+
+
+@dataclass(frozen=True)
+class Column:
+    label: str
+    key: str
+    numeric: bool = False
+    # Text before the first "/" is highlighted, e.g. root dir name in path
+    highlight_prefix: bool = False
+    # Text shown for numeric value, numbers are sorted by value
+    format: Callable[[Any], str] = str
+
+
+class LibraryTableModel:
+    """Rows of library table stored by column.
+
+    Every column is a list (or an array of ints) indexed by row id, and text columns have
+    precomputed sort keys, so rows are sorted without building row objects. Rows are shown
+    in the order of `view`, which holds ids of rows that pass the filter. Ranked filter,
+    e.g. search results, keeps its own order until rows are sorted by a column.
+    """
+
+    def __init__(self, columns: list[Column]):
+        """Initialize class instance."""
+        self.columns = columns
+        self.keys: list[str] = []
+        self.positions: dict[str, int] = {}
+        self.values: dict[str, Any] = {}
+        self.sort_keys: dict[str, Any] = {}
+        self.widths: dict[str, int] = {}
+
+        for column in columns:
+            if column.numeric:
+                # Numbers are their own sort keys
+                self.values[column.key] = self.sort_keys[column.key] = array("q")
+            else:
+                self.values[column.key] = []
+                self.sort_keys[column.key] = []
+            self.widths[column.key] = cell_len(column.label) + SORT_MARK_WIDTH
+
+        self.view: list[int] = []
+        # Index of every row id in view, built on lookup after view changed
+        self.view_positions: dict[int, int] | None = None
+        self.removed: set[int] = set()
+        self.filter: set[int] | None = None
+        # Ids of rows in order of ranked filter
+        self.ranking: list[int] | None = None
+        # Pairs of (column key, descending), the first column is the primary one
+        self.sort_columns: list[tuple[str, bool]] = []
+        self.selected: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.view)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.positions
+
+    @property
+    def total(self) -> int:
+        """Number of rows including filtered out ones."""
+        return len(self.positions)
+
+    @property
+    def width(self) -> int:
+        widths = [self.get_width(column) for column in self.columns]
+        return cell_len(SELECTED_MARK) + sum(widths) + CELL_PADDING * len(widths)
+
+    def get_width(self, column: Column) -> int:
+        width = self.widths[column.key]
+        if column.numeric or column is self.columns[-1]:
+            return width
+        return min(width, MAX_COLUMN_WIDTH)
+
+    def add(self, key: str, row: tuple) -> None:
+        """Add row, it's shown at the end until rows are sorted again."""
+        if key in self.positions:
+            self.update(key, row)
+            return
+
+        row_id = len(self.keys)
+        self.keys.append(key)
+        self.positions[key] = row_id
+
+        for column, value in zip(self.columns, row):
+            self.values[column.key].append(value)
+            if not column.numeric:
+                self.sort_keys[column.key].append(value.casefold())
+            self.update_width(column, value)
+
+        if self.filter is None:
+            self.view.append(row_id)
+            self.view_positions = None
+
+    def update(self, key: str, row: tuple) -> None:
+        row_id = self.positions[key]
+        for column, value in zip(self.columns, row):
+            self.values[column.key][row_id] = value
+            if not column.numeric:
+                self.sort_keys[column.key][row_id] = value.casefold()
+            self.update_width(column, value)
+
+    def set_value(self, key: str, column_key: str, value: Any) -> None:
+        """Change value of one column, e.g. one that is read after rows are shown."""
+        row_id = self.positions[key]
+        column = next(column for column in self.columns if column.key == column_key)
+        self.values[column.key][row_id] = value
+        if not column.numeric:
+            self.sort_keys[column.key][row_id] = value.casefold()
+        self.update_width(column, value)
+
+    def update_width(self, column: Column, value: Any) -> None:
+        width = len(column.format(value)) if column.numeric else cell_len(value)
+        if width > self.widths[column.key]:
+            self.widths[column.key] = width
+
+    def remove(self, keys: Iterable[str]) -> None:
+        """Remove rows, view is filtered once for all of them."""
+        # Ids aren't reused, values of removed rows stay until table is compacted
+        removed = set()
+        for key in keys:
+            row_id = self.positions.pop(key, None)
+            if row_id is not None:
+                removed.add(row_id)
+                self.selected.discard(key)
+
+        if not removed:
+            return
+
+        self.removed |= removed
+        if self.filter is not None:
+            self.filter -= removed
+        if self.ranking is not None:
+            self.ranking = [row_id for row_id in self.ranking if row_id not in removed]
+        self.view = [row_id for row_id in self.view if row_id not in removed]
+        self.view_positions = None
+
+        if len(self.removed) > max(COMPACT_MIN_REMOVED, len(self.positions) * COMPACT_RATIO):
+            self.compact()
+
+    def compact(self) -> None:
+        """Drop values of removed rows, live rows get new consecutive ids in the same order."""
+        live = sorted(self.positions.values())
+        new_ids = {row_id: new_id for new_id, row_id in enumerate(live)}
+
+        self.keys = [self.keys[row_id] for row_id in live]
+        self.positions = {key: new_id for new_id, key in enumerate(self.keys)}
+        for column in self.columns:
+            values = self.values[column.key]
+            if column.numeric:
+                self.values[column.key] = self.sort_keys[column.key] = array(
+                    "q", [values[row_id] for row_id in live]
+                )
+            else:
+                sort_keys = self.sort_keys[column.key]
+                self.values[column.key] = [values[row_id] for row_id in live]
+                self.sort_keys[column.key] = [sort_keys[row_id] for row_id in live]
+
+        self.view = [new_ids[row_id] for row_id in self.view]
+        if self.filter is not None:
+            self.filter = {new_ids[row_id] for row_id in self.filter}
+        if self.ranking is not None:
+            self.ranking = [new_ids[row_id] for row_id in self.ranking]
+        self.view_positions = None
+        self.removed = set()
+
+    def key_at(self, index: int) -> str:
+        return self.keys[self.view[index]]
+
+    def index_of(self, key: str) -> int | None:
+        row_id = self.positions.get(key)
+        if row_id is None:
+            return None
+
+        if self.view_positions is None:
+            self.view_positions = {row_id: index for index, row_id in enumerate(self.view)}
+        return self.view_positions.get(row_id)
+
+    def visible_keys(self) -> list[str]:
+        return [self.keys[row_id] for row_id in self.view]
+
+    def set_filter(self, keys: Iterable[str] | None, ranked: bool = False) -> None:
+        """Show only rows with given keys, or all rows if keys are None.
+
+        Rows of ranked filter are shown in order of keys instead of sort order.
+        """
+        if keys is None:
+            self.filter = None
+            self.ranking = None
+        elif ranked:
+            positions = self.positions
+            self.ranking = [positions[key] for key in keys if key in positions]
+            self.filter = set(self.ranking)
+        else:
+            self.filter = {self.positions[key] for key in keys if key in self.positions}
+            self.ranking = None
+
+        self.rebuild_view()
+
+    def rebuild_view(self) -> None:
+        self.view_positions = None
+        if self.ranking is not None and self.filter is not None:
+            self.view = [i for i in self.ranking if i in self.filter]
+            return
+
+        if self.filter is None:
+            self.view = [i for i in range(len(self.keys)) if i not in self.removed]
+        else:
+            self.view = sorted(self.filter)
+
+        self.sort()
+
+    def sort_by(self, key: str) -> None:
+        """Make column the primary sort column, or reverse it if it's primary already."""
+        if self.sort_columns and self.sort_columns[0][0] == key:
+            # Ranked rows are sorted in current order first, as it isn't shown while ranked
+            if self.ranking is None:
+                self.sort_columns[0] = (key, not self.sort_columns[0][1])
+        else:
+            self.sort_columns = [(key, False)] + [c for c in self.sort_columns if c[0] != key]
+            del self.sort_columns[MAX_SORT_COLUMNS:]
+
+        self.ranking = None
+        self.sort()
+
+    def sort(self) -> None:
+        if self.ranking is not None:
+            return
+
+        self.view_positions = None
+        # Sort is stable, so sorting by every column from the least significant one
+        # gives the same result as sorting by tuples of values without building them
+        for key, reverse in reversed(self.sort_columns):
+            self.view.sort(key=self.sort_keys[key].__getitem__, reverse=reverse)
+
+
+class LibraryTable(ScrollView, can_focus=True):
+    """Table of library rows that renders only rows visible in the window."""
+
+    DEFAULT_CSS = """
+    LibraryTable {
+        background: $surface;
+        color: $foreground;
+    }
+
+    LibraryTable > .library-table--header {
+        text-style: bold;
+        background: $panel;
+    }
+
+    LibraryTable > .library-table--header-hint {
+        color: $warning;
+    }
+
+    LibraryTable > .library-table--cursor {
+        background: $block-cursor-background;
+        color: $block-cursor-foreground;
+        text-style: bold;
+    }
+
+    LibraryTable > .library-table--highlight {
+        color: $warning;
+    }
+
+    LibraryTable > .library-table--selected {
+        color: $success;
+        text-style: bold;
+    }
+    """
+
+    COMPONENT_CLASSES = {
+        "library-table--header",
+        "library-table--header-hint",
+        "library-table--cursor",
+        "library-table--highlight",
+        "library-table--selected",
+    }
+
+    BINDINGS = [
+        Binding("up", "cursor_up", "Up", show=False),
+        Binding("down", "cursor_down", "Down", show=False),
+        Binding("pageup", "page_up", "Page up", show=False),
+        Binding("pagedown", "page_down", "Page down", show=False),
+        Binding("home", "cursor_home", "First row", show=False),
+        Binding("end", "cursor_end", "Last row", show=False),
+    ]
+
+    cursor_row: reactive[int] = reactive(0, always_update=True)
+
+    def __init__(self, model: LibraryTableModel, id: str | None = None) -> None:
+        """Initialize class instance."""
+        super().__init__(id=id)
+        self.model = model
+
+    @property
+    def cursor_key(self) -> str | None:
+        if not len(self.model):
+            return None
+        return self.model.key_at(self.cursor_row)
+
+    @property
+    def page_height(self) -> int:
+        """Number of visible rows without header."""
+        return max(self.scrollable_content_region.height - 1, 1)
+
+    def refresh_rows(self) -> None:
+        """Update scrollable size and redraw after rows of model were changed."""
+        self.virtual_size = Size(self.model.width, len(self.model) + 1)
+        self.cursor_row = self.clamp_row(self.cursor_row)
+        self.refresh()
+
+    def move_cursor_to(self, key: str) -> None:
+        index = self.model.index_of(key)
+        if index is not None:
+            self.cursor_row = index
+
+    def clamp_row(self, row: int) -> int:
+        return max(0, min(row, len(self.model) - 1))
+
+    def validate_cursor_row(self, row: int) -> int:
+        return self.clamp_row(row)
+
+    def watch_cursor_row(self, row: int) -> None:
+        scroll_y = round(self.scroll_y)
+        if row < scroll_y:
+            self.scroll_to(y=row, animate=False)
+        elif row >= scroll_y + self.page_height:
+            self.scroll_to(y=row - self.page_height + 1, animate=False)
+        self.refresh()
+
+    def action_cursor_up(self) -> None:
+        self.cursor_row -= 1
+
+    def action_cursor_down(self) -> None:
+        self.cursor_row += 1
+
+    def action_page_up(self) -> None:
+        self.cursor_row -= self.page_height
+
+    def action_page_down(self) -> None:
+        self.cursor_row += self.page_height
+
+    def action_cursor_home(self) -> None:
+        self.cursor_row = 0
+
+    def action_cursor_end(self) -> None:
+        self.cursor_row = len(self.model) - 1
+
+    def on_click(self, event: events.Click) -> None:
+        offset = event.get_content_offset(self)
+        if offset is not None and offset.y > 0:
+            self.cursor_row = round(self.scroll_y) + offset.y - 1
+
+    def on_focus(self) -> None:
+        self.refresh()
+
+    def on_blur(self) -> None:
+        self.refresh()
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        width = self.scrollable_content_region.width
+        base_style = self.rich_style
+
+        if y == 0:
+            strip = self.render_header()
+        elif (index := scroll_y + y - 1) < len(self.model):
+            strip = self.render_row(index)
+        else:
+            return Strip.blank(width, base_style)
+
+        return strip.crop_extend(scroll_x, scroll_x + width, base_style)
+
+    def render_header(self) -> Strip:
+        style = self.rich_style + self.get_component_rich_style("library-table--header")
+        hint_style = style + self.get_component_rich_style("library-table--header-hint")
+        # Ranked rows aren't in sort order, so sort columns aren't marked
+        sort_columns = {
+            key: (i, reverse)
+            for i, (key, reverse) in enumerate(self.model.sort_columns)
+            if self.model.ranking is None
+        }
+
+        segments = [Segment(" " * cell_len(SELECTED_MARK), style)]
+        for column in self.model.columns:
+            label = column.label
+            if column.key in sort_columns:
+                i, reverse = sort_columns[column.key]
+                label += " ▼" if reverse else " ▲"
+                if len(sort_columns) > 1:
+                    label += str(i + 1)
+
+            width = self.model.get_width(column)
+            text = set_cell_size(label, width)
+            # First letter is the key binding of sorting by column
+            segments.append(Segment(text[:1], hint_style))
+            segments.append(Segment(text[1:] + " " * CELL_PADDING, style))
+
+        return Strip(segments)
+
+    def render_row(self, index: int) -> Strip:
+        model = self.model
+        row_id = model.view[index]
+        key = model.keys[row_id]
+
+        style = self.rich_style
+        if index == self.cursor_row and self.has_focus:
+            style += self.get_component_rich_style("library-table--cursor")
+
+        if key in model.selected:
+            mark_style = style + self.get_component_rich_style("library-table--selected")
+            segments = [Segment(SELECTED_MARK, mark_style)]
+        else:
+            segments = [Segment(" " * cell_len(SELECTED_MARK), style)]
+
+        for column in model.columns:
+            value = model.values[column.key][row_id]
+            width = model.get_width(column)
+            padding = " " * CELL_PADDING
+
+            if column.numeric:
+                text = column.format(value).rjust(width)
+                segments.append(Segment(text + padding, style))
+            elif column.highlight_prefix and "/" in value:
+                prefix, rest = value.split("/", maxsplit=1)
+                text = set_cell_size(prefix + "/" + rest, width)
+                highlight = style + self.get_component_rich_style("library-table--highlight")
+                segments.append(Segment(text[: len(prefix)], highlight))
+                segments.append(Segment(text[len(prefix) :] + padding, style))
+            else:
+                segments.append(Segment(set_cell_size(value, width) + padding, style))
+
+        return Strip(segments)
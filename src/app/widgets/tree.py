@@ -1,22 +1,72 @@
+import os
+import threading
 from pathlib import Path
-from typing import Iterable
+from typing import (
+    Iterable,
+    Iterator,
+)
 
 from rich.style import Style
 from rich.text import Text
+from textual import work
+from textual.await_complete import AwaitComplete
+from textual.cache import LRUCache
+from textual.widgets import Tree
 from textual.widgets._directory_tree import (
     DirectoryTree,
     DirEntry,
 )
 from textual.widgets._tree import (
+    NULL_STYLE,
     TOGGLE_STYLE,
     TreeNode,
 )
+from textual.worker import (
+    Worker,
+    get_current_worker,
+)
+
+from music.files import (
+    LOGICX_EXT,
+    scan_dir,
+)
 
-from music import MusicFile
+# Labels of nodes in every combination of cursor, hover and highlight styles
+LABEL_CACHE_SIZE = 4096
+# Listings of recently highlighted directories and their subdirectories
+LISTING_CACHE_SIZE = 256
 
 
 class MusicDirectoryTree(DirectoryTree):
-    """A Tree widget that presents files and directories."""
+    """A Tree widget that presents files and directories.
+
+    Styled labels are cached. Highlighted directory and its subdirectories are listed in
+    background, so their labels are rendered and listings are ready before they are
+    expanded. Listing is used only while mtime of its directory is unchanged, and it's
+    forgotten when node is collapsed or reloaded.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        id: str | None = None,
+    ) -> None:
+        """Initialize class instance."""
+        super().__init__(path, id=id)
+        # Listings of directories with mtimes they were listed at, shared with workers
+        self.listings: LRUCache[Path, tuple[int, list[tuple[str, bool]]]] = LRUCache(
+            LISTING_CACHE_SIZE
+        )
+        self.listings_lock = threading.Lock()
+        self.labels: LRUCache[tuple[str, bool, Style, Style], Text] = LRUCache(LABEL_CACHE_SIZE)
+
+    def on_mount(self) -> None:
+        self.prefetch(Path(self.path).expanduser().resolve())
+
+    def notify_style_update(self) -> None:
+        # Labels are styled with component classes, e.g. theme was changed
+        self.labels.clear()
+        super().notify_style_update()
 
     def render_label(self, node: TreeNode[DirEntry], base_style: Style, style: Style) -> Text:
         """Render a label for the given node.
@@ -29,17 +79,26 @@ class MusicDirectoryTree(DirectoryTree):
         Returns:
             A Rich Text object containing the label.
         """
-        node_label: Text = node._label.copy()
-        node_label.stylize(style)
-        filename = node_label.plain
-        music_file = MusicFile.from_string(filename)
-
         # If the tree isn't mounted yet we can't use component classes to stylize
         # the label fully, so we return early.
         if not self.is_mounted:
+            node_label: Text = node._label.copy()
+            node_label.stylize(style)
             return node_label
 
-        if node._allow_expand and not music_file.is_logicx:
+        key = (node._label.plain, node._allow_expand, base_style, style)
+        label = self.labels.get(key)
+        if label is None:
+            label = self.labels[key] = self.style_label(node._label, *key[1:])
+
+        return label
+
+    def style_label(self, label: Text, allow_expand: bool, base_style: Style, style: Style) -> Text:
+        node_label = label.copy()
+        node_label.stylize(style)
+        filename = node_label.plain
+
+        if allow_expand and not filename.endswith(LOGICX_EXT):
             prefix = (
                 "",
                 base_style + TOGGLE_STYLE,
@@ -49,7 +108,6 @@ class MusicDirectoryTree(DirectoryTree):
             )
         else:
             prefix = ("", base_style)
-            # prefix = (f'{music_file.file_type.emoji}  ', base_style)
             node_label.stylize_before(
                 self.get_component_rich_style("directory-tree--file", partial=True),
             )
@@ -65,3 +123,84 @@ class MusicDirectoryTree(DirectoryTree):
 
     def filter_paths(self, paths: Iterable[Path]) -> Iterable[Path]:
         return [path for path in paths if not path.name.startswith(".")]
+
+    # Listings
+
+    def _directory_content(self, location: Path, worker: Worker) -> Iterator[Path]:
+        for name, _ in self.list_dir(location, worker):
+            yield location / name
+
+    def reload_node(self, node: TreeNode[DirEntry]) -> AwaitComplete:
+        if node.data is not None:
+            self.forget_listings(node.data.path.expanduser().resolve())
+        return super().reload_node(node)
+
+    def forget_listings(self, location: Path) -> None:
+        """Drop listings of directory and its subdirectories, they are listed again."""
+        with self.listings_lock:
+            for path in list(self.listings.keys()):
+                if path.is_relative_to(location):
+                    self.listings.discard(path)
+
+    def list_dir(self, location: Path, worker: Worker) -> list[tuple[str, bool]]:
+        """Names of visible children of directory with flags whether they are directories.
+
+        Listing is kept while mtime of directory is the same, so prefetched listing is
+        used when node is expanded, but changed directory is listed again.
+        """
+        try:
+            mtime_ns = os.stat(location).st_mtime_ns
+        except OSError:
+            return []
+
+        with self.listings_lock:
+            cached = self.listings.get(location)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+
+        listing: list[tuple[str, bool]] = []
+        try:
+            for entry in scan_dir(location):
+                if worker.is_cancelled:
+                    # Partial listing isn't kept
+                    return listing
+                if not entry.name.startswith("."):
+                    listing.append((entry.name, entry.is_dir()))
+        except OSError:
+            pass
+
+        with self.listings_lock:
+            self.listings.set(location, (mtime_ns, listing))
+        return listing
+
+    @work(thread=True, group="prefetch", exclusive=True)
+    def prefetch(self, location: Path) -> None:
+        """List highlighted directory and its subdirectories and render their labels."""
+        worker = get_current_worker()
+        listings = [self.list_dir(location, worker)]
+        for name, is_dir in listings[0]:
+            if worker.is_cancelled:
+                return
+            if is_dir and not name.endswith(LOGICX_EXT):
+                listings.append(self.list_dir(location / name, worker))
+
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self.prefetch_labels, listings)
+
+    def prefetch_labels(self, listings: list[list[tuple[str, bool]]]) -> None:
+        # Labels are measured without styles whenever nodes are added to tree
+        for listing in listings:
+            for name, is_dir in listing:
+                key = (name, is_dir, NULL_STYLE, NULL_STYLE)
+                if key not in self.labels:
+                    self.labels[key] = self.style_label(Text(name), *key[1:])
+
+    def on_tree_node_highlighted(self, event: Tree.NodeHighlighted[DirEntry]) -> None:
+        if event.node.data is None or not event.node.allow_expand:
+            return
+
+        self.prefetch(event.node.data.path.expanduser().resolve())
+
+    def on_tree_node_collapsed(self, event: Tree.NodeCollapsed[DirEntry]) -> None:
+        if event.node.data is not None:
+            self.forget_listings(event.node.data.path.expanduser().resolve())
@@ -1,10 +1,15 @@
-from app import TaggingApp
-
-# from music import MusicClient
+import sys
 
 
 def main() -> None:
-    # MusicClient().tag_options
+    # Headless commands don't need Textual, so TUI is imported only when it's started
+    if len(sys.argv) > 1:
+        from music.cli import main as cli_main
+
+        sys.exit(cli_main(sys.argv[1:]))
+
+    from app import TaggingApp
+
     app = TaggingApp()
     app.run()
 
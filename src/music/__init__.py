@@ -2,8 +2,10 @@ from .client import MusicClient
 from .directories import MusicDir
 from .files import (
     MusicFile,
+    MusicFiles,
     MusicFileType,
 )
+from .library import MusicLibrary
 from .tags import (
     MusicDirTags,
     Tag,
@@ -0,0 +1,399 @@
+"""Duration and format of audio files read from their headers.
+
+Files are memory-mapped and only headers are touched: chunk headers of WAV, the first
+frame (with Xing, Info or VBRI header) of MP3 and the `moov` atom of M4A, so reading
+metadata of a long bounce doesn't read its samples.
+"""
+
+import mmap
+import os
+import struct
+from collections import Counter
+from dataclasses import (
+    dataclass,
+    field,
+)
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Iterable,
+    Iterator,
+)
+
+from .directories import MusicDir
+from .files import (
+    MusicFileType,
+    get_ext,
+)
+from .profiling import (
+    profiler,
+    timed,
+)
+
+if TYPE_CHECKING:
+    from .cache import FileCache
+
+AUDIO_CACHE = "audio"
+
+# First MP3 frame is searched this far after ID3 tag, e.g. past padding
+MP3_SYNC_SEARCH = 64 * 1024
+MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG 1
+    2: (22050, 24000, 16000),  # MPEG 2
+    0: (11025, 12000, 8000),  # MPEG 2.5
+}
+# Bitrates in kbps by (MPEG 1, layer)
+MP3_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+
+class AudioError(ValueError):
+    """Audio file header can't be read."""
+
+
+@dataclass(frozen=True, slots=True)
+class AudioInfo:
+    duration: float
+    sample_rate: int
+    channels: int
+    # None for lossy formats, which have no fixed bit depth
+    bits: int | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "duration": self.duration,
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "bits": self.bits,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AudioInfo":
+        return cls(**data)
+
+
+def format_duration(seconds: float) -> str:
+    """Duration as `m:ss` or `h:mm:ss`."""
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02}:{seconds:02}"
+    return f"{minutes}:{seconds:02}"
+
+
+def read_wav(data: mmap.mmap) -> AudioInfo:
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise AudioError("Not a RIFF WAVE file")
+
+    fmt = None
+    data_size = None
+    offset = 12
+    # Chunks are walked by their headers, samples in `data` chunk are skipped
+    while offset + 8 <= len(data) and (fmt is None or data_size is None):
+        chunk_id, size = struct.unpack_from("<4sI", data, offset)
+        body = offset + 8
+
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", data, body)
+        elif chunk_id == b"data":
+            # Size of unfinished recording can be bigger than the file
+            data_size = min(size, len(data) - body)
+
+        offset = body + size + (size & 1)
+
+    if fmt is None or data_size is None:
+        raise AudioError("No fmt or data chunk")
+
+    _, channels, sample_rate, byte_rate, _, bits = fmt
+    if not byte_rate:
+        raise AudioError("Byte rate is 0")
+
+    return AudioInfo(
+        duration=data_size / byte_rate,
+        sample_rate=sample_rate,
+        channels=channels,
+        bits=bits,
+    )
+
+
+def read_mp3(data: mmap.mmap) -> AudioInfo:
+    start = 0
+    if data[:3] == b"ID3":
+        # Size of ID3v2 tag is synchsafe integer, 7 bits per byte
+        size = 0
+        for byte in data[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        start = 10 + size + (10 if data[5] & 0x10 else 0)
+
+    position = data.find(b"\xff", start, start + MP3_SYNC_SEARCH)
+    while position != -1:
+        (header,) = struct.unpack_from(">I", data, position)
+        if (header >> 21) & 0x7FF == 0x7FF and is_mp3_header(header):
+            return read_mp3_frame(data, position, header)
+        position = data.find(b"\xff", position + 1, start + MP3_SYNC_SEARCH)
+
+    raise AudioError("No MPEG audio frame")
+
+
+def is_mp3_header(header: int) -> bool:
+    version = (header >> 19) & 3
+    layer = (header >> 17) & 3
+    bitrate_index = (header >> 12) & 0xF
+    sample_rate_index = (header >> 10) & 3
+    return version != 1 and layer != 0 and bitrate_index not in (0, 15) and sample_rate_index != 3
+
+
+def read_mp3_frame(data: mmap.mmap, position: int, header: int) -> AudioInfo:
+    version = (header >> 19) & 3
+    layer = 4 - ((header >> 17) & 3)
+    mpeg1 = version == 3
+    sample_rate = MP3_SAMPLE_RATES[version][(header >> 10) & 3]
+    bitrate = MP3_BITRATES[(mpeg1, layer)][(header >> 12) & 0xF] * 1000
+    mono = (header >> 6) & 3 == 3
+
+    if layer == 1:
+        frame_samples = 384
+    elif layer == 2 or mpeg1:
+        frame_samples = 1152
+    else:
+        frame_samples = 576
+
+    # VBR files have number of frames in Xing (Info for CBR) or VBRI header of first frame
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    xing = position + 4 + side_info
+    frames = None
+    audio_start = position
+    if data[xing : xing + 4] in (b"Xing", b"Info"):
+        (flags,) = struct.unpack_from(">I", data, xing + 4)
+        if flags & 1:
+            (frames,) = struct.unpack_from(">I", data, xing + 8)
+        # Frame with the header is silent
+        audio_start += mp3_frame_size(layer, bitrate, sample_rate, frame_samples, header)
+    elif data[position + 36 : position + 40] == b"VBRI":
+        (frames,) = struct.unpack_from(">I", data, position + 36 + 14)
+
+    if frames:
+        duration = frames * frame_samples / sample_rate
+    else:
+        # Constant bitrate, audio is everything from the first frame except ID3v1 tag
+        size = len(data) - audio_start - (128 if data[-128:-125] == b"TAG" else 0)
+        duration = max(size, 0) * 8 / bitrate
+
+    return AudioInfo(duration=duration, sample_rate=sample_rate, channels=1 if mono else 2)
+
+
+def mp3_frame_size(
+    layer: int, bitrate: int, sample_rate: int, frame_samples: int, header: int
+) -> int:
+    padding = (header >> 9) & 1
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4
+    return frame_samples // 8 * bitrate // sample_rate + padding
+
+
+def iter_atoms(data: mmap.mmap, start: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """Yield (type, body start, end) of MP4 atoms between offsets."""
+    offset = start
+    while offset + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, offset)
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack_from(">Q", data, offset + 8)
+            header = 16
+        elif size == 0:
+            # Atom lasts until the end of file
+            size = end - offset
+
+        if size < header:
+            raise AudioError(f"Bad size of atom {kind!r}")
+
+        yield kind, offset + header, min(offset + size, end)
+        offset += size
+
+
+def find_atom(data: mmap.mmap, start: int, end: int, *path: bytes) -> tuple[int, int] | None:
+    for kind, body, atom_end in iter_atoms(data, start, end):
+        if kind == path[0]:
+            if len(path) == 1:
+                return body, atom_end
+            return find_atom(data, body, atom_end, *path[1:])
+
+    return None
+
+
+def read_m4a(data: mmap.mmap) -> AudioInfo:
+    # `moov` is often at the end of file, after samples in `mdat`, which are never read
+    moov = find_atom(data, 0, len(data), b"moov")
+    if moov is None:
+        raise AudioError("No moov atom")
+
+    for kind, body, end in iter_atoms(data, *moov):
+        if kind != b"trak":
+            continue
+
+        hdlr = find_atom(data, body, end, b"mdia", b"hdlr")
+        if hdlr is None or data[hdlr[0] + 8 : hdlr[0] + 12] != b"soun":
+            continue
+
+        mdhd = find_atom(data, body, end, b"mdia", b"mdhd")
+        stsd = find_atom(data, body, end, b"mdia", b"minf", b"stbl", b"stsd")
+        if mdhd is None or stsd is None:
+            break
+
+        if data[mdhd[0]] == 1:
+            timescale, duration = struct.unpack_from(">IQ", data, mdhd[0] + 20)
+        else:
+            timescale, duration = struct.unpack_from(">II", data, mdhd[0] + 12)
+
+        # Audio sample entry: atom header, 6 reserved bytes, data reference index, 8 reserved
+        # bytes, then channel count, sample size, 4 reserved bytes and 16.16 sample rate
+        entry = stsd[0] + 8
+        entry_type = data[entry + 4 : entry + 8]
+        channels, sample_size = struct.unpack_from(">HH", data, entry + 24)
+        (sample_rate,) = struct.unpack_from(">I", data, entry + 32)
+
+        if not timescale:
+            raise AudioError("Time scale is 0")
+
+        return AudioInfo(
+            duration=duration / timescale,
+            # Rates above 65535 don't fit 16.16 number, time scale is the sample rate then
+            sample_rate=(sample_rate >> 16) or timescale,
+            channels=channels,
+            # Only lossless ALAC has bit depth
+            bits=sample_size if entry_type == b"alac" else None,
+        )
+
+    raise AudioError("No sound track")
+
+
+READERS: dict[str, Callable[[mmap.mmap], AudioInfo]] = {
+    ".wav": read_wav,
+    ".mp3": read_mp3,
+    ".m4a": read_m4a,
+    ".mp4": read_m4a,
+}
+
+
+@timed("read_audio_info")
+def read_audio_info(path: str | Path) -> AudioInfo:
+    reader = READERS.get(get_ext(str(path)).lower())
+    if reader is None:
+        raise AudioError(f"Unsupported audio file {Path(path).name}")
+
+    with open(path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise AudioError("Empty file")
+
+        if profiler.enabled:
+            profiler.count("mmap")
+
+        try:
+            return reader(data)
+        except (struct.error, IndexError) as e:
+            raise AudioError(f"Truncated header: {e}")
+        finally:
+            data.close()
+
+
+@dataclass
+class DirAudio:
+    """Audio files of one music directory."""
+
+    mdir: MusicDir
+    infos: dict[str, AudioInfo] = field(default_factory=dict)
+    # Files whose headers can't be read, with error messages
+    errors: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return sum(info.duration for info in self.infos.values())
+
+
+def read_dir_audio(mdir: MusicDir, cache: "FileCache | None" = None) -> DirAudio:
+    """Read audio files of music directory, cached metadata of unchanged files is reused."""
+    result = DirAudio(mdir=mdir)
+
+    for music_file in mdir.get_files(MusicFileType.AUDIO):
+        path = os.path.join(music_file.parent, music_file.name)
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            result.errors[path] = str(e)
+            continue
+
+        # Unreadable headers are cached too, so broken files aren't read again
+        value = cache.get(path, stat.st_size, stat.st_mtime_ns) if cache else None
+        if value is None:
+            try:
+                value = read_audio_info(path).to_dict()
+            except OSError as e:
+                result.errors[path] = str(e)
+                continue
+            except AudioError as e:
+                value = {"error": str(e)}
+
+            if cache:
+                cache.put(path, stat.st_size, stat.st_mtime_ns, value)
+
+        if "error" in value:
+            result.errors[path] = value["error"]
+        else:
+            result.infos[path] = AudioInfo.from_dict(value)
+
+    return result
+
+
+def read_library_audio(
+    music_dirs: Iterable[MusicDir],
+    cache: "FileCache | None" = None,
+    workers: int = 8,
+) -> Iterator[DirAudio]:
+    """Read audio files of many music directories on thread pool, yielded as they complete."""
+    music_dirs = list(music_dirs)
+    if workers <= 1:
+        for mdir in music_dirs:
+            yield read_dir_audio(mdir, cache)
+        return
+
+    # Imported here, because it's heavy and headless commands must start fast
+    from concurrent.futures import (
+        ThreadPoolExecutor,
+        as_completed,
+    )
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audio")
+    try:
+        tasks = [executor.submit(read_dir_audio, mdir, cache) for mdir in music_dirs]
+        for task in as_completed(tasks):
+            yield task.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+@dataclass
+class AudioStats:
+    """Total length of audio files in library and in every root dir."""
+
+    files: int = 0
+    failed: int = 0
+    duration: float = 0.0
+    roots: dict[str, float] = field(default_factory=dict)
+    sample_rates: Counter[int] = field(default_factory=Counter)
+
+    def add(self, result: DirAudio) -> None:
+        root = result.mdir.root_dir.name
+        self.files += len(result.infos)
+        self.failed += len(result.errors)
+        self.duration += result.duration
+        self.roots[root] = self.roots.get(root, 0.0) + result.duration
+        self.sample_rates.update(info.sample_rate for info in result.infos.values())
@@ -0,0 +1,178 @@
+import re
+from dataclasses import dataclass
+from enum import Enum
+from typing import (
+    Iterable,
+    Iterator,
+)
+
+from .directories import MusicDir
+from .storage import TagStorage
+from .tags import (
+    TAG_FILE,
+    MusicDirTags,
+    Tag,
+    TagOptions,
+    TagValue,
+)
+
+EDIT_PATTERN = re.compile(r"^\s*(\w+)\s*([+-]?)=\s*(.+?)\s*$")
+
+
+class TagEditError(ValueError):
+    """Tag edit can't be parsed."""
+
+
+class EditAction(Enum):
+    SET = ""
+    ADD = "+"
+    REMOVE = "-"
+
+
+@dataclass(frozen=True)
+class TagEdit:
+    """Change of one tag value, e.g. `mood=epic`, `mood+=epic` or `mood-=epic`."""
+
+    action: EditAction
+    tag: Tag
+    value: str
+
+    def __str__(self) -> str:
+        return f"{self.tag.name}{self.action.value}={self.value}"
+
+    @classmethod
+    def parse(cls, expression: str, tag_options: TagOptions) -> "TagEdit":
+        match = EDIT_PATTERN.match(expression)
+        if not match:
+            raise TagEditError(f"Expected tag=value, tag+=value or tag-=value, got {expression!r}")
+
+        name, action, value = match.groups()
+        tag = tag_options.get(name)
+        if not tag:
+            raise TagEditError(f"Tag with name {name} not found")
+
+        # Tag files are written by hand too, so only typos in bulk edits are rejected
+        if value not in tag.values:
+            raise TagEditError(f"Tag {name} has no value {value!r}")
+
+        return cls(action=EditAction(action), tag=tag, value=value)
+
+    def apply(self, tags: dict[Tag, TagValue]) -> None:
+        current = tags.get(self.tag)
+
+        if not self.tag.multiselect:
+            if self.action == EditAction.REMOVE:
+                if current == self.value:
+                    del tags[self.tag]
+            else:
+                # Single value tags have nothing to add to
+                tags[self.tag] = self.value
+            return
+
+        # Multiselect tag with one value is read from file as a string
+        values = [current] if isinstance(current, str) else list(current or [])
+        values = [v for v in values if v]
+
+        if self.action == EditAction.SET:
+            values = [self.value]
+        elif self.action == EditAction.ADD:
+            if self.value not in values:
+                values.append(self.value)
+        elif self.value in values:
+            values.remove(self.value)
+
+        if values:
+            tags[self.tag] = values
+        else:
+            tags.pop(self.tag, None)
+
+
+def parse_edits(expressions: Iterable[str], tag_options: TagOptions) -> list[TagEdit]:
+    edits = [TagEdit.parse(expression, tag_options) for expression in expressions]
+    if not edits:
+        raise TagEditError("No tag edits")
+    return edits
+
+
+@dataclass
+class BulkResult:
+    """Outcome of bulk edit of one music directory."""
+
+    mdir: MusicDir
+    # Tags after edit, None if edit failed
+    tags: MusicDirTags | None = None
+    changed: bool = False
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def edit_tags(
+    mdir: MusicDir,
+    edits: list[TagEdit],
+    tag_options: TagOptions,
+    storage: TagStorage,
+) -> BulkResult:
+    """Read tags of music directory, apply edits and write them back if anything changed.
+
+    Untagged directories get new tags with edited tags only.
+    """
+    try:
+        tags = storage.read(mdir.path)
+        if tags is None:
+            tags = MusicDirTags(path=mdir.path / TAG_FILE, tags={}, description="")
+
+        # Read tags can be shared by cache, so they are edited as a copy
+        values = dict(tags.tags)
+        for edit in edits:
+            edit.apply(values)
+
+        # Tags are written in the same order as TaggingScreen writes them
+        values = {tag: values[tag] for tag in tag_options.values() if tag in values}
+        if values == tags.tags:
+            # E.g. removed value wasn't set, untagged directories stay untagged
+            return BulkResult(mdir=mdir, tags=tags)
+
+        tags = MusicDirTags(path=tags.path, tags=values, description=tags.description)
+        storage.write(tags)
+    except (OSError, ValueError) as e:
+        return BulkResult(mdir=mdir, error=str(e))
+
+    return BulkResult(mdir=mdir, tags=tags, changed=True)
+
+
+def bulk_edit_tags(
+    music_dirs: Iterable[MusicDir],
+    edits: list[TagEdit],
+    tag_options: TagOptions,
+    storage: TagStorage,
+    workers: int = 8,
+) -> Iterator[BulkResult]:
+    """Edit tags of many music directories, results are yielded as they complete.
+
+    Every directory is read and written on thread pool, because with tag files on network
+    storage the time is spent waiting for I/O.
+    """
+    music_dirs = list(music_dirs)
+    if workers <= 1:
+        for mdir in music_dirs:
+            yield edit_tags(mdir, edits, tag_options, storage)
+        return
+
+    # Imported here, because it's heavy and headless commands must start fast
+    from concurrent.futures import (
+        ThreadPoolExecutor,
+        as_completed,
+    )
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk")
+    try:
+        tasks = [
+            executor.submit(edit_tags, mdir, edits, tag_options, storage) for mdir in music_dirs
+        ]
+        for task in as_completed(tasks):
+            yield task.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
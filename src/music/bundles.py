@@ -0,0 +1,176 @@
+"""Contents of Logic X projects, which are directories (bundles) shown as single files.
+
+Bundle is walked with `scandir` to sum sizes of its files and to count its alternatives
+and audio assets. Results are cached by signature of bundle, the latest mtime of its
+top directories: Logic saves projects by replacing files, which changes mtime of their
+directories, e.g. `Alternatives/000` or `Media/Audio Files`. So the signature takes a
+few `stat` calls instead of a walk of the whole bundle.
+"""
+
+import os
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import (
+    TYPE_CHECKING,
+    Iterable,
+    Iterator,
+)
+
+from .directories import MusicDir
+from .files import (
+    AUDIO_FILE_EXT,
+    MusicFileType,
+    get_ext,
+    scan_dir,
+)
+from .profiling import timed
+
+if TYPE_CHECKING:
+    from .cache import FileCache
+
+BUNDLE_CACHE = "bundle"
+ALTERNATIVES_DIR = "Alternatives"
+# Directories of bundle whose mtimes are the signature, their subdirectories are included
+SIGNATURE_DIRS = (ALTERNATIVES_DIR, "Media", "Resources")
+
+
+@dataclass(frozen=True, slots=True)
+class BundleInfo:
+    size: int
+    files: int
+    audio_files: int
+    alternatives: int
+    # The latest mtime of files in bundle, in seconds
+    mtime: float
+
+    def to_dict(self) -> dict:
+        return {
+            "size": self.size,
+            "files": self.files,
+            "audio_files": self.audio_files,
+            "alternatives": self.alternatives,
+            "mtime": self.mtime,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BundleInfo":
+        return cls(**data)
+
+
+def get_signature(path: str) -> int:
+    """The latest mtime of bundle and its top directories, in nanoseconds."""
+    signature = os.stat(path).st_mtime_ns
+    for name in SIGNATURE_DIRS:
+        top = os.path.join(path, name)
+        try:
+            signature = max(signature, os.stat(top).st_mtime_ns)
+            entries = scan_dir(top)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                signature = max(signature, entry.stat(follow_symlinks=False).st_mtime_ns)
+
+    return signature
+
+
+@timed("inspect_bundle")
+def inspect_bundle(path: str) -> BundleInfo:
+    """Walk all files of bundle."""
+    size = files = audio_files = 0
+    mtime_ns = 0
+    alternatives = 0
+
+    stack = [path]
+    while stack:
+        directory = stack.pop()
+        for entry in scan_dir(directory):
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+                if directory == os.path.join(path, ALTERNATIVES_DIR) and entry.name.isdigit():
+                    alternatives += 1
+                continue
+
+            stat = entry.stat(follow_symlinks=False)
+            files += 1
+            size += stat.st_size
+            mtime_ns = max(mtime_ns, stat.st_mtime_ns)
+            if get_ext(entry.name).lower() in AUDIO_FILE_EXT:
+                audio_files += 1
+
+    return BundleInfo(
+        size=size,
+        files=files,
+        audio_files=audio_files,
+        alternatives=alternatives,
+        mtime=mtime_ns / 1e9,
+    )
+
+
+@dataclass
+class DirBundles:
+    """Logic X bundles of one music directory."""
+
+    mdir: MusicDir
+    infos: dict[str, BundleInfo] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return sum(info.size for info in self.infos.values())
+
+
+def read_dir_bundles(mdir: MusicDir, cache: "FileCache | None" = None) -> DirBundles:
+    """Inspect bundles of music directory, unchanged bundles are taken from cache."""
+    result = DirBundles(mdir=mdir)
+
+    for music_file in mdir.get_files(MusicFileType.LOGIC_X):
+        path = os.path.join(music_file.parent, music_file.name)
+        try:
+            signature = get_signature(path)
+            cached = cache.get(path, 0, signature) if cache else None
+            if cached is not None:
+                result.infos[path] = BundleInfo.from_dict(cached)
+                continue
+
+            info = inspect_bundle(path)
+        except OSError as e:
+            result.errors[path] = str(e)
+            continue
+
+        result.infos[path] = info
+        if cache:
+            # Bundle is a directory, so only its signature is compared
+            cache.put(path, 0, signature, info.to_dict())
+
+    return result
+
+
+def read_library_bundles(
+    music_dirs: Iterable[MusicDir],
+    cache: "FileCache | None" = None,
+    workers: int = 8,
+) -> Iterator[DirBundles]:
+    """Inspect bundles of many music directories on thread pool, yielded as they complete."""
+    music_dirs = list(music_dirs)
+    if workers <= 1:
+        for mdir in music_dirs:
+            yield read_dir_bundles(mdir, cache)
+        return
+
+    # Imported here, because it's heavy and headless commands must start fast
+    from concurrent.futures import (
+        ThreadPoolExecutor,
+        as_completed,
+    )
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bundles")
+    try:
+        tasks = [executor.submit(read_dir_bundles, mdir, cache) for mdir in music_dirs]
+        for task in as_completed(tasks):
+            yield task.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
@@ -0,0 +1,87 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+CACHE_FILE = "cache.db"
+
+# Cache is dropped if it was created with another schema version
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (kind, path)
+)
+"""
+
+
+class FileCache:
+    """Persistent SQLite cache of values computed from files, e.g. audio metadata.
+
+    Value is valid while size and mtime of its file stay the same. Caches of every `kind`
+    share one database file, every cache loads only its own values with single query and
+    changes are written on flush. Cache can be used from many threads.
+    """
+
+    def __init__(self, path: str | Path, kind: str):
+        """Initialize class instance."""
+        self.path = Path(path)
+        self.kind = kind
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.migrate()
+
+        cursor = self.connection.execute(
+            "SELECT path, size, mtime_ns, value FROM files WHERE kind = ?",
+            (kind,),
+        )
+        self.entries: dict[str, tuple[int, int, str]] = {
+            path: (size, mtime_ns, value) for path, size, mtime_ns, value in cursor
+        }
+        self.updated: dict[str, tuple[int, int, str]] = {}
+
+    def migrate(self) -> None:
+        (version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if version == SCHEMA_VERSION:
+            return
+
+        with self.connection:
+            self.connection.execute("DROP TABLE IF EXISTS files")
+            self.connection.execute(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def get(self, path: str, size: int, mtime_ns: int) -> Any | None:
+        """Cached value of file or None if file changed since value was cached."""
+        entry = self.entries.get(path)
+        if entry is None or entry[0] != size or entry[1] != mtime_ns:
+            return None
+
+        return json.loads(entry[2])
+
+    def put(self, path: str, size: int, mtime_ns: int, value: Any) -> None:
+        entry = (size, mtime_ns, json.dumps(value, ensure_ascii=False))
+        with self.lock:
+            self.entries[path] = entry
+            self.updated[path] = entry
+
+    def flush(self) -> None:
+        """Write values cached since previous flush to the database file."""
+        with self.lock:
+            updated, self.updated = self.updated, {}
+            if not updated:
+                return
+
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                    ((self.kind, path, *entry) for path, entry in updated.items()),
+                )
+
+    def close(self) -> None:
+        self.flush()
+        self.connection.close()
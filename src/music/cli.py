@@ -0,0 +1,358 @@
+"""Headless command line interface.
+
+Only the `music` package is imported here, so commands start without loading Textual.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Sequence
+
+from .audio import (
+    AudioStats,
+    format_duration,
+)
+from .bulk import (
+    TagEditError,
+    parse_edits,
+)
+from .bundles import BundleInfo
+from .client import MusicClient
+from .export import (
+    CSV_FORMAT,
+    EXPORT_FORMATS,
+    JSON_LINES_FORMAT,
+    SQLITE_FORMAT,
+    CsvWriter,
+    ExportError,
+    JsonLinesWriter,
+    RecordWriter,
+    SqliteWriter,
+    select_columns,
+)
+from .files import MusicFileType
+from .library import MusicLibrary
+from .profiling import (
+    FORMATS,
+    JSON_FORMAT,
+    enable_from_env,
+    profiler,
+)
+from .query import QueryError
+from .statistics import format_size
+from .storage import (
+    JSON_LINES_STORAGE,
+    TEXT_STORAGE,
+    JsonLinesStorage,
+    copy_tags,
+    sync_storages,
+)
+
+STORAGES = [TEXT_STORAGE, JSON_LINES_STORAGE]
+
+
+def scan(library: MusicLibrary, args: argparse.Namespace) -> int:
+    """Print paths of all music directories."""
+    count = 0
+    for mdir in library.stream():
+        count += 1
+        if not args.count:
+            print(mdir.path)
+
+    if args.count:
+        print(count)
+    return 0
+
+
+def stats(library: MusicLibrary, args: argparse.Namespace) -> int:
+    """Print library statistics."""
+    result = library.get_stats()
+
+    print(f"Music dirs: {result.dirs}")
+    print(f"Tagged: {result.tagged}")
+    print(f"Untagged: {result.untagged}")
+    print(f"Files: {result.files} ({format_size(result.size)})")
+    for file_type in MusicFileType:
+        print(f"  {file_type.name}: {result.file_types[file_type]}")
+
+    for name, root in result.roots.items():
+        print(f"Root {name}: {root.dirs} dirs, {root.tagged} tagged, {root.files} files")
+
+    for name, counter in result.tag_values.items():
+        values = ", ".join(f"{value} ({count})" for value, count in counter.most_common() if count)
+        print(f"Tag {name}: {values}")
+
+    if args.audio:
+        audio = AudioStats()
+        for dir_audio in library.read_audio(library.load()):
+            audio.add(dir_audio)
+
+        print(f"Audio: {audio.files} files ({format_duration(audio.duration)})")
+        if audio.failed:
+            print(f"  unreadable: {audio.failed} files")
+        for name, duration in audio.roots.items():
+            print(f"Root {name}: {format_duration(duration)}")
+        rates = ", ".join(
+            f"{rate} Hz ({count})" for rate, count in audio.sample_rates.most_common()
+        )
+        print(f"Sample rates: {rates}")
+
+    return 0
+
+
+def tags(library: MusicLibrary, args: argparse.Namespace) -> int:
+    """Print all unique tags in music directory names."""
+    library.client.show_music_dir_tags()
+    return 0
+
+
+def query(library: MusicLibrary, args: argparse.Namespace) -> int:
+    """Print paths of music directories matching tag query."""
+    try:
+        matches = library.query(args.expression)
+    except QueryError as e:
+        print(f"Invalid query: {e}", file=sys.stderr)
+        return 2
+
+    for mdir in matches:
+        print(mdir.path)
+    return 0
+
+
+def tag(library: MusicLibrary, args: argparse.Namespace) -> int:
+    """Set, add or remove tag values of many music directories."""
+    try:
+        edits = parse_edits(args.edits, library.tag_options)
+        if args.query:
+            music_dirs = library.query(args.query)
+        else:
+            music_dirs = [library[library.index_of(path.absolute())] for path in args.paths]
+    except (TagEditError, QueryError) as e:
+        print(f"Invalid arguments: {e}", file=sys.stderr)
+        return 2
+    except KeyError as e:
+        print(f"Not a music dir: {e}", file=sys.stderr)
+        return 2
+
+    changed = failed = 0
+    for result in library.bulk_tag(music_dirs, edits):
+        if not result.ok:
+            failed += 1
+            print(f"FAILED {result.mdir.path}: {result.error}", file=sys.stderr)
+        elif result.changed:
+            changed += 1
+            if args.verbose:
+                print(f"changed {result.mdir.path}")
+
+    print(f"{len(music_dirs)} dirs: {changed} changed, {failed} failed")
+    return 1 if failed else 0
+
+
+def storage(library: MusicLibrary, args: argparse.Namespace) -> int:
+    """Copy, sync or compact tag storages of music directories."""
+    client = library.client
+
+    if args.action == "compact":
+        log = client.get_tag_storage(JSON_LINES_STORAGE)
+        if not isinstance(log, JsonLinesStorage):
+            print(f"Tag storage {log.name} can't be compacted", file=sys.stderr)
+            return 2
+
+        log.compact()
+        print(f"Compacted: {len(log.records)} dirs")
+        return 0
+
+    source = client.get_tag_storage(args.source)
+    target = client.get_tag_storage(args.target)
+    if source.name == target.name:
+        print("Source and target storages are the same", file=sys.stderr)
+        return 2
+
+    # Only copying and syncing need music directories, compaction doesn't crawl library
+    paths = [mdir.path for mdir in library.load()]
+    try:
+        if args.action == "copy":
+            print(f"Copied to {target.name}: {copy_tags(source, target, paths)} dirs")
+        else:
+            result = sync_storages(source, target, paths)
+            print(f"Copied to {source.name}: {result.to_first} dirs")
+            print(f"Copied to {target.name}: {result.to_second} dirs")
+    finally:
+        source.close()
+        target.close()
+
+    return 0
+
+
+def bundles(library: MusicLibrary, args: argparse.Namespace) -> int:
+    """Print size, audio assets and alternatives of Logic X projects, the largest first."""
+    # Imported here, because only this command formats dates
+    from datetime import datetime
+
+    infos: list[tuple[str, BundleInfo]] = []
+    for result in library.read_bundles(library.load()):
+        infos.extend(result.infos.items())
+        for path, error in result.errors.items():
+            print(f"FAILED {path}: {error}", file=sys.stderr)
+
+    infos.sort(key=lambda item: item[1].size, reverse=True)
+    for path, info in infos[: args.limit]:
+        modified = datetime.fromtimestamp(info.mtime).strftime("%Y-%m-%d %H:%M")
+        print(
+            f"{format_size(info.size):>10}  {info.audio_files:4} audio  "
+            f"{info.alternatives:3} alt  {modified}  {path}"
+        )
+
+    total = sum(info.size for _, info in infos)
+    print(f"{len(infos)} projects ({format_size(total)})")
+    return 0
+
+
+def duplicates(library: MusicLibrary, args: argparse.Namespace) -> int:
+    """Print audio files with the same content, the most wasted space first."""
+
+    def progress(stage: str, done: int, total: int) -> None:
+        print(f"Hashing {stage}: {done} of {total} files", end="\r", file=sys.stderr)
+
+    report = library.find_duplicates(progress if args.progress else None)
+    if args.progress:
+        print(file=sys.stderr)
+
+    for group in report.groups:
+        print(f"{len(group.paths)} copies of {format_size(group.size)}:")
+        for path in group.paths:
+            print(f"  {path}")
+
+    for path, error in report.errors.items():
+        print(f"FAILED {path}: {error}", file=sys.stderr)
+
+    hashed = ", ".join(f"{count} {stage}" for stage, count in report.hashed.items())
+    print(
+        f"{report.files} audio files, {len(report.groups)} duplicated "
+        f"({format_size(report.wasted)} wasted), hashed: {hashed}"
+    )
+    return 0
+
+
+def export(library: MusicLibrary, args: argparse.Namespace) -> int:
+    """Write one record per music directory as CSV, JSON lines or SQLite table."""
+    try:
+        names = args.columns.split(",") if args.columns is not None else None
+        columns = select_columns(library.tag_options, names)
+    except ExportError as e:
+        print(f"Invalid columns: {e}", file=sys.stderr)
+        return 2
+
+    if args.format == SQLITE_FORMAT and args.output is None:
+        print("SQLite export needs --output", file=sys.stderr)
+        return 2
+
+    # Rows are written as they are exported, so output is opened only after checks
+    file = None
+    output: RecordWriter
+    if args.format == SQLITE_FORMAT:
+        output = SqliteWriter(args.output, columns)
+    else:
+        if args.output is not None:
+            file = open(args.output, "w", newline="" if args.format == CSV_FORMAT else None)
+        stream = file or sys.stdout
+        if args.format == CSV_FORMAT:
+            output = CsvWriter(stream, columns)
+        else:
+            output = JsonLinesWriter(stream, columns)
+
+    try:
+        result = library.export(output, args.workers)
+    finally:
+        if file is not None:
+            file.close()
+
+    if result.errors:
+        print(f"{result.errors} tag files can't be parsed, exported without tags", file=sys.stderr)
+    if args.output is not None:
+        print(f"Exported {result.dirs} dirs to {args.output}", file=sys.stderr)
+    return 0
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="music-tags", description=__doc__)
+    parser.add_argument("--config", default="config/local.toml", help="path to TOML config")
+    parser.add_argument("--profile", type=Path, metavar="PATH", help="write profile on exit")
+    parser.add_argument("--profile-format", choices=FORMATS, default=JSON_FORMAT)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan_parser = commands.add_parser("scan", help=scan.__doc__)
+    scan_parser.add_argument("--count", action="store_true", help="print only number of dirs")
+    scan_parser.set_defaults(handler=scan)
+
+    stats_parser = commands.add_parser("stats", help=stats.__doc__)
+    stats_parser.add_argument(
+        "--audio", action="store_true", help="read duration of audio files from their headers"
+    )
+    stats_parser.set_defaults(handler=stats)
+
+    commands.add_parser("tags", help=tags.__doc__).set_defaults(handler=tags)
+
+    query_parser = commands.add_parser("query", help=query.__doc__)
+    query_parser.add_argument("expression", help='e.g. "type=heavy AND NOT mood=epic"')
+    query_parser.set_defaults(handler=query)
+
+    tag_parser = commands.add_parser("tag", help=tag.__doc__)
+    tag_parser.add_argument("edits", nargs="+", help="tag=value, tag+=value or tag-=value")
+    selection = tag_parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument("--query", help="edit music dirs matching tag query")
+    selection.add_argument("--path", dest="paths", type=Path, nargs="+", help="music dirs")
+    tag_parser.add_argument("-v", "--verbose", action="store_true", help="print changed dirs")
+    tag_parser.set_defaults(handler=tag)
+
+    storage_parser = commands.add_parser("storage", help=storage.__doc__)
+    storage_parser.add_argument(
+        "action",
+        choices=["copy", "sync", "compact"],
+        help="copy tags from source to target, sync both ways (latest wins) or compact log",
+    )
+    storage_parser.add_argument("--source", choices=STORAGES, default=TEXT_STORAGE)
+    storage_parser.add_argument("--target", choices=STORAGES, default=JSON_LINES_STORAGE)
+    storage_parser.set_defaults(handler=storage)
+
+    bundles_parser = commands.add_parser("bundles", help=bundles.__doc__)
+    bundles_parser.add_argument("--limit", type=int, help="print only this many projects")
+    bundles_parser.set_defaults(handler=bundles)
+
+    duplicates_parser = commands.add_parser("duplicates", help=duplicates.__doc__)
+    duplicates_parser.add_argument(
+        "--progress", action="store_true", help="print hashing progress to stderr"
+    )
+    duplicates_parser.set_defaults(handler=duplicates)
+
+    export_parser = commands.add_parser("export", help=export.__doc__)
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, default=JSON_LINES_FORMAT)
+    export_parser.add_argument(
+        "-o", "--output", type=Path, metavar="PATH", help="file to write, stdout by default"
+    )
+    export_parser.add_argument(
+        "--columns", help="comma-separated columns, e.g. path,type,mood (default: all)"
+    )
+    export_parser.add_argument("--workers", type=int, default=8, help="threads reading tag files")
+    export_parser.set_defaults(handler=export)
+
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = get_parser().parse_args(argv)
+    if args.profile:
+        profiler.enable(args.profile, args.profile_format)
+    else:
+        enable_from_env()
+
+    library = MusicLibrary(MusicClient(config_path=args.config))
+
+    try:
+        return int(args.handler(library, args))
+    except BrokenPipeError:
+        # Output was piped to e.g. `head`, which exited early
+        sys.stderr.close()
+        return 0
+    finally:
+        library.close()
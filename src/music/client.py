@@ -1,26 +1,51 @@
+import threading
 from functools import cached_property
 from pathlib import Path
-from typing import Iterator
+from typing import (
+    TYPE_CHECKING,
+    Iterator,
+)
 
 import toml
 
+from .crawler import (
+    Crawler,
+    crawl_concurrently,
+)
 from .directories import (
-    IGNORED_FILES,
-    LOGICX_EXT,
     MusicDir,
     RootDir,
 )
+from .files import (
+    IGNORED_FILES,
+    LOGICX_EXT,
+)
+from .profiling import timed
+from .schema import TagSchema
+from .storage import (
+    JSON_LINES_FILE,
+    TEXT_STORAGE,
+    TagStorage,
+    create_storage,
+)
 from .tags import (
     Tag,
     TagOptions,
 )
 
+if TYPE_CHECKING:
+    from .cache import FileCache
+    from .index import LibraryIndex
+
 
 class MusicClient:
 
     def __init__(self, config_path: str = "config/local.toml"):
         """Initialize class instance."""
         self.config_path = config_path
+        self.file_caches: dict[str, "FileCache"] = {}
+        # Caches are opened by workers, e.g. of audio and bundles at once
+        self.file_caches_lock = threading.Lock()
 
     def show_music_dir_tags(self) -> None:
         """Show all unique tags located in music dir name (usually in brackets)."""
@@ -33,19 +58,40 @@ class MusicClient:
             if i % 10 == 0:
                 print()
 
+    @timed("MusicClient.find_music_dirs")
     def find_music_dirs(self) -> Iterator[MusicDir]:
         """Locate all music directories that contain at least one file."""
-        for params in self.config["root_dir"].values():
-            params["path"] = Path(params["path"])
-            root_dir = RootDir(**params)
-
-            yield from self.find_music_dir(
-                path=root_dir.path,
+        crawlers = [self.get_crawler(root_dir) for root_dir in self.root_dirs]
+        workers = self.settings.get("workers", 1)
+
+        try:
+            if workers > 1:
+                yield from crawl_concurrently(
+                    crawlers=crawlers,
+                    workers=workers,
+                    ordered=self.settings.get("ordered", True),
+                )
+            else:
+                for crawler in crawlers:
+                    yield from crawler.crawl()
+        finally:
+            if self.index:
+                self.index.flush()
+
+    def get_crawler(self, root_dir: RootDir) -> Crawler:
+        if self.index:
+            return self.index.get_crawler(
                 root_dir=root_dir,
                 ignored_dirs=root_dir.ignored_dirs,
                 ignored_files=root_dir.ignored_files,
             )
 
+        return Crawler(
+            root_dir=root_dir,
+            ignored_dirs=root_dir.ignored_dirs,
+            ignored_files=root_dir.ignored_files,
+        )
+
     def find_music_dir(
         self,
         path: Path,
@@ -54,25 +100,12 @@ class MusicClient:
         ignored_files: list[str] | None = None,
     ) -> Iterator[MusicDir]:
         """Recursively crawl directory and yield music directories."""
-        items = list(path.iterdir())
-        files = [f for f in items if self.is_file(f, ignored_files)]
-        dirs = [d for d in items if self.is_dir(d, ignored_dirs)]
-
-        if files:
-            # If directory has files, yield it and don't go deeper
-            yield MusicDir(
-                path=Path(path),
-                root_dir=root_dir,
-            )
-        elif dirs:
-            # If directory has no files but has subdirs, check them
-            for dir_name in dirs:
-                yield from self.find_music_dir(
-                    path=dir_name,
-                    root_dir=root_dir,
-                    ignored_dirs=ignored_dirs,
-                    ignored_files=ignored_files,
-                )
+        crawler = Crawler(
+            root_dir=root_dir,
+            ignored_dirs=ignored_dirs,
+            ignored_files=ignored_files,
+        )
+        yield from crawler.crawl(path)
 
     def is_dir(
         self,
@@ -104,6 +137,63 @@ class MusicClient:
     def config(self) -> dict:
         return dict(toml.load(self.config_path))
 
+    @cached_property
+    def settings(self) -> dict:
+        """Library settings from `[library]` config section."""
+        return dict(self.config.get("library", {}))
+
+    @cached_property
+    def root_dirs(self) -> list[RootDir]:
+        return [
+            RootDir(**{**params, "path": Path(params["path"])})
+            for params in self.config["root_dir"].values()
+        ]
+
+    @cached_property
+    def index(self) -> "LibraryIndex | None":
+        """Persistent library index, stored next to config file if enabled."""
+        if not self.settings.get("index", False):
+            return None
+
+        # Imported here, because SQLite isn't needed for commands that don't crawl
+        from .index import (
+            INDEX_FILE,
+            LibraryIndex,
+        )
+
+        return LibraryIndex(
+            path=Path(self.config_path).with_name(INDEX_FILE),
+            tag_options=self.tag_options,
+            storage=self.tag_storage,
+        )
+
+    def get_file_cache(self, kind: str) -> "FileCache":
+        """Persistent cache of values read from files, stored next to config file."""
+        with self.file_caches_lock:
+            if kind not in self.file_caches:
+                # Imported here, because SQLite isn't needed for commands that don't read files
+                from .cache import (
+                    CACHE_FILE,
+                    FileCache,
+                )
+
+                path = Path(self.config_path).with_name(CACHE_FILE)
+                self.file_caches[kind] = FileCache(path, kind)
+
+            return self.file_caches[kind]
+
+    @cached_property
+    def tag_storage(self) -> TagStorage:
+        """Storage of tags chosen in config, tag files in music dirs by default."""
+        return self.get_tag_storage(self.settings.get("tag_storage", TEXT_STORAGE))
+
+    def get_tag_storage(self, name: str) -> TagStorage:
+        # Relative path of single file storage is relative to config file
+        path = Path(self.config_path).parent / self.settings.get(
+            "tag_storage_path", JSON_LINES_FILE
+        )
+        return create_storage(name, self.tag_options, path)
+
     @cached_property
     def tag_options(self) -> TagOptions:
         return {
@@ -111,6 +201,11 @@ class MusicClient:
             for tag_name, options in self.config["tag"].items()
         }
 
+    @cached_property
+    def tag_schema(self) -> TagSchema:
+        """Bit positions of tag values, see `music.schema`."""
+        return TagSchema(self.tag_options)
+
 
 if __name__ == "__main__":
     app = MusicClient()
@@ -0,0 +1,115 @@
+import os
+from pathlib import Path
+from typing import Iterator
+
+from .directories import (
+    MusicDir,
+    RootDir,
+)
+from .files import (
+    IGNORED_FILES,
+    LOGICX_EXT,
+    scan_dir,
+)
+
+
+class Crawler:
+    """Music directories crawler based on `os.scandir`.
+
+    Every directory is listed once and entry types are taken from `os.DirEntry`,
+    so crawling doesn't make an extra `stat()` call per entry.
+    """
+
+    def __init__(
+        self,
+        root_dir: RootDir,
+        ignored_dirs: list[str] | None = None,
+        ignored_files: list[str] | None = None,
+    ):
+        """Initialize class instance."""
+        self.root_dir = root_dir
+        self.ignored_dirs = set(ignored_dirs or ())
+        self.ignored_files = IGNORED_FILES | set(ignored_files or ())
+
+    def crawl(self, path: Path | None = None) -> Iterator[MusicDir]:
+        """Recursively crawl directory and yield music directories."""
+        if path is None:
+            path = self.root_dir.path
+
+        music_dir, subdirs = self.split(path)
+        if music_dir:
+            yield music_dir
+
+        for subdir in subdirs:
+            yield from self.crawl(subdir)
+
+    def split(self, path: Path) -> tuple[MusicDir | None, list[Path]]:
+        """Look into directory.
+
+        If directory has files, it's a music directory and crawler doesn't go deeper.
+        Otherwise return its subdirectories to check.
+        """
+        entries = scan_dir(path)
+
+        if any(self.is_file(entry) for entry in entries):
+            return MusicDir(path=Path(path), root_dir=self.root_dir, entries=entries), []
+
+        return None, [Path(entry.path) for entry in entries if self.is_dir(entry)]
+
+    def is_dir(self, entry: os.DirEntry) -> bool:
+        if entry.name.endswith(LOGICX_EXT) or entry.name in self.ignored_dirs:
+            return False
+
+        return entry.is_dir()
+
+    def is_file(self, entry: os.DirEntry) -> bool:
+        if entry.name in self.ignored_files:
+            return False
+
+        return entry.is_file()
+
+
+def crawl_concurrently(
+    crawlers: list[Crawler],
+    workers: int,
+    ordered: bool = False,
+) -> Iterator[MusicDir]:
+    """Crawl root dirs on thread pool.
+
+    Every root and then every top-level subdirectory of a root is crawled as separate task.
+    Music directories are yielded as soon as their subtree is crawled, or in the same order
+    as sequential crawl if `ordered` is set.
+    """
+    # Imported here, because it's heavy and headless commands must start fast
+    from concurrent.futures import (
+        Future,
+        ThreadPoolExecutor,
+        as_completed,
+    )
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crawler")
+
+    def crawl(crawler: Crawler, path: Path) -> list[MusicDir]:
+        return list(crawler.crawl(path))
+
+    try:
+        splits = {
+            executor.submit(crawler.split, crawler.root_dir.path): crawler for crawler in crawlers
+        }
+        tasks: list[Future[list[MusicDir]]] = []
+
+        for future in splits if ordered else as_completed(splits):
+            music_dir, subdirs = future.result()
+            if music_dir:
+                # Root itself is a music directory, it's ready without crawling
+                task: Future[list[MusicDir]] = Future()
+                task.set_result([music_dir])
+                tasks.append(task)
+
+            crawler = splits[future]
+            tasks.extend(executor.submit(crawl, crawler, subdir) for subdir in subdirs)
+
+        for task in tasks if ordered else as_completed(tasks):
+            yield from task.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
@@ -1,15 +1,23 @@
-from dataclasses import dataclass
-from functools import cached_property
+import os
+from dataclasses import (
+    dataclass,
+    field,
+)
 from pathlib import Path
+from typing import Iterable
 
 from .files import (
-    IGNORED_FILES,
-    LOGICX_EXT,
     MusicFile,
+    MusicFiles,
     MusicFileType,
+    walk_files,
+)
+from .profiling import (
+    profiler,
+    timed,
 )
+from .storage import TagStorage
 from .tags import (
-    TAG_FILE,
     MusicDirTags,
     TagOptions,
 )
@@ -23,14 +31,60 @@ class RootDir:
     ignored_files: list[str] | None = None
 
 
-@dataclass
+@dataclass(slots=True)
+class MusicDirSummary:
+    """Number of files of every type and their total size in bytes."""
+
+    counts: dict[MusicFileType, int] = field(default_factory=dict)
+    size: int = 0
+
+    def count(self, file_type: MusicFileType) -> int:
+        return self.counts.get(file_type, 0)
+
+    def add(self, entry: os.DirEntry) -> None:
+        file_type = MusicFileType.from_name(entry.name)
+        self.counts[file_type] = self.counts.get(file_type, 0) + 1
+
+        # Logic X bundles are directories, their size isn't known without walking them
+        if file_type != MusicFileType.LOGIC_X:
+            self.size += entry.stat().st_size
+            if profiler.enabled:
+                profiler.count("stat")
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[os.DirEntry]) -> "MusicDirSummary":
+        summary = cls()
+        for entry in entries:
+            summary.add(entry)
+        return summary
+
+    def to_dict(self) -> dict:
+        return {
+            "counts": {file_type.value: count for file_type, count in self.counts.items()},
+            "size": self.size,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MusicDirSummary":
+        return cls(
+            counts={MusicFileType(k): v for k, v in data["counts"].items()},
+            size=data["size"],
+        )
+
+
+@dataclass(slots=True)
 class MusicDir:
     path: Path
     root_dir: RootDir
+    # Entries of `path` if crawler has already listed it
+    entries: list[os.DirEntry] | None = field(default=None, repr=False, compare=False)
+    # Summary computed by files crawl or restored from library index
+    cached_summary: MusicDirSummary | None = field(default=None, repr=False, compare=False)
+    # Slots leave no `__dict__` for `cached_property`, so files are cached in a field
+    cached_files: MusicFiles | None = field(default=None, init=False, repr=False, compare=False)
 
-    @property
-    def is_tagged(self) -> bool:
-        return (self.path / TAG_FILE).exists()
+    def is_tagged(self, storage: TagStorage) -> bool:
+        return storage.mtime_ns(self.path) is not None
 
     def get_tags(self, tag_options: TagOptions) -> MusicDirTags:
         return MusicDirTags.from_music_dir(self.path, tag_options)
@@ -45,7 +99,7 @@ class MusicDir:
         """Path relative to root dir"""
         return self.path.parent
 
-    @cached_property
+    @property
     def name_without_tags(self) -> str:
         name = self.name.split("(")[0]
         return " ".join(p for p in name.split() if not p.startswith("#"))
@@ -64,24 +118,42 @@ class MusicDir:
         return [t.lower().strip().rstrip(",") for t in tags.split()]
 
     def get_files(self, file_type: MusicFileType) -> list[MusicFile]:
-        return [f for f in self.files if f.file_type == file_type]
+        return self.files.of_type(file_type)
 
     def count_files(self, file_type: MusicFileType) -> int:
-        return len(self.get_files(file_type))
-
-    @cached_property
-    def files(self) -> list[MusicFile]:
-        def crawl(directory: Path) -> list[MusicFile]:
-            result = []
-            for f in directory.iterdir():
-                if f.is_file() and f.name not in IGNORED_FILES:
-                    result.append(MusicFile(path=f))
-                elif f.is_dir():
-                    if f.name.endswith(LOGICX_EXT):
-                        result.append(MusicFile(path=f))
-                    else:
-                        result.extend(crawl(f))
-
-            return result
-
-        return crawl(self.path)
+        return self.summary.count(file_type)
+
+    @property
+    def summary(self) -> MusicDirSummary:
+        """File counts and size, crawled without keeping `MusicFile` objects if needed."""
+        if self.cached_summary is None:
+            self.cached_summary = MusicDirSummary.from_entries(
+                walk_files(self.path, self.entries),
+            )
+            self.entries = None
+
+        return self.cached_summary
+
+    @property
+    def files(self) -> MusicFiles:
+        if self.cached_files is None:
+            self.cached_files = self.list_files()
+
+        return self.cached_files
+
+    @timed("MusicDir.files")
+    def list_files(self) -> MusicFiles:
+        summary = MusicDirSummary()
+        files = MusicFiles()
+
+        # Summary is computed in the same pass, so it never needs another crawl
+        for entry in walk_files(self.path, self.entries):
+            files.add(entry)
+            summary.add(entry)
+
+        if self.cached_summary is None:
+            self.cached_summary = summary
+
+        # Entries are only needed once, don't keep them alive with the files
+        self.entries = None
+        return files
@@ -0,0 +1,246 @@
+"""Duplicate audio files found by content, e.g. bounces copied between projects and roots.
+
+Candidates are narrowed in stages, so most files are never read: files are grouped by
+size, files of the same size by digest of their first and last chunks, and only files
+that still match are hashed completely. Digests are hashed in a process pool and cached
+by path, size and mtime, so files are hashed again only when they change.
+"""
+
+import contextlib
+import hashlib
+import os
+import sys
+from collections import defaultdict
+from dataclasses import (
+    dataclass,
+    field,
+)
+from itertools import repeat
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Iterable,
+    Iterator,
+)
+
+from .profiling import (
+    profiler,
+    timed,
+)
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from .cache import FileCache
+
+DIGEST_CACHE = "digest"
+PARTIAL = "partial"
+FULL = "full"
+
+# Bytes hashed at the start and at the end of file by partial digest
+CHUNK_SIZE = 64 * 1024
+# Bytes read at once by full digest
+READ_SIZE = 1024 * 1024
+# Files sent to worker process at once for partial digests
+HASH_BATCH_SIZE = 16
+
+# Called with stage name, number of hashed files and number of files to hash
+Progress = Callable[[str, int, int], None]
+
+
+def hash_file(path: str, size: int, partial: bool) -> str | None:
+    """Hex digest of file, or None if it can't be read.
+
+    Partial digest covers the first and the last chunk, files smaller than two chunks are
+    hashed completely, so their partial digest is the full one.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, "rb") as f:
+            if partial and size > 2 * CHUNK_SIZE:
+                digest.update(f.read(CHUNK_SIZE))
+                f.seek(size - CHUNK_SIZE)
+                digest.update(f.read(CHUNK_SIZE))
+            else:
+                while chunk := f.read(READ_SIZE):
+                    digest.update(chunk)
+    except OSError:
+        return None
+
+    return digest.hexdigest()
+
+
+@dataclass(slots=True)
+class FileEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    # Digests by stage, cached ones are loaded before hashing
+    digests: dict[str, str]
+    changed: bool = False
+
+
+@dataclass
+class DuplicateGroup:
+    """Files with the same content."""
+
+    size: int
+    digest: str
+    paths: list[str]
+
+    @property
+    def wasted(self) -> int:
+        """Bytes taken by all copies except one."""
+        return self.size * (len(self.paths) - 1)
+
+
+@dataclass
+class DuplicateReport:
+    groups: list[DuplicateGroup] = field(default_factory=list)
+    files: int = 0
+    # Files hashed at every stage, cached digests aren't counted
+    hashed: dict[str, int] = field(default_factory=lambda: {PARTIAL: 0, FULL: 0})
+    errors: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def wasted(self) -> int:
+        return sum(group.wasted for group in self.groups)
+
+
+class DuplicateFinder:
+    """Find duplicate files, digests are hashed in a process pool if `workers` > 1."""
+
+    def __init__(
+        self,
+        cache: "FileCache | None" = None,
+        workers: int = 1,
+        progress: Progress | None = None,
+    ):
+        """Initialize class instance."""
+        self.cache = cache
+        self.workers = workers
+        self.progress = progress
+        self.executor: "Executor | None" = None
+
+    @timed("DuplicateFinder.find")
+    def find(self, paths: Iterable[str]) -> DuplicateReport:
+        report = DuplicateReport()
+        try:
+            groups = self.group_by_size(paths, report)
+            candidates = [entry for group in groups for entry in group]
+            groups = self.split_groups(groups, PARTIAL, report)
+            groups = self.split_groups(groups, FULL, report)
+        finally:
+            if self.executor:
+                self.executor.shutdown(cancel_futures=True)
+                self.executor = None
+
+        report.groups = [
+            DuplicateGroup(
+                size=group[0].size,
+                digest=group[0].digests[FULL],
+                paths=sorted(entry.path for entry in group),
+            )
+            for group in groups
+        ]
+        report.groups.sort(key=lambda group: group.wasted, reverse=True)
+
+        if self.cache:
+            for entry in (entry for entry in candidates if entry.changed):
+                self.cache.put(entry.path, entry.size, entry.mtime_ns, entry.digests)
+        return report
+
+    def group_by_size(self, paths: Iterable[str], report: DuplicateReport) -> list[list[FileEntry]]:
+        by_size: defaultdict[int, list[FileEntry]] = defaultdict(list)
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                report.errors[path] = str(e)
+                continue
+
+            report.files += 1
+            # Empty files are all equal, but they aren't copies worth reporting
+            if not stat.st_size:
+                continue
+
+            cached = self.cache.get(path, stat.st_size, stat.st_mtime_ns) if self.cache else None
+            by_size[stat.st_size].append(
+                FileEntry(path, stat.st_size, stat.st_mtime_ns, cached or {})
+            )
+
+        if profiler.enabled:
+            profiler.count("stat", report.files)
+
+        return [group for group in by_size.values() if len(group) > 1]
+
+    def split_groups(
+        self,
+        groups: list[list[FileEntry]],
+        stage: str,
+        report: DuplicateReport,
+    ) -> list[list[FileEntry]]:
+        """Split groups of candidates by digest of stage, groups of one file are dropped."""
+        missing = [entry for group in groups for entry in group if stage not in entry.digests]
+        for entry, digest in zip(missing, self.hash_files(missing, stage)):
+            if digest is None:
+                report.errors[entry.path] = "Can't be read"
+                continue
+
+            entry.digests[stage] = digest
+            entry.changed = True
+            # Partial digest of small file covers all of it
+            if stage == PARTIAL and entry.size <= 2 * CHUNK_SIZE:
+                entry.digests[FULL] = digest
+
+        report.hashed[stage] += len(missing)
+
+        result: list[list[FileEntry]] = []
+        for group in groups:
+            by_digest: defaultdict[str, list[FileEntry]] = defaultdict(list)
+            for entry in group:
+                if stage in entry.digests:
+                    by_digest[entry.digests[stage]].append(entry)
+            result.extend(matches for matches in by_digest.values() if len(matches) > 1)
+
+        return result
+
+    def hash_files(self, entries: list[FileEntry], stage: str) -> Iterator[str | None]:
+        partial = stage == PARTIAL
+        paths = [entry.path for entry in entries]
+        sizes = [entry.size for entry in entries]
+
+        if self.workers > 1 and len(entries) > HASH_BATCH_SIZE:
+            # Full digests take long, so they are sent one by one to balance workers
+            chunksize = HASH_BATCH_SIZE if partial else 1
+            digests = self.get_executor().map(
+                hash_file, paths, sizes, repeat(partial), chunksize=chunksize
+            )
+        else:
+            digests = map(hash_file, paths, sizes, repeat(partial))
+
+        for done, digest in enumerate(digests, start=1):
+            if self.progress and done % HASH_BATCH_SIZE == 0:
+                self.progress(stage, done, len(entries))
+            yield digest
+
+        if profiler.enabled:
+            read = sum(min(size, 2 * CHUNK_SIZE) if partial else size for size in sizes)
+            profiler.count("bytes_hashed", read)
+
+    def get_executor(self) -> "Executor":
+        if self.executor is None:
+            # Imported here, because it's heavy and most commands don't hash files
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Workers are spawned, because forking a process with threads (e.g. the app) isn't
+            # safe. Resource tracker started with the pool inherits stderr, which must be real
+            # even if it's captured, e.g. by the app
+            with contextlib.redirect_stderr(sys.__stderr__ or sys.stderr):
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+
+        return self.executor
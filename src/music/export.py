@@ -0,0 +1,263 @@
+"""Streaming export of music directories to CSV, JSON Lines or SQLite.
+
+Record of every music directory is written as soon as it's crawled, so exporting never
+keeps the library in memory. Tags are read on a thread pool, but only a bounded window of
+directories waits for its tags at once, and records are written in the order of crawl.
+"""
+
+import csv
+import json
+from abc import (
+    ABC,
+    abstractmethod,
+)
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Iterable,
+)
+
+from .directories import MusicDir
+from .files import MusicFileType
+from .tags import (
+    TAG_FILE_LIST_SEPARATOR,
+    MusicDirTags,
+    TagOptions,
+)
+
+CSV_FORMAT = "csv"
+JSON_LINES_FORMAT = "jsonl"
+SQLITE_FORMAT = "sqlite"
+EXPORT_FORMATS = [CSV_FORMAT, JSON_LINES_FORMAT, SQLITE_FORMAT]
+
+SQLITE_TABLE = "music_dirs"
+# Rows are inserted into SQLite and committed in batches of this size
+SQLITE_BATCH_SIZE = 1000
+# Directories waiting for their tags per worker, bounds memory of parallel reads
+PENDING_PER_WORKER = 4
+
+# Columns of every export, followed by one column per tag and description
+DIR_COLUMNS = ["path", "root", "name", "name_tags"]
+COUNT_COLUMNS = [file_type.value for file_type in MusicFileType]
+SIZE_COLUMN = "size"
+DESCRIPTION_COLUMN = "description"
+
+ReadTags = Callable[[MusicDir], MusicDirTags | None]
+
+
+class ExportError(ValueError):
+    """Export can't be set up, e.g. unknown column."""
+
+
+def get_columns(tag_options: TagOptions) -> list[str]:
+    """All columns in order of export."""
+    return [*DIR_COLUMNS, *COUNT_COLUMNS, SIZE_COLUMN, *tag_options, DESCRIPTION_COLUMN]
+
+
+def select_columns(tag_options: TagOptions, names: Iterable[str] | None) -> list[str]:
+    """Columns chosen by user in their order, all columns if nothing is chosen."""
+    columns = get_columns(tag_options)
+    if names is None:
+        return columns
+
+    selected = list(names)
+    unknown = [name for name in selected if name not in columns]
+    if unknown:
+        raise ExportError(f"Unknown columns {', '.join(unknown)}, known: {', '.join(columns)}")
+    if not selected:
+        raise ExportError("No columns selected")
+
+    return selected
+
+
+def build_record(mdir: MusicDir, tags: MusicDirTags | None, tag_options: TagOptions) -> dict:
+    """Values of all columns, lists stay lists and missing values are None."""
+    summary = mdir.summary
+    record: dict[str, Any] = {
+        "path": str(mdir.path),
+        "root": mdir.root_dir.name,
+        "name": mdir.name_without_tags,
+        "name_tags": mdir.name_tags,
+    }
+    for file_type in MusicFileType:
+        record[file_type.value] = summary.count(file_type)
+    record[SIZE_COLUMN] = summary.size
+
+    values = {tag.name: value for tag, value in tags.tags.items()} if tags else {}
+    for name in tag_options:
+        record[name] = values.get(name)
+    record[DESCRIPTION_COLUMN] = tags.description if tags else None
+
+    return record
+
+
+def flatten(value: Any) -> Any:
+    """Value of CSV cell or SQLite column, lists are joined like in tag files."""
+    if isinstance(value, list):
+        return TAG_FILE_LIST_SEPARATOR.join(value)
+    return value
+
+
+class RecordWriter(ABC):
+    """Base class of export formats, records are written one by one."""
+
+    def __init__(self, columns: list[str]):
+        """Initialize class instance."""
+        self.columns = columns
+
+    @abstractmethod
+    def write(self, record: dict) -> None:
+        """Write values of selected columns of record."""
+
+    def close(self) -> None:
+        pass
+
+
+class CsvWriter(RecordWriter):
+    """CSV with header, lists are joined with commas and missing values are empty."""
+
+    def __init__(self, file: IO[str], columns: list[str]):
+        """Initialize class instance."""
+        super().__init__(columns)
+        self.writer = csv.writer(file)
+        self.writer.writerow(columns)
+
+    def write(self, record: dict) -> None:
+        self.writer.writerow([flatten(record[column]) for column in self.columns])
+
+
+class JsonLinesWriter(RecordWriter):
+    """JSON object per line, lists stay lists and missing values are null."""
+
+    def __init__(self, file: IO[str], columns: list[str]):
+        """Initialize class instance."""
+        super().__init__(columns)
+        self.file = file
+
+    def write(self, record: dict) -> None:
+        data = {column: record[column] for column in self.columns}
+        self.file.write(json.dumps(data, ensure_ascii=False) + "\n")
+
+
+class SqliteWriter(RecordWriter):
+    """Table of music directories in SQLite database, replaced on every export."""
+
+    def __init__(self, path: Path, columns: list[str], table: str = SQLITE_TABLE):
+        """Initialize class instance."""
+        super().__init__(columns)
+        # Imported here, because headless commands must start fast
+        import sqlite3
+
+        numeric = {*COUNT_COLUMNS, SIZE_COLUMN}
+        definitions = ", ".join(
+            f'"{column}" {"INTEGER" if column in numeric else "TEXT"}' for column in columns
+        )
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(f'DROP TABLE IF EXISTS "{table}"')
+            self.connection.execute(f'CREATE TABLE "{table}" ({definitions})')
+
+        placeholders = ", ".join("?" * len(columns))
+        self.insert = f'INSERT INTO "{table}" VALUES ({placeholders})'
+        self.batch: list[tuple] = []
+
+    def write(self, record: dict) -> None:
+        self.batch.append(tuple(flatten(record[column]) for column in self.columns))
+        if len(self.batch) >= SQLITE_BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        with self.connection:
+            self.connection.executemany(self.insert, self.batch)
+        self.batch = []
+
+    def close(self) -> None:
+        self.flush()
+        self.connection.close()
+
+
+@dataclass
+class ExportResult:
+    dirs: int = 0
+    # Music directories with tag files that can't be parsed, exported without tags
+    errors: int = 0
+
+
+class Exporter:
+    """Write record of every music directory while they are crawled.
+
+    Tags are read only if tag columns are exported. With more than one worker, they are
+    read on thread pool, up to `PENDING_PER_WORKER` directories per worker at once.
+    """
+
+    def __init__(
+        self,
+        writer: RecordWriter,
+        tag_options: TagOptions,
+        read_tags: ReadTags,
+        workers: int = 8,
+    ):
+        """Initialize class instance."""
+        self.writer = writer
+        self.tag_options = tag_options
+        self.read_tags = read_tags
+        self.workers = workers
+        tag_columns = {*tag_options, DESCRIPTION_COLUMN}
+        self.with_tags = any(column in tag_columns for column in writer.columns)
+        self.result = ExportResult()
+
+    def export(self, music_dirs: Iterable[MusicDir]) -> ExportResult:
+        try:
+            if self.with_tags and self.workers > 1:
+                self.export_concurrently(music_dirs)
+            else:
+                for mdir in music_dirs:
+                    self.write(mdir, self.get_tags(mdir))
+        finally:
+            self.writer.close()
+
+        return self.result
+
+    def export_concurrently(self, music_dirs: Iterable[MusicDir]) -> None:
+        # Imported here, because it's heavy and headless commands must start fast
+        from concurrent.futures import (
+            Future,
+            ThreadPoolExecutor,
+        )
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="export")
+        pending: deque[tuple[MusicDir, Future]] = deque()
+        try:
+            for mdir in music_dirs:
+                pending.append((mdir, executor.submit(self.get_tags, mdir)))
+                if len(pending) >= self.workers * PENDING_PER_WORKER:
+                    done, task = pending.popleft()
+                    self.write(done, task.result())
+
+            while pending:
+                done, task = pending.popleft()
+                self.write(done, task.result())
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def get_tags(self, mdir: MusicDir) -> MusicDirTags | None | ValueError:
+        if not self.with_tags:
+            return None
+
+        try:
+            return self.read_tags(mdir)
+        except ValueError as e:
+            # Malformed tag file doesn't stop export of the rest
+            return e
+
+    def write(self, mdir: MusicDir, tags: MusicDirTags | None | ValueError) -> None:
+        if isinstance(tags, ValueError):
+            self.result.errors += 1
+            tags = None
+
+        self.writer.write(build_record(mdir, tags, self.tag_options))
+        self.result.dirs += 1
@@ -1,7 +1,16 @@
+import os
+import sys
+from array import array
 from dataclasses import dataclass
 from enum import Enum
-from functools import cached_property
 from pathlib import Path
+from typing import (
+    Iterator,
+    Sequence,
+    overload,
+)
+
+from .profiling import profiler
 
 # Files
 IGNORED_FILES = {".DS_Store"}
@@ -34,48 +43,205 @@ class MusicFileType(Enum):
 
     @classmethod
     def from_ext(cls, ext: str) -> "MusicFileType":
-        if ext == LOGICX_EXT:
-            return cls.LOGIC_X
+        return EXT_FILE_TYPES.get(ext, cls.OTHER)
+
+    @classmethod
+    def from_name(cls, name: str) -> "MusicFileType":
+        return cls.from_ext(get_ext(name))
 
-        if ext in AUDIO_FILE_EXT:
-            return cls.AUDIO
 
-        if ext in IMAGE_FILE_EXT:
-            return cls.IMAGE
+EXT_FILE_TYPES = {
+    LOGICX_EXT: MusicFileType.LOGIC_X,
+    **{ext: MusicFileType.AUDIO for ext in AUDIO_FILE_EXT},
+    **{ext: MusicFileType.IMAGE for ext in IMAGE_FILE_EXT},
+    **{ext: MusicFileType.GUITAR_PRO for ext in GUITAR_PRO_EXT},
+}
 
-        if ext in GUITAR_PRO_EXT:
-            return cls.GUITAR_PRO
+# File types are stored as their positions in this tuple in `MusicFiles`
+FILE_TYPES = tuple(MusicFileType)
+FILE_TYPE_CODES = {file_type: code for code, file_type in enumerate(FILE_TYPES)}
 
-        return cls.OTHER
 
+def get_ext(name: str) -> str:
+    """Return file extension with dot or empty string if there is no extension."""
+    if "." not in name:
+        return ""
 
-@dataclass
+    return "." + name.rsplit(".", maxsplit=1)[1]
+
+
+@dataclass(frozen=True, slots=True)
 class MusicFile:
-    path: Path
+    # Parent path is interned, so files of the same directory share one string
+    parent: str
+    name: str
+    file_type: MusicFileType
 
     def __repr__(self) -> str:
         return f"<MusicFile: {self.name}>"
 
     @classmethod
     def from_string(cls, path: str) -> "MusicFile":
-        return cls(path=Path(path))
+        parent, name = os.path.split(path)
+        return cls(parent=sys.intern(parent), name=name, file_type=MusicFileType.from_name(name))
 
     @property
-    def name(self) -> str:
-        return self.path.name
+    def path(self) -> Path:
+        return Path(self.parent, self.name)
 
     @property
     def ext(self) -> str:
         """Return file extension with dot or empty string if it's directory."""
-        if "." not in self.name:
-            return ""
-
-        return "." + str(self.name.rsplit(".", maxsplit=1)[1])
-
-    @cached_property
-    def file_type(self) -> MusicFileType:
-        return MusicFileType.from_ext(self.ext)
+        return get_ext(self.name)
 
     @property
     def is_logicx(self) -> bool:
         return self.file_type == MusicFileType.LOGIC_X
+
+
+class MusicFiles(Sequence[MusicFile]):
+    """Files of music directory stored in columns instead of one object per file.
+
+    Every distinct parent path is stored once, files keep its position and a one byte
+    type code. `MusicFile` objects are only created when items are accessed.
+    """
+
+    __slots__ = ("parents", "parent_ids", "names", "type_codes", "parent_positions")
+
+    def __init__(self) -> None:
+        """Initialize class instance."""
+        self.parents: list[str] = []
+        self.parent_ids = array("I")
+        self.names: list[str] = []
+        self.type_codes = array("B")
+        # Parent is looked up by path, because walk returns to it after every nested directory
+        self.parent_positions: dict[str, int] = {}
+
+    def append(self, parent: str, name: str) -> None:
+        parent_id = self.parent_positions.get(parent)
+        if parent_id is None:
+            parent_id = self.parent_positions[parent] = len(self.parents)
+            self.parents.append(sys.intern(parent))
+
+        self.parent_ids.append(parent_id)
+        self.names.append(name)
+        self.type_codes.append(FILE_TYPE_CODES[MusicFileType.from_name(name)])
+
+    def add(self, entry: os.DirEntry) -> None:
+        self.append(entry.path[: -len(entry.name) - 1], entry.name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @overload
+    def __getitem__(self, index: int) -> MusicFile: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[MusicFile]: ...
+
+    def __getitem__(self, index: int | slice) -> MusicFile | list[MusicFile]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+
+        return MusicFile(
+            parent=self.parents[self.parent_ids[index]],
+            name=self.names[index],
+            file_type=FILE_TYPES[self.type_codes[index]],
+        )
+
+    def __repr__(self) -> str:
+        return f"<MusicFiles: {len(self)}>"
+
+    def of_type(self, file_type: MusicFileType) -> list[MusicFile]:
+        """Files of given type, other files are skipped by their type codes."""
+        code = FILE_TYPE_CODES[file_type]
+        return [self[i] for i, c in enumerate(self.type_codes) if c == code]
+
+
+def scan_dir(path: str | Path) -> list[os.DirEntry]:
+    """List directory once, keeping entry types cached by `os.scandir`."""
+    with os.scandir(path) as it:
+        entries = list(it)
+
+    if profiler.enabled:
+        profiler.count("scandir")
+        profiler.count("entries", len(entries))
+    return entries
+
+
+def walk_files(
+    path: str | Path,
+    entries: list[os.DirEntry] | None = None,
+    subdirs: list[os.DirEntry] | None = None,
+) -> Iterator[os.DirEntry]:
+    """Recursively yield file entries of directory.
+
+    Logic X bundles are directories, but they are yielded as files and never entered.
+    Pass `entries` if directory was already listed to avoid listing it again and
+    `subdirs` to collect entries of nested directories that were entered.
+    """
+    if entries is None:
+        entries = scan_dir(path)
+
+    for entry in entries:
+        if entry.is_file():
+            if entry.name not in IGNORED_FILES:
+                if profiler.enabled:
+                    profiler.count("files")
+                yield entry
+        elif entry.is_dir():
+            if entry.name.endswith(LOGICX_EXT):
+                if profiler.enabled:
+                    profiler.count("files")
+                yield entry
+            else:
+                if subdirs is not None:
+                    subdirs.append(entry)
+                yield from walk_files(entry.path, subdirs=subdirs)
+
+
+def atomic_write(path: str | Path, text: str) -> None:
+    """Replace file contents so readers see either old or new file, never a truncated one.
+
+    Text is written to a temporary file in the same directory, synced to disk and renamed
+    over the target, so a crash or a sync client reading in between can't see partial file.
+    """
+    # Imported here, because it's heavy and headless commands must start fast
+    import tempfile
+
+    path = Path(path)
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+
+    fd, temp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Temporary file is created readable only by owner
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    # Rename itself is persisted with the directory
+    try:
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        # E.g. directories can't be opened on Windows
+        return
+
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
@@ -0,0 +1,294 @@
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import (
+    astuple,
+    dataclass,
+    fields,
+)
+from pathlib import Path
+from typing import Iterable
+
+from .crawler import Crawler
+from .directories import (
+    MusicDir,
+    MusicDirSummary,
+    RootDir,
+)
+from .files import (
+    scan_dir,
+    walk_files,
+)
+from .storage import TagStorage
+from .tags import (
+    TAG_FILE,
+    MusicDirTags,
+    TagOptions,
+)
+
+INDEX_FILE = "library.db"
+
+# Index is rebuilt from scratch if it was created with another schema version
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    is_music INTEGER NOT NULL,
+    children TEXT,
+    subdirs TEXT,
+    summary TEXT,
+    tag_mtime_ns INTEGER,
+    tags TEXT
+)
+"""
+
+
+@dataclass
+class IndexRecord:
+    """Indexed directory.
+
+    Directory without files keeps list of `children` to descend into. Music directory
+    keeps mtimes of its nested `subdirs`, files summary and parsed tag file.
+    """
+
+    path: str
+    root: str
+    mtime_ns: int
+    is_music: bool
+    children: list[str] | None = None
+    subdirs: dict[str, int] | None = None
+    summary: dict | None = None
+    tag_mtime_ns: int | None = None
+    tags: dict | None = None
+
+    JSON_FIELDS = ("children", "subdirs", "summary", "tags")
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "IndexRecord":
+        values = dict(zip((f.name for f in fields(cls)), row))
+        for name in cls.JSON_FIELDS:
+            if values[name] is not None:
+                values[name] = json.loads(values[name])
+
+        values["is_music"] = bool(values["is_music"])
+        return cls(**values)
+
+    def to_row(self) -> tuple:
+        row = dict(zip((f.name for f in fields(self)), astuple(self)))
+        for name in self.JSON_FIELDS:
+            if row[name] is not None:
+                row[name] = json.dumps(row[name], ensure_ascii=False)
+
+        return tuple(row.values())
+
+
+class LibraryIndex:
+    """Persistent SQLite index of music directories.
+
+    Every directory is stored with its mtime, so rescan lists only directories that
+    changed since previous scan and takes everything else from the index.
+    """
+
+    def __init__(self, path: str | Path, tag_options: TagOptions, storage: TagStorage):
+        """Initialize class instance."""
+        self.path = Path(path)
+        self.tag_options = tag_options
+        # Tags are indexed from storage configured for library, not always from tag files
+        self.storage = storage
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.migrate()
+
+        # Whole index is loaded with single query, changes are written on flush
+        cursor = self.connection.execute("SELECT * FROM dirs")
+        self.records = {row[0]: IndexRecord.from_row(row) for row in cursor}
+        self.updated: dict[str, IndexRecord] = {}
+        self.removed: list[str] = []
+
+    def migrate(self) -> None:
+        (version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if version == SCHEMA_VERSION:
+            return
+
+        with self.connection:
+            self.connection.execute("DROP TABLE IF EXISTS dirs")
+            self.connection.execute(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def get_crawler(
+        self,
+        root_dir: RootDir,
+        ignored_dirs: list[str] | None = None,
+        ignored_files: list[str] | None = None,
+    ) -> "IndexedCrawler":
+        return IndexedCrawler(
+            index=self,
+            root_dir=root_dir,
+            ignored_dirs=ignored_dirs,
+            ignored_files=ignored_files,
+        )
+
+    def update(self, record: IndexRecord) -> None:
+        self.records[record.path] = record
+        self.updated[record.path] = record
+
+    def remove(self, paths: Iterable[str]) -> None:
+        """Drop directories with their subtrees on next flush."""
+        self.removed.extend(paths)
+
+    def flush(self) -> None:
+        """Write all changes made by crawlers to the index file."""
+        with self.lock:
+            updated, self.updated = self.updated, {}
+            removed, self.removed = self.removed, []
+
+            with self.connection:
+                for path in removed:
+                    # Directory and everything below it, "0" is next character after "/"
+                    self.connection.execute(
+                        "DELETE FROM dirs WHERE path = ? OR (path > ? AND path < ?)",
+                        (path, f"{path}/", f"{path}0"),
+                    )
+
+                placeholders = ", ".join("?" * len(fields(IndexRecord)))
+                self.connection.executemany(
+                    f"INSERT OR REPLACE INTO dirs VALUES ({placeholders})",
+                    (record.to_row() for record in updated.values()),
+                )
+
+        for path in removed:
+            for key in [k for k in self.records if k == path or k.startswith(f"{path}/")]:
+                del self.records[key]
+
+
+class IndexedCrawler(Crawler):
+    """Crawler that lists only directories changed since they were indexed."""
+
+    def __init__(
+        self,
+        index: LibraryIndex,
+        root_dir: RootDir,
+        ignored_dirs: list[str] | None = None,
+        ignored_files: list[str] | None = None,
+    ):
+        """Initialize class instance."""
+        super().__init__(root_dir, ignored_dirs, ignored_files)
+        self.index = index
+
+    def split(self, path: Path) -> tuple[MusicDir | None, list[Path]]:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None, []
+
+        record = self.index.records.get(str(path))
+
+        # Tag files are saved with `atomic_write`, which renames a temporary file over tag file
+        # and so changes directory mtime. Music directory is re-read after every save then, at
+        # the cost of the same walk as when its tag file changed
+        if record is None or record.mtime_ns != mtime_ns or record.root != self.root_dir.name:
+            record = self.read_dir(path, mtime_ns, record)
+        elif record.is_music:
+            record = self.refresh_music_dir(record)
+
+        if record.is_music:
+            return self.to_music_dir(record), []
+
+        return None, [Path(child) for child in record.children or ()]
+
+    def read_dir(self, path: Path, mtime_ns: int, previous: IndexRecord | None) -> IndexRecord:
+        """List changed or new directory and update its record."""
+        entries = scan_dir(path)
+
+        if any(self.is_file(entry) for entry in entries):
+            record = self.read_music_dir(path, mtime_ns, entries)
+        else:
+            record = IndexRecord(
+                path=str(path),
+                root=self.root_dir.name,
+                mtime_ns=mtime_ns,
+                is_music=False,
+                children=[entry.path for entry in entries if self.is_dir(entry)],
+            )
+
+        # Subtrees of children that are gone must be dropped from index
+        if previous and previous.children:
+            self.index.remove(set(previous.children) - set(record.children or ()))
+
+        self.index.update(record)
+        return record
+
+    def read_music_dir(
+        self,
+        path: Path,
+        mtime_ns: int,
+        entries: list[os.DirEntry] | None = None,
+    ) -> IndexRecord:
+        subdirs: list[os.DirEntry] = []
+        summary = MusicDirSummary.from_entries(walk_files(path, entries, subdirs))
+
+        record = IndexRecord(
+            path=str(path),
+            root=self.root_dir.name,
+            mtime_ns=mtime_ns,
+            is_music=True,
+            subdirs={entry.path: entry.stat().st_mtime_ns for entry in subdirs},
+            summary=summary.to_dict(),
+        )
+        self.read_tags(record)
+        return record
+
+    def refresh_music_dir(self, record: IndexRecord) -> IndexRecord:
+        """Re-read music directory if any nested directory or tag file has changed."""
+        for subdir, mtime_ns in (record.subdirs or {}).items():
+            try:
+                if os.stat(subdir).st_mtime_ns != mtime_ns:
+                    break
+            except FileNotFoundError:
+                break
+        else:
+            # Tag file rewritten in place, e.g. by an editor or sync client, doesn't change
+            # directory mtime, so mtime of tag file is compared too
+            if self.tag_mtime_ns(record) == record.tag_mtime_ns:
+                return record
+
+        record = self.read_music_dir(Path(record.path), record.mtime_ns)
+        self.index.update(record)
+        return record
+
+    def read_tags(self, record: IndexRecord) -> None:
+        record.tag_mtime_ns = self.tag_mtime_ns(record)
+        record.tags = None
+
+        if record.tag_mtime_ns is not None:
+            try:
+                tags = self.index.storage.read(Path(record.path))
+            except ValueError:
+                # Malformed tag file is reported when its tags are actually needed
+                tags = None
+            if tags is not None:
+                record.tags = tags.to_dict()
+
+    def tag_mtime_ns(self, record: IndexRecord) -> int | None:
+        return self.index.storage.mtime_ns(Path(record.path))
+
+    def to_music_dir(self, record: IndexRecord) -> MusicDir:
+        path = Path(record.path)
+
+        # Indexed tags are kept by storage, so tag file isn't read until it's modified
+        if record.tags is not None and record.tag_mtime_ns is not None:
+            tags = MusicDirTags.from_dict(path / TAG_FILE, record.tags, self.index.tag_options)
+            self.index.storage.remember(tags, record.tag_mtime_ns)
+
+        summary = MusicDirSummary()
+        if record.summary is not None:
+            summary = MusicDirSummary.from_dict(record.summary)
+
+        return MusicDir(
+            path=path,
+            root_dir=self.root_dir,
+            cached_summary=summary,
+        )
@@ -0,0 +1,450 @@
+import os
+from dataclasses import (
+    dataclass,
+    field,
+)
+from functools import cached_property
+from pathlib import Path
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+)
+
+from .audio import (
+    AUDIO_CACHE,
+    DirAudio,
+    read_library_audio,
+)
+from .bulk import (
+    BulkResult,
+    TagEdit,
+    bulk_edit_tags,
+)
+from .bundles import (
+    BUNDLE_CACHE,
+    DirBundles,
+    read_library_bundles,
+)
+from .client import MusicClient
+from .crawler import Crawler
+from .directories import (
+    MusicDir,
+    RootDir,
+)
+from .duplicates import (
+    DIGEST_CACHE,
+    DuplicateFinder,
+    DuplicateReport,
+    Progress,
+)
+from .export import (
+    Exporter,
+    ExportResult,
+    RecordWriter,
+)
+from .files import MusicFileType
+from .persistence import TagWriter
+from .query import TagIndex
+from .statistics import LibraryStats
+from .storage import TagStorage
+from .tags import (
+    TAG_FILE,
+    MusicDirTags,
+    TagOptions,
+)
+
+
+@dataclass
+class LibraryChanges:
+    """Music directories changed by `MusicLibrary.collect_changes`."""
+
+    added: list[MusicDir] = field(default_factory=list)
+    updated: list[MusicDir] = field(default_factory=list)
+    removed: set[Path] = field(default_factory=set)
+    # Tags of added and updated music directories
+    tags: dict[Path, MusicDirTags | None] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.updated or self.removed)
+
+
+Listener = Callable[[LibraryChanges], None]
+
+
+class MusicLibrary:
+    """Library model shared by all screens of application.
+
+    Music directories are crawled once and kept in memory, so screens can navigate
+    between them without crawling library again.
+    """
+
+    def __init__(self, client: MusicClient):
+        """Initialize class instance."""
+        self.client = client
+        self.music_dirs: list[MusicDir] = []
+        self.positions: dict[Path, int] = {}
+        self.loaded = False
+        self.stats: LibraryStats | None = None
+        self.tag_index: TagIndex | None = None
+        self.listeners: list[Listener] = []
+
+    def __len__(self) -> int:
+        return len(self.load())
+
+    def __getitem__(self, index: int) -> MusicDir:
+        return self.load()[index]
+
+    @property
+    def tag_options(self) -> TagOptions:
+        return self.client.tag_options
+
+    @property
+    def storage(self) -> TagStorage:
+        return self.client.tag_storage
+
+    @cached_property
+    def writer(self) -> TagWriter:
+        return TagWriter(self.storage)
+
+    def load(self) -> list[MusicDir]:
+        """Crawl library on first call and return cached music directories after."""
+        if not self.loaded:
+            self.reload()
+
+        return self.music_dirs
+
+    def reload(self) -> None:
+        """Crawl library again."""
+        self.set_music_dirs(list(self.client.find_music_dirs()))
+
+    def stream(self) -> Iterator[MusicDir]:
+        """Yield music directories while library is crawled or from cache if it's loaded."""
+        if self.loaded:
+            yield from self.music_dirs
+            return
+
+        music_dirs = []
+        for mdir in self.client.find_music_dirs():
+            music_dirs.append(mdir)
+            yield mdir
+
+        self.set_music_dirs(music_dirs)
+
+    def set_music_dirs(self, music_dirs: list[MusicDir]) -> None:
+        self.set_positions(music_dirs)
+        self.loaded = True
+        self.stats = None
+        self.tag_index = None
+
+    def set_positions(self, music_dirs: list[MusicDir]) -> None:
+        self.music_dirs = music_dirs
+        self.positions = {mdir.path: i for i, mdir in enumerate(music_dirs)}
+
+    def get_stats(self) -> LibraryStats:
+        """Collect library statistics once, they are kept up to date when tags are saved."""
+        if self.stats is None:
+            # Tags are read from storage, so saved tags must be written first
+            self.writer.flush()
+            self.stats = LibraryStats.collect(self.iter_tags(self.stream()))
+
+        return self.stats
+
+    def get_tag_index(self) -> TagIndex:
+        """Build inverted tag index once, it's kept up to date when tags are saved."""
+        if self.tag_index is None:
+            self.writer.flush()
+            self.tag_index = TagIndex.build(self.iter_tags(self.load()), self.client.tag_schema)
+
+        return self.tag_index
+
+    def query(self, expression: str) -> list[MusicDir]:
+        """Music directories matching tag query, see `music.query.parse`."""
+        return self.get_tag_index().query(expression)
+
+    def get_tags(self, mdir: MusicDir) -> MusicDirTags | None:
+        """Tags of music directory including saved ones that aren't written yet."""
+        pending = self.writer.get(mdir.path / TAG_FILE)
+        if pending:
+            return pending
+
+        return self.storage.read(mdir.path)
+
+    def read_tags_once(self, mdir: MusicDir) -> MusicDirTags | None:
+        """Tags of music directory that aren't kept in tag cache."""
+        pending = self.writer.get(mdir.path / TAG_FILE)
+        if pending:
+            return pending
+
+        return self.storage.read_once(mdir.path)
+
+    def iter_tags(
+        self,
+        music_dirs: Iterable[MusicDir],
+    ) -> Iterator[tuple[MusicDir, MusicDirTags | None]]:
+        for mdir in music_dirs:
+            yield mdir, self.get_tags(mdir)
+
+    def save_tags(self, mdir: MusicDir, tags: MusicDirTags) -> None:
+        """Save tags in background, statistics and tag index are updated right away."""
+        self.writer.save(tags)
+        self.update_tags(mdir, tags)
+
+    def bulk_tag(
+        self,
+        music_dirs: Iterable[MusicDir],
+        edits: list[TagEdit],
+        update_tags: bool = True,
+    ) -> Iterator[BulkResult]:
+        """Edit tags of many music directories concurrently, see `music.bulk`.
+
+        Statistics and tag index are updated with changed tags, unless `update_tags` is
+        False and caller updates them itself, e.g. from UI thread while this runs in worker.
+        """
+        workers = self.client.settings.get("workers", 8)
+        # Storage is read and written directly, so pending saves must not overwrite it
+        self.writer.flush()
+
+        for result in bulk_edit_tags(music_dirs, edits, self.tag_options, self.storage, workers):
+            if update_tags and result.changed and result.tags:
+                self.update_tags(result.mdir, result.tags)
+            yield result
+
+    def read_audio(self, music_dirs: Iterable[MusicDir]) -> Iterator[DirAudio]:
+        """Read duration and format of audio files concurrently, see `music.audio`."""
+        cache = self.client.get_file_cache(AUDIO_CACHE)
+        try:
+            yield from read_library_audio(music_dirs, cache, self.client.settings.get("workers", 8))
+        finally:
+            cache.flush()
+
+    def read_bundles(self, music_dirs: Iterable[MusicDir]) -> Iterator[DirBundles]:
+        """Inspect Logic X bundles concurrently, see `music.bundles`."""
+        cache = self.client.get_file_cache(BUNDLE_CACHE)
+        try:
+            yield from read_library_bundles(
+                music_dirs, cache, self.client.settings.get("workers", 8)
+            )
+        finally:
+            cache.flush()
+
+    def find_duplicates(self, progress: Progress | None = None) -> DuplicateReport:
+        """Find audio files with the same content in all root dirs, see `music.duplicates`."""
+        cache = self.client.get_file_cache(DIGEST_CACHE)
+        finder = DuplicateFinder(cache, self.client.settings.get("workers", 8), progress)
+        paths = (
+            os.path.join(music_file.parent, music_file.name)
+            for mdir in self.load()
+            for music_file in mdir.get_files(MusicFileType.AUDIO)
+        )
+
+        try:
+            return finder.find(paths)
+        finally:
+            cache.flush()
+
+    def export(self, output: RecordWriter, workers: int = 8) -> ExportResult:
+        """Write record of every music directory while library is crawled, output is closed.
+
+        Crawled directories aren't kept, so exporting doesn't load library into memory.
+        """
+        music_dirs = self.music_dirs if self.loaded else self.client.find_music_dirs()
+        exporter = Exporter(output, self.tag_options, self.read_tags_once, workers)
+        return exporter.export(music_dirs)
+
+    def update_tags(self, mdir: MusicDir, tags: MusicDirTags) -> None:
+        """Update statistics and tag index after tags of music directory were saved."""
+        if self.stats is not None:
+            self.stats.retag(mdir, tags)
+
+        if self.tag_index is not None:
+            self.tag_index.update(mdir, tags)
+
+    def close(self) -> None:
+        """Write all saved tags and close tag storage and file caches."""
+        # Writer and storage aren't created just to be closed
+        if "writer" in self.__dict__:
+            self.writer.stop()
+
+        if "tag_storage" in self.client.__dict__:
+            self.storage.close()
+
+        for cache in self.client.file_caches.values():
+            cache.close()
+        self.client.file_caches.clear()
+
+    def index_of(self, path: Path) -> int:
+        """Position of music directory with given path."""
+        self.load()
+        return self.positions[path]
+
+    # Live updates
+
+    def subscribe(self, listener: Listener) -> None:
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener: Listener) -> None:
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def apply_changes(self, paths: Iterable[Path]) -> LibraryChanges:
+        """Refresh only music directories affected by changed paths, e.g. reported by watcher."""
+        changes = self.collect_changes(paths)
+        self.commit_changes(changes)
+        return changes
+
+    def collect_changes(self, paths: Iterable[Path]) -> LibraryChanges:
+        """Crawl music directories affected by changed paths, library itself isn't changed.
+
+        It can run in background thread, while changes are committed on UI thread.
+        """
+        changes = LibraryChanges()
+        if not self.loaded:
+            # Library will be crawled with all changes when it's needed
+            return changes
+
+        # Known paths are copied at once, because library can be changed meanwhile
+        known = set(self.positions)
+        for path in sorted({self.get_affected_dir(path, known) for path in paths}):
+            self.refresh_dir(path, known, changes)
+
+        return changes
+
+    def collect_rescan(self) -> LibraryChanges:
+        """Crawl the whole library again, e.g. when watcher lost events."""
+        changes = LibraryChanges()
+        if not self.loaded:
+            return changes
+
+        known = set(self.positions)
+        for mdir in self.client.find_music_dirs():
+            self.put_dir(mdir, known, changes)
+
+        changes.removed = known - changes.tags.keys()
+        return changes
+
+    def commit_changes(self, changes: LibraryChanges) -> None:
+        """Apply collected changes to library, statistics and tag index, notify listeners."""
+        if not self.loaded or not changes:
+            return
+
+        for path in changes.removed:
+            if self.stats is not None:
+                self.stats.remove(path)
+            if self.tag_index is not None:
+                self.tag_index.remove(path)
+
+        for mdir in changes.added + changes.updated:
+            # Positions could change since changes were collected
+            position = self.positions.get(mdir.path)
+            if position is None:
+                self.positions[mdir.path] = len(self.music_dirs)
+                self.music_dirs.append(mdir)
+            else:
+                self.music_dirs[position] = mdir
+
+            tags = changes.tags.get(mdir.path)
+            if self.stats is not None:
+                self.stats.add(mdir, tags)
+            if self.tag_index is not None:
+                self.tag_index.update(mdir, tags)
+
+        if changes.removed:
+            self.set_positions(
+                [mdir for mdir in self.music_dirs if mdir.path not in changes.removed],
+            )
+
+        for listener in self.listeners:
+            listener(changes)
+
+    def get_affected_dir(self, path: Path, known: set[Path]) -> Path:
+        """Known music dir containing changed path or directory that must be crawled again."""
+        for parent in (path, *path.parents):
+            if parent in known:
+                return parent
+
+        # File appeared in directory without files, so directory itself is a music dir now
+        if path.exists() and not path.is_dir():
+            return path.parent
+
+        return path
+
+    def refresh_dir(self, path: Path, known: set[Path], changes: LibraryChanges) -> None:
+        root_dir = self.get_root_dir(path)
+        if root_dir is None:
+            return
+
+        crawler = Crawler(
+            root_dir=root_dir,
+            ignored_dirs=root_dir.ignored_dirs,
+            ignored_files=root_dir.ignored_files,
+        )
+        if set(path.relative_to(root_dir.path).parts) & crawler.ignored_dirs:
+            return
+
+        inside = [p for p in known if p.is_relative_to(path) and p not in changes.removed]
+        if not path.is_dir():
+            for p in inside:
+                self.remove_dir(p, changes)
+            return
+
+        music_dir, subdirs = crawler.split(path)
+        if music_dir:
+            for p in inside:
+                if p != path:
+                    self.remove_dir(p, changes)
+            self.put_dir(music_dir, known, changes)
+            return
+
+        if path in known:
+            self.remove_dir(path, changes)
+
+        # Only top-level subdirectories that are new or gone are crawled or removed
+        known_subdirs: dict[Path, list[Path]] = {}
+        for p in inside:
+            if p != path:
+                known_subdirs.setdefault(path / p.relative_to(path).parts[0], []).append(p)
+
+        for subdir, music_dirs in known_subdirs.items():
+            if subdir not in subdirs:
+                for p in music_dirs:
+                    self.remove_dir(p, changes)
+
+        for subdir in subdirs:
+            if subdir not in known_subdirs:
+                for mdir in crawler.crawl(subdir):
+                    self.put_dir(mdir, known, changes)
+
+    def put_dir(self, mdir: MusicDir, known: set[Path], changes: LibraryChanges) -> None:
+        """Add new or replace changed music directory."""
+        if mdir.path in changes.tags:
+            # Already crawled with its parent directory
+            return
+
+        try:
+            changes.tags[mdir.path] = self.get_tags(mdir)
+        except ValueError:
+            # Tag file can be half-written by sync client, it'll be read on next change
+            changes.tags[mdir.path] = None
+
+        changes.removed.discard(mdir.path)
+        if mdir.path in known:
+            changes.updated.append(mdir)
+        else:
+            changes.added.append(mdir)
+
+    def remove_dir(self, path: Path, changes: LibraryChanges) -> None:
+        changes.removed.add(path)
+
+        if path in changes.tags:
+            # Crawled earlier in the same changes, but it's gone already
+            del changes.tags[path]
+            changes.added = [mdir for mdir in changes.added if mdir.path != path]
+            changes.updated = [mdir for mdir in changes.updated if mdir.path != path]
+
+    def get_root_dir(self, path: Path) -> RootDir | None:
+        for root_dir in self.client.root_dirs:
+            if path.is_relative_to(root_dir.path):
+                return root_dir
+
+        return None
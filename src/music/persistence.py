@@ -0,0 +1,93 @@
+import atexit
+import threading
+from pathlib import Path
+from typing import Callable
+
+from .storage import TagStorage
+from .tags import MusicDirTags
+
+ErrorCallback = Callable[[MusicDirTags, Exception], object]
+
+
+class TagWriter:
+    """Background writer of tags to tag storage.
+
+    Saves return immediately and tags are written one by one in a writer thread.
+    If tags of the same directory are saved again before they were written, only the latest
+    tags are written. Pending saves are written on `flush`, `stop` and interpreter exit.
+    """
+
+    def __init__(self, storage: TagStorage, on_error: ErrorCallback | None = None):
+        """Initialize class instance."""
+        self.storage = storage
+        self.on_error = on_error
+        self.pending: dict[Path, MusicDirTags] = {}
+        # Tags taken from `pending` and being written right now
+        self.writing: MusicDirTags | None = None
+        self.errors: list[tuple[Path, Exception]] = []
+        self.condition = threading.Condition()
+        self.thread: threading.Thread | None = None
+        self.stopped = False
+
+    def save(self, tags: MusicDirTags) -> None:
+        with self.condition:
+            if self.stopped:
+                raise RuntimeError("Tag writer is stopped")
+
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="tag-writer", daemon=True)
+                self.thread.start()
+                # Daemon thread would be killed with unsaved tags otherwise
+                atexit.register(self.stop)
+
+            self.pending[tags.path] = tags
+            self.condition.notify_all()
+
+    def get(self, file_path: Path) -> MusicDirTags | None:
+        """Tags saved to given file that aren't written yet."""
+        with self.condition:
+            if file_path in self.pending:
+                return self.pending[file_path]
+
+            if self.writing and self.writing.path == file_path:
+                return self.writing
+
+        return None
+
+    def flush(self) -> None:
+        """Wait until all saved tags are written."""
+        with self.condition:
+            self.condition.wait_for(lambda: not self.pending and self.writing is None)
+
+    def stop(self) -> None:
+        """Write pending tags and stop writer thread."""
+        with self.condition:
+            if self.stopped:
+                return
+            self.stopped = True
+            self.condition.notify_all()
+
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self.stopped)
+                if not self.pending:
+                    return
+
+                tags = self.pending.pop(next(iter(self.pending)))
+                self.writing = tags
+
+            try:
+                self.storage.write(tags)
+            except Exception as e:
+                # Writer must keep draining pending tags, otherwise `flush` and `stop` hang
+                self.errors.append((tags.path, e))
+                if self.on_error:
+                    self.on_error(tags, e)
+            finally:
+                with self.condition:
+                    self.writing = None
+                    self.condition.notify_all()
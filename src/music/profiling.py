@@ -0,0 +1,264 @@
+"""Timing spans and counters of hot paths, e.g. crawling, listing files and parsing tags.
+
+Profiling is off unless `MUSIC_TAGS_PROFILE` environment variable is set to a path of
+the report (or to `1` to only collect it for the profile screen of the app), or CLI is
+run with `--profile`. When it's off, instrumented code only checks `profiler.enabled`.
+
+Report is written on exit as JSON totals or in Chrome trace format (`--profile-format`
+or `MUSIC_TAGS_PROFILE_FORMAT`), which can be opened in `chrome://tracing` or Perfetto.
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    TypeVar,
+)
+
+PROFILE_ENV = "MUSIC_TAGS_PROFILE"
+PROFILE_FORMAT_ENV = "MUSIC_TAGS_PROFILE_FORMAT"
+JSON_FORMAT = "json"
+CHROME_FORMAT = "chrome"
+FORMATS = [JSON_FORMAT, CHROME_FORMAT]
+
+# Code flags of generator and coroutine functions, checked without importing `inspect`
+CO_GENERATOR = 0x20
+CO_COROUTINE = 0x80
+
+# Spans kept for Chrome trace, later spans are added only to totals
+MAX_SPANS = 100_000
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass(slots=True)
+class SpanTotals:
+    count: int = 0
+    total_ns: int = 0
+    max_ns: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "mean_ms": self.total_ns / self.count / 1e6,
+            "max_ms": self.max_ns / 1e6,
+        }
+
+
+class Span:
+    """Context manager that adds its duration to profiler."""
+
+    __slots__ = ("profiler", "name", "start_ns")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        """Initialize class instance."""
+        self.profiler = profiler
+        self.name = name
+        self.start_ns = 0
+
+    def __enter__(self) -> "Span":
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.profiler.add_span(self.name, self.start_ns, time.perf_counter_ns() - self.start_ns)
+
+
+class NullSpan:
+    """Span used when profiling is off."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "NullSpan":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Profiler:
+    """Collected spans and counters, shared by all threads."""
+
+    def __init__(self) -> None:
+        """Initialize class instance."""
+        self.enabled = False
+        # Report is written on exit if path is set
+        self.path: Path | None = None
+        self.format = JSON_FORMAT
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.started_ns = time.perf_counter_ns()
+            # (name, start, duration, thread id)
+            self.spans: list[tuple[str, int, int, int]] = []
+            self.totals: dict[str, SpanTotals] = {}
+            self.counters: dict[str, int] = {}
+            self.threads: dict[int, str] = {}
+
+    def enable(self, path: Path | None = None, format: str = JSON_FORMAT) -> None:
+        if format not in FORMATS:
+            raise ValueError(f"Unknown profile format {format!r}")
+
+        if path is not None and self.path is None:
+            atexit.register(self.write)
+
+        self.enabled = True
+        self.path = path
+        self.format = format
+
+    def span(self, name: str) -> Span | NullSpan:
+        return Span(self, name) if self.enabled else NULL_SPAN
+
+    def add_span(self, name: str, start_ns: int, duration_ns: int) -> None:
+        thread = threading.current_thread()
+        with self.lock:
+            totals = self.totals.get(name)
+            if totals is None:
+                totals = self.totals[name] = SpanTotals()
+            totals.count += 1
+            totals.total_ns += duration_ns
+            totals.max_ns = max(totals.max_ns, duration_ns)
+
+            if len(self.spans) < MAX_SPANS:
+                self.spans.append((name, start_ns, duration_ns, thread.ident or 0))
+                self.threads[thread.ident or 0] = thread.name
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Add value to counter, e.g. number of `stat` calls or bytes read."""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {
+                "duration_ms": (time.perf_counter_ns() - self.started_ns) / 1e6,
+                "spans": {name: totals.to_dict() for name, totals in self.totals.items()},
+                "counters": dict(self.counters),
+            }
+
+    def to_chrome_trace(self) -> dict:
+        """Trace Event Format, every span is a complete event with times in microseconds."""
+        pid = os.getpid()
+        with self.lock:
+            events: list[dict] = [
+                {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                for tid, name in self.threads.items()
+            ]
+            events.extend(
+                {
+                    "name": name,
+                    "cat": "music",
+                    "ph": "X",
+                    "ts": (start_ns - self.started_ns) / 1000,
+                    "dur": duration_ns / 1000,
+                    "pid": pid,
+                    "tid": tid,
+                }
+                for name, start_ns, duration_ns, tid in self.spans
+            )
+            events.append(
+                {
+                    "name": "counters",
+                    "ph": "C",
+                    "ts": (time.perf_counter_ns() - self.started_ns) / 1000,
+                    "pid": pid,
+                    "args": dict(self.counters),
+                }
+            )
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: Path | None = None, format: str | None = None) -> None:
+        path = path or self.path
+        if path is None:
+            return
+
+        if (format or self.format) == CHROME_FORMAT:
+            report = self.to_chrome_trace()
+        else:
+            report = self.to_dict()
+
+        Path(path).write_text(json.dumps(report, indent=2))
+
+
+profiler = Profiler()
+
+
+def timed(name: str | None = None) -> Callable[[F], F]:
+    """Decorate function to record span of every call, named by qualified name by default.
+
+    Generators record time spent inside of them only, not while consumer handles items.
+    """
+
+    def decorator(func: F) -> F:
+        span_name = name or func.__qualname__
+        code = getattr(func, "__code__", None)
+        flags = code.co_flags if code is not None else 0
+
+        if flags & CO_GENERATOR:
+
+            @functools.wraps(func)
+            def generator_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not profiler.enabled:
+                    return (yield from func(*args, **kwargs))
+
+                generator = func(*args, **kwargs)
+                start_ns = time.perf_counter_ns()
+                active_ns = 0
+                try:
+                    while True:
+                        step_ns = time.perf_counter_ns()
+                        try:
+                            item = next(generator)
+                        except StopIteration as stop:
+                            return stop.value
+                        finally:
+                            active_ns += time.perf_counter_ns() - step_ns
+                        yield item
+                finally:
+                    generator.close()
+                    profiler.add_span(span_name, start_ns, active_ns)
+
+            return generator_wrapper  # type: ignore[return-value]
+
+        if flags & CO_COROUTINE:
+
+            @functools.wraps(func)
+            async def coroutine_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with profiler.span(span_name):
+                    return await func(*args, **kwargs)
+
+            return coroutine_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+
+            with Span(profiler, span_name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def enable_from_env() -> None:
+    """Enable profiler if it's requested by environment, called when CLI or app starts."""
+    value = os.environ.get(PROFILE_ENV)
+    if value:
+        path = None if value == "1" else Path(value)
+        profiler.enable(path, os.environ.get(PROFILE_FORMAT_ENV, JSON_FORMAT))
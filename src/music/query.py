@@ -0,0 +1,264 @@
+import re
+import shlex
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    Iterable,
+    Union,
+)
+
+from .directories import MusicDir
+from .schema import (
+    TagMatrix,
+    TagSchema,
+    iter_bits,
+)
+from .tags import MusicDirTags
+
+# Pseudo tag for tags in music dir name, e.g. `name:riff`
+NAME_TAG = "name"
+
+OPERATORS = {"AND", "OR", "NOT"}
+
+
+class QueryError(ValueError):
+    """Query can't be parsed."""
+
+
+@dataclass(frozen=True)
+class Term:
+    tag: str
+    value: str
+
+
+@dataclass(frozen=True)
+class Not:
+    operand: "Node"
+
+
+@dataclass(frozen=True)
+class And:
+    operands: tuple["Node", ...]
+
+
+@dataclass(frozen=True)
+class Or:
+    operands: tuple["Node", ...]
+
+
+Node = Union[Term, Not, And, Or]
+
+
+def tokenize(expression: str) -> list[str]:
+    """Split query into terms, operators and parentheses.
+
+    Values with spaces must be quoted: `sounds_like="Machine Head"`.
+    """
+    lexer = shlex.shlex(re.sub(r"([()])", r" \1 ", expression), posix=True)
+    lexer.whitespace_split = True
+    lexer.commenters = ""
+
+    try:
+        return list(lexer)
+    except ValueError as e:
+        raise QueryError(str(e)) from e
+
+
+def parse(expression: str) -> Node:
+    """Parse query like `type=heavy AND (mood=epic OR NOT name:riff)`.
+
+    Adjacent terms without operator are joined with AND.
+    """
+    tokens = tokenize(expression)
+    if not tokens:
+        raise QueryError("Query is empty")
+
+    parser = Parser(tokens)
+    node = parser.parse_or()
+    if parser.peek() is not None:
+        raise QueryError(f"Unexpected {parser.peek()!r}")
+
+    return node
+
+
+class Parser:
+    """Recursive descent parser of tag queries."""
+
+    def __init__(self, tokens: list[str]):
+        """Initialize class instance."""
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self) -> str | None:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def next(self) -> str:
+        token = self.peek()
+        if token is None:
+            raise QueryError("Unexpected end of query")
+
+        self.position += 1
+        return token
+
+    def parse_or(self) -> Node:
+        operands = [self.parse_and()]
+        while (self.peek() or "").upper() == "OR":
+            self.next()
+            operands.append(self.parse_and())
+
+        return operands[0] if len(operands) == 1 else Or(tuple(operands))
+
+    def parse_and(self) -> Node:
+        operands = [self.parse_not()]
+        while (token := self.peek()) is not None and token != ")" and token.upper() != "OR":
+            if token.upper() == "AND":
+                self.next()
+            operands.append(self.parse_not())
+
+        return operands[0] if len(operands) == 1 else And(tuple(operands))
+
+    def parse_not(self) -> Node:
+        if (self.peek() or "").upper() == "NOT":
+            self.next()
+            return Not(self.parse_not())
+
+        return self.parse_atom()
+
+    def parse_atom(self) -> Node:
+        token = self.next()
+
+        if token == "(":
+            node = self.parse_or()
+            if self.next() != ")":
+                raise QueryError("Expected ')'")
+            return node
+
+        if token.upper() in OPERATORS or token == ")":
+            raise QueryError(f"Unexpected {token!r}")
+
+        for separator in ("=", ":"):
+            if separator in token:
+                tag, value = token.split(separator, maxsplit=1)
+                if tag and value:
+                    return Term(tag=tag.lower(), value=value.lower())
+
+        raise QueryError(f"Expected tag=value or {NAME_TAG}:value, got {token!r}")
+
+
+class TagIndex:
+    """Inverted index from tag values to music directories.
+
+    Every tag value keeps a bitset of directory ids as Python int, so queries are evaluated
+    with bitwise operations instead of reading tag files. Postings of schema values are
+    indexed by bit of value, and encoded tags of every directory are kept in a matrix, so
+    re-indexing directory clears only postings of its own values.
+    """
+
+    def __init__(self, schema: TagSchema):
+        """Initialize class instance."""
+        self.schema = schema
+        self.music_dirs: list[MusicDir] = []
+        self.ids: dict[Path, int] = {}
+        self.matrix = TagMatrix(schema)
+        self.value_postings = [0] * len(schema)
+        # Tags in names of music directories aren't in schema
+        self.postings: dict[tuple[str, str], int] = {}
+        # Ids of removed directories are not reused, they are excluded from every result
+        self.removed = 0
+
+    def __len__(self) -> int:
+        return len(self.music_dirs)
+
+    @classmethod
+    def build(
+        cls,
+        items: Iterable[tuple[MusicDir, MusicDirTags | None]],
+        schema: TagSchema,
+    ) -> "TagIndex":
+        """Index music directories with their tags, None for untagged directories."""
+        index = cls(schema)
+        for mdir, tags in items:
+            index.add(mdir, tags)
+        return index
+
+    @property
+    def universe(self) -> int:
+        return ((1 << len(self.music_dirs)) - 1) & ~self.removed
+
+    def add(self, mdir: MusicDir, tags: MusicDirTags | None) -> None:
+        dir_id = len(self.music_dirs)
+        self.music_dirs.append(mdir)
+        self.ids[mdir.path] = dir_id
+        self.index(dir_id, mdir, tags)
+
+    def update(self, mdir: MusicDir, tags: MusicDirTags | None) -> None:
+        """Re-index music directory after it or its tags were changed."""
+        dir_id = self.ids.get(mdir.path)
+        if dir_id is None:
+            self.add(mdir, tags)
+            return
+
+        self.clear(dir_id)
+        self.music_dirs[dir_id] = mdir
+        self.index(dir_id, mdir, tags)
+
+    def remove(self, path: Path) -> None:
+        dir_id = self.ids.pop(path, None)
+        if dir_id is not None:
+            self.clear(dir_id)
+            self.matrix.remove(path)
+            self.removed |= 1 << dir_id
+
+    def clear(self, dir_id: int) -> None:
+        """Drop directory from postings of its name tags and tag values."""
+        mask = ~(1 << dir_id)
+        mdir = self.music_dirs[dir_id]
+        for name_tag in mdir.name_tags:
+            self.postings[(NAME_TAG, name_tag)] &= mask
+
+        for position in iter_bits(self.matrix.get(mdir.path)):
+            self.value_postings[position] &= mask
+
+    def index(self, dir_id: int, mdir: MusicDir, tags: MusicDirTags | None) -> None:
+        bit = 1 << dir_id
+        for name_tag in mdir.name_tags:
+            key = (NAME_TAG, name_tag)
+            self.postings[key] = self.postings.get(key, 0) | bit
+
+        # Values that aren't in tag options can't be selected in app, so they aren't indexed
+        bits = self.schema.encode(tags, strict=False) if tags else 0
+        self.matrix.set(mdir.path, bits)
+        for position in iter_bits(bits):
+            self.value_postings[position] |= bit
+
+    def evaluate(self, node: Node) -> int:
+        """Bitset of directory ids matching query node."""
+        if isinstance(node, Term):
+            if node.tag == NAME_TAG:
+                return self.postings.get((node.tag, node.value), 0)
+            if node.tag not in self.schema.masks:
+                raise QueryError(f"Unknown tag {node.tag!r}")
+
+            position = self.schema.bit(node.tag, node.value)
+            return self.value_postings[position] if position is not None else 0
+
+        if isinstance(node, Not):
+            return self.universe & ~self.evaluate(node.operand)
+
+        if isinstance(node, And):
+            result = self.universe
+            for operand in node.operands:
+                result &= self.evaluate(operand)
+            return result
+
+        result = 0
+        for operand in node.operands:
+            result |= self.evaluate(operand)
+        return result
+
+    def query(self, expression: str) -> list[MusicDir]:
+        """Music directories matching query, in the order they were indexed."""
+        bits = self.evaluate(parse(expression))
+        return [self.music_dirs[i] for i in iter_bits(bits)]
@@ -0,0 +1,218 @@
+"""Tag values compiled into bit positions, so tags of music directory are a bitmask.
+
+Every value of every tag in `tag_options` gets its own bit, in the order of options. Tags
+of music directory are encoded as an int with bits of selected values, which is stored as
+a fixed number of 64-bit words. So membership check is a single `&`, and tags of the whole
+library fit in one array instead of a dict of strings and lists per directory.
+"""
+
+import sys
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import (
+    Iterable,
+    Iterator,
+)
+
+from .tags import (
+    TAG_FILE,
+    MusicDirTags,
+    Tag,
+    TagOptions,
+    TagValue,
+)
+
+WORD_BITS = 64
+WORD_MASK = (1 << WORD_BITS) - 1
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """Positions of set bits in ascending order."""
+    # Binary string is scanned once, bit tricks on big ints would be quadratic
+    digits = bin(bits)[:1:-1]
+    position = digits.find("1")
+    while position != -1:
+        yield position
+        position = digits.find("1", position + 1)
+
+
+class TagSchema:
+    """Bit positions of tag values compiled from tag options.
+
+    Tag names and values are matched case-insensitively, like in tag queries.
+    """
+
+    def __init__(self, tag_options: TagOptions):
+        """Initialize class instance."""
+        self.tag_options = tag_options
+        # Pairs of (tag, value) by bit position
+        self.values: list[tuple[Tag, str]] = []
+        self.positions: dict[tuple[str, str], int] = {}
+        # Bits of all values of tag by lowercase tag name
+        self.masks: dict[str, int] = {}
+
+        for tag in tag_options.values():
+            mask = 0
+            for value in tag.values:
+                key = (tag.name.lower(), value.lower())
+                if key in self.positions:
+                    continue
+
+                self.positions[key] = len(self.values)
+                mask |= 1 << len(self.values)
+                self.values.append((tag, value))
+
+            self.masks[tag.name.lower()] = mask
+
+        self.words = max(1, -(-len(self.values) // WORD_BITS))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def bit(self, tag_name: str, value: str) -> int | None:
+        """Position of tag value, None if it isn't in options."""
+        return self.positions.get((tag_name.lower(), value.lower()))
+
+    def mask(self, *values: tuple[str, str]) -> int:
+        """Bits of pairs of (tag name, value), values that aren't in options have no bits."""
+        bits = 0
+        for tag_name, value in values:
+            position = self.bit(tag_name, value)
+            if position is not None:
+                bits |= 1 << position
+        return bits
+
+    def contains(self, bits: int, tag_name: str, value: str) -> bool:
+        return bool(bits & self.mask((tag_name, value)))
+
+    def encode(self, tags: MusicDirTags, strict: bool = True) -> int:
+        """Bits of tag values, values that aren't in options are skipped unless strict."""
+        bits = 0
+        for tag, value in tags.tags.items():
+            for v in [value] if isinstance(value, str) else value:
+                if not v:
+                    continue
+
+                position = self.bit(tag.name, v)
+                if position is not None:
+                    bits |= 1 << position
+                elif strict:
+                    raise ValueError(f"Value {v!r} of tag {tag.name} not found")
+
+        return bits
+
+    def decode(self, bits: int, file_path: Path, description: str = "") -> MusicDirTags:
+        """Tags of bits, in the order of options, values of multiselect tags are lists."""
+        tags: dict[Tag, TagValue] = {}
+        for position in iter_bits(bits):
+            tag, value = self.values[position]
+            current = tags.get(tag)
+            if current is None:
+                tags[tag] = [value] if tag.multiselect else value
+            elif isinstance(current, list):
+                current.append(value)
+            else:
+                tags[tag] = [current, value]
+
+        return MusicDirTags(path=file_path, tags=tags, description=description)
+
+    def from_text(self, text: str) -> tuple[int, str]:
+        """Bits and description of tag file text."""
+        tags = MusicDirTags.from_text(Path(TAG_FILE), text, self.tag_options)
+        return self.encode(tags), tags.description
+
+    def to_text(self, bits: int, description: str = "") -> str:
+        return self.decode(bits, Path(TAG_FILE), description).to_text()
+
+    def to_words(self, bits: int) -> list[int]:
+        """Fixed number of words of bits, the lowest word first."""
+        return [bits >> (i * WORD_BITS) & WORD_MASK for i in range(self.words)]
+
+    def from_words(self, words: Iterable[int]) -> int:
+        bits = 0
+        for i, word in enumerate(words):
+            bits |= word << (i * WORD_BITS)
+        return bits
+
+
+class TagMatrix:
+    """Encoded tags of many music directories, one row of schema words per directory.
+
+    Rows of removed directories are cleared and not reused, until matrix is rebuilt.
+    """
+
+    def __init__(self, schema: TagSchema):
+        """Initialize class instance."""
+        self.schema = schema
+        self.rows = array("Q")
+        self.ids: dict[Path, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def set(self, path: Path, bits: int) -> None:
+        words = self.schema.to_words(bits)
+        row_id = self.ids.get(path)
+        if row_id is None:
+            self.ids[path] = len(self.rows) // self.schema.words
+            self.rows.extend(words)
+        else:
+            start = row_id * self.schema.words
+            self.rows[start : start + self.schema.words] = array("Q", words)
+
+    def get(self, path: Path) -> int:
+        """Bits of music directory, 0 if it isn't in matrix."""
+        row_id = self.ids.get(path)
+        if row_id is None:
+            return 0
+        if self.schema.words == 1:
+            return self.rows[row_id]
+
+        start = row_id * self.schema.words
+        return self.schema.from_words(self.rows[start : start + self.schema.words])
+
+    def remove(self, path: Path) -> None:
+        row_id = self.ids.pop(path, None)
+        if row_id is not None:
+            start = row_id * self.schema.words
+            self.rows[start : start + self.schema.words] = array("Q", bytes(8 * self.schema.words))
+
+    def is_selected(self, path: Path, tag_name: str, value: str) -> bool:
+        return self.schema.contains(self.get(path), tag_name, value)
+
+    def iter_rows(self) -> Iterator[int]:
+        """Bits of every row id, removed rows are 0."""
+        if self.schema.words == 1:
+            return iter(self.rows)
+
+        # Lower words go first, so little-endian bytes of row are bytes of its bits
+        rows = self.rows
+        if sys.byteorder != "little":
+            rows = array("Q", rows)
+            rows.byteswap()
+
+        data = rows.tobytes()
+        size = 8 * self.schema.words
+        return (int.from_bytes(data[i : i + size], "little") for i in range(0, len(data), size))
+
+    def select(self, required: int = 0, excluded: int = 0) -> list[Path]:
+        """Music directories with all required bits and none of excluded ones."""
+        paths = {row_id: path for path, row_id in self.ids.items()}
+        return [
+            paths[row_id]
+            for row_id, bits in enumerate(self.iter_rows())
+            if bits & required == required and not bits & excluded and row_id in paths
+        ]
+
+    def count(self) -> dict[str, Counter[str]]:
+        """Number of music directories with every tag value, by tag name."""
+        # Directories often have the same tags, so every distinct row is expanded once
+        rows = Counter(self.iter_rows())
+        result: dict[str, Counter[str]] = {}
+        for bits, count in rows.items():
+            for position in iter_bits(bits):
+                tag, value = self.schema.values[position]
+                result.setdefault(tag.name, Counter())[value] += count
+
+        return result
@@ -0,0 +1,296 @@
+"""Type-ahead search over names, name tags and paths of music directories.
+
+Searched text of every directory is split into trigrams and the index maps each trigram to
+ids of texts that contain it. Query term is looked up by its rarest trigrams and only those
+candidates are checked for the term itself, so a keystroke never scans all names. While
+query is typed, it extends the previous one, so only previous matches are checked.
+
+Queries without exact matches fall back to fuzzy matching by share of common trigrams,
+which tolerates typos, e.g. `ligth riff` finds `light riff`.
+
+Index can be filled on a worker thread while it's searched or changed on UI thread, so
+it's guarded by a lock.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable
+
+TRIGRAM_SIZE = 3
+# Postings of this many rarest trigrams of query are intersected to find candidates
+LOOKUP_TRIGRAMS = 2
+# Share of query trigrams that fuzzy match must have
+FUZZY_THRESHOLD = 0.4
+FUZZY_LIMIT = 200
+# Removed texts are dropped from index once there are more of them than this share of
+# live texts, but not before there are at least this many of them
+COMPACT_RATIO = 0.25
+COMPACT_MIN_REMOVED = 1000
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def get_trigrams(text: str) -> set[str]:
+    return {text[i : i + TRIGRAM_SIZE] for i in range(len(text) - TRIGRAM_SIZE + 1)}
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    """Keys of matches, the best ones first."""
+
+    query: str
+    keys: list[str]
+    # Ids of exact matches, the next query that extends this one is checked only on them
+    ids: list[int]
+    fuzzy: bool
+    # Version of index when search was done, results of older versions aren't narrowed
+    version: int
+
+
+class SearchIndex:
+    """Trigram index of searched texts, keyed like rows of library table."""
+
+    def __init__(self) -> None:
+        """Initialize class instance."""
+        self.keys: list[str] = []
+        self.positions: dict[str, int] = {}
+        self.names: list[str] = []
+        self.texts: list[str] = []
+        self.postings: dict[str, array] = {}
+        self.removed: set[int] = set()
+        self.version = 0
+        self.lock = threading.RLock()
+        # Built on search after index changed: ids in order of (name length, name), position
+        # of every id in that order and pairs of (name, id) sorted by name for prefix search
+        self.by_order: list[int] = []
+        self.order: array | None = None
+        self.sorted_names: list[tuple[str, int]] = []
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def add(self, key: str, name: str, tags: Iterable[str], path: str) -> None:
+        """Index text of music directory, text of existing key is replaced."""
+        with self.lock:
+            self.add_text(key, name, tags, path)
+
+    def add_text(self, key: str, name: str, tags: Iterable[str], path: str) -> None:
+        self.remove(key)
+
+        doc = len(self.keys)
+        self.keys.append(key)
+        self.positions[key] = doc
+        self.names.append(normalize(name))
+        text = normalize(" ".join([name, *tags, path]))
+        self.texts.append(text)
+
+        for trigram in get_trigrams(text):
+            posting = self.postings.get(trigram)
+            if posting is None:
+                posting = self.postings[trigram] = array("I")
+            posting.append(doc)
+
+        self.version += 1
+        self.order = None
+
+    def remove(self, key: str) -> None:
+        # Ids aren't reused, postings of removed texts stay until index is compacted
+        with self.lock:
+            doc = self.positions.pop(key, None)
+            if doc is None:
+                return
+
+            self.removed.add(doc)
+            self.version += 1
+            self.order = None
+            if len(self.removed) > max(COMPACT_MIN_REMOVED, len(self.positions) * COMPACT_RATIO):
+                self.compact()
+
+    def compact(self) -> None:
+        """Drop removed texts and their postings, live texts get new consecutive ids."""
+        live = sorted(self.positions.values())
+        new_ids = array("I", bytes(4 * len(self.keys)))
+        for new_id, doc in enumerate(live):
+            new_ids[doc] = new_id
+
+        self.keys = [self.keys[doc] for doc in live]
+        self.names = [self.names[doc] for doc in live]
+        self.texts = [self.texts[doc] for doc in live]
+        self.positions = {key: new_id for new_id, key in enumerate(self.keys)}
+
+        removed = self.removed
+        postings = {}
+        for trigram, posting in self.postings.items():
+            # Ids are renumbered in the same order, so postings stay sorted
+            kept = array("I", [new_ids[doc] for doc in posting if doc not in removed])
+            if kept:
+                postings[trigram] = kept
+
+        self.postings = postings
+        self.removed = set()
+        # Ids of previous results are invalid now
+        self.version += 1
+        self.order = None
+
+    def search(self, query: str, previous: SearchResult | None = None) -> SearchResult:
+        """Find texts that contain all terms of query, ranked by where they match.
+
+        Query shorter than trigram matches only names that start with it, like type-select
+        in file managers, because almost every text contains it.
+        """
+        with self.lock:
+            return self.search_locked(normalize(query), previous)
+
+    def search_locked(self, query: str, previous: SearchResult | None) -> SearchResult:
+        terms = query.split()
+        order = self.get_order()
+
+        if len(query) < TRIGRAM_SIZE:
+            ids = self.prefix_search(query)
+            ids.sort(key=order.__getitem__)
+            return self.get_result(query, ids, ids, fuzzy=False)
+
+        if (
+            previous is not None
+            and not previous.fuzzy
+            and previous.version == self.version
+            and len(previous.query) >= TRIGRAM_SIZE
+            and query.startswith(previous.query)
+        ):
+            # Every term of longer query contains a term of previous one or is a new term,
+            # so it can only narrow previous matches
+            candidates: Iterable[int] = previous.ids
+        else:
+            candidates = self.lookup(terms)
+
+        # Filtering by one term at a time is faster than checking all terms of every text
+        texts = self.texts
+        ids = list(candidates)
+        for term in terms:
+            ids = [doc for doc in ids if term in texts[doc]]
+        if self.removed:
+            ids = [doc for doc in ids if doc not in self.removed]
+
+        if ids:
+            return self.get_result(query, self.rank(ids, terms), ids, fuzzy=False)
+
+        return self.get_result(query, self.fuzzy_search(query), [], fuzzy=True)
+
+    def get_result(
+        self, query: str, ranked: list[int], ids: list[int], fuzzy: bool
+    ) -> SearchResult:
+        return SearchResult(
+            query=query,
+            keys=[self.keys[doc] for doc in ranked],
+            ids=ids,
+            fuzzy=fuzzy,
+            version=self.version,
+        )
+
+    def prepare(self) -> None:
+        """Build order of names ahead of the first search, e.g. on a worker thread."""
+        with self.lock:
+            self.get_order()
+
+    def get_order(self) -> array:
+        """Position of every id in order of name length, built after index changed."""
+        if self.order is None:
+            names = self.names
+            self.by_order = sorted(
+                self.positions.values(), key=lambda doc: (len(names[doc]), names[doc])
+            )
+            self.order = array("I", bytes(4 * len(self.keys)))
+            for position, doc in enumerate(self.by_order):
+                self.order[doc] = position
+            self.sorted_names = sorted((names[doc], doc) for doc in self.by_order)
+
+        return self.order
+
+    def prefix_search(self, prefix: str) -> list[int]:
+        start = bisect_left(self.sorted_names, (prefix,))
+        ids = []
+        for name, doc in self.sorted_names[start:]:
+            if not name.startswith(prefix):
+                break
+            ids.append(doc)
+        return ids
+
+    def lookup(self, terms: list[str]) -> Iterable[int]:
+        """Candidate ids that have the rarest trigrams of terms."""
+        postings = []
+        for term in terms:
+            for trigram in get_trigrams(term):
+                posting = self.postings.get(trigram)
+                if posting is None:
+                    return []
+                postings.append(posting)
+
+        # Terms are shorter than trigram, so all texts are candidates
+        if not postings:
+            return range(len(self.keys))
+
+        postings.sort(key=len)
+        candidates: Iterable[int] = postings[0]
+        # Common trigrams barely narrow candidates, checking terms is cheaper than intersection
+        if len(postings[0]) * 2 > len(self.keys):
+            return candidates
+
+        for posting in postings[1:LOOKUP_TRIGRAMS]:
+            members = set(posting)
+            candidates = [doc for doc in candidates if doc in members]
+
+        return candidates
+
+    def rank(self, ids: list[int], terms: list[str]) -> list[int]:
+        """Names that start with query first, then names that contain it, then the rest.
+
+        Matches of the same rank are ordered by length of name, shorter is closer to query.
+        """
+        order = self.get_order()
+        if len(ids) * 8 > len(self.by_order):
+            # Most texts match, so the order is filtered instead of sorting matches
+            members = set(ids)
+            docs = [doc for doc in self.by_order if doc in members]
+        else:
+            docs = sorted(ids, key=order.__getitem__)
+
+        names = self.names
+        in_name = docs
+        for term in terms:
+            in_name = [doc for doc in in_name if term in names[doc]]
+
+        if len(in_name) == len(docs):
+            rest = []
+        else:
+            matched = set(in_name)
+            rest = [doc for doc in docs if doc not in matched]
+
+        first = terms[0]
+        prefix = [doc for doc in in_name if names[doc].startswith(first)]
+        if len(prefix) == len(in_name):
+            return prefix + rest
+
+        starts = set(prefix)
+        return prefix + [doc for doc in in_name if doc not in starts] + rest
+
+    def fuzzy_search(self, query: str) -> list[int]:
+        """Ids of texts with the most trigrams of query."""
+        trigrams = get_trigrams(query)
+        counts: Counter[int] = Counter()
+        for trigram in trigrams:
+            counts.update(self.postings.get(trigram, ()))
+
+        needed = len(trigrams) * FUZZY_THRESHOLD
+        order = self.get_order()
+        matches = [
+            (count, doc)
+            for doc, count in counts.items()
+            if count >= needed and doc not in self.removed
+        ]
+        matches.sort(key=lambda match: (-match[0], order[match[1]]))
+        return [doc for _, doc in matches[:FUZZY_LIMIT]]
@@ -0,0 +1,153 @@
+from collections import Counter
+from dataclasses import (
+    dataclass,
+    field,
+)
+from pathlib import Path
+from typing import Iterable
+
+from .directories import (
+    MusicDir,
+    MusicDirSummary,
+)
+from .files import MusicFileType
+from .tags import MusicDirTags
+
+
+def format_size(size: float) -> str:
+    """Human readable size, e.g. `1.5 GB`."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size:.0f} {unit}"
+        size /= 1024
+
+    return f"{size:.1f} TB"
+
+
+@dataclass
+class RootStats:
+    """Statistics of single root dir."""
+
+    dirs: int = 0
+    tagged: int = 0
+    files: int = 0
+    size: int = 0
+
+
+@dataclass
+class DirStats:
+    """Contribution of single music directory to library statistics."""
+
+    root: str
+    summary: MusicDirSummary
+    # Pairs of (tag name, value), None if directory isn't tagged
+    tag_values: list[tuple[str, str]] | None
+
+
+@dataclass
+class LibraryStats:
+    """Library statistics collected in one pass over music directories.
+
+    Contribution of every directory is kept (without its files), so statistics can be
+    updated when a directory changes or a tag file is saved instead of collecting them again.
+    """
+
+    dirs: int = 0
+    tagged: int = 0
+    size: int = 0
+    file_types: Counter[MusicFileType] = field(default_factory=Counter)
+    tag_values: dict[str, Counter[str]] = field(default_factory=dict)
+    roots: dict[str, RootStats] = field(default_factory=dict)
+    entries: dict[Path, DirStats] = field(default_factory=dict, repr=False)
+
+    @property
+    def untagged(self) -> int:
+        return self.dirs - self.tagged
+
+    @property
+    def files(self) -> int:
+        return sum(self.file_types.values())
+
+    @property
+    def average_tags(self) -> float:
+        """Average number of tag values per tagged directory."""
+        if not self.tagged:
+            return 0.0
+
+        return sum(sum(c.values()) for c in self.tag_values.values()) / self.tagged
+
+    @classmethod
+    def collect(cls, items: Iterable[tuple[MusicDir, MusicDirTags | None]]) -> "LibraryStats":
+        """Statistics of music directories with their tags, None for untagged directories."""
+        stats = cls()
+        for mdir, tags in items:
+            stats.add(mdir, tags)
+        return stats
+
+    def add(self, mdir: MusicDir, tags: MusicDirTags | None) -> None:
+        self.remove(mdir.path)
+
+        entry = DirStats(
+            root=mdir.root_dir.name,
+            summary=mdir.summary,
+            tag_values=get_tag_values(tags) if tags else None,
+        )
+        self.entries[mdir.path] = entry
+        self.count(entry, 1)
+
+    def remove(self, path: Path) -> None:
+        entry = self.entries.pop(path, None)
+        if entry:
+            self.count(entry, -1)
+
+    def retag(self, mdir: MusicDir, tags: MusicDirTags) -> None:
+        """Update statistics after tags of music directory were saved."""
+        entry = self.entries.get(mdir.path)
+        if entry is None:
+            self.add(mdir, tags)
+            return
+
+        self.count(entry, -1)
+        entry.tag_values = get_tag_values(tags)
+        self.count(entry, 1)
+
+    def count(self, entry: DirStats, sign: int) -> None:
+        """Add (sign is 1) or subtract (sign is -1) directory from statistics."""
+        summary = entry.summary
+        files = sum(summary.counts.values())
+        root = self.roots.setdefault(entry.root, RootStats())
+
+        self.dirs += sign
+        self.size += sign * summary.size
+        root.dirs += sign
+        root.size += sign * summary.size
+        root.files += sign * files
+
+        for file_type, count in summary.counts.items():
+            self.file_types[file_type] += sign * count
+
+        if entry.tag_values is not None:
+            self.tagged += sign
+            root.tagged += sign
+
+            for name, value in entry.tag_values:
+                self.tag_values.setdefault(name, Counter())[value] += sign
+
+    def most_common_tag(self) -> tuple[str, str, int] | None:
+        """Most used tag value as (tag name, value, count)."""
+        result = None
+        for name, counter in self.tag_values.items():
+            for value, count in counter.most_common(1):
+                if count and (result is None or count > result[2]):
+                    result = (name, value, count)
+
+        return result
+
+
+def get_tag_values(tags: MusicDirTags) -> list[tuple[str, str]]:
+    result = []
+    for tag, value in tags.tags.items():
+        for v in [value] if isinstance(value, str) else value:
+            if v:
+                result.append((tag.name, v))
+    return result
@@ -0,0 +1,315 @@
+import json
+import os
+import threading
+import time
+from abc import (
+    ABC,
+    abstractmethod,
+)
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    IO,
+    Iterable,
+)
+
+from .files import atomic_write
+from .tags import (
+    TAG_FILE,
+    MusicDirTags,
+    TagOptions,
+    tag_cache,
+)
+
+TEXT_STORAGE = "text"
+JSON_LINES_STORAGE = "jsonl"
+JSON_LINES_FILE = "tags.jsonl"
+
+# Log is compacted when it has this many times more lines than music directories...
+COMPACT_RATIO = 2
+# ...but small logs are left as is
+COMPACT_MIN_LINES = 1000
+# Log is checked for changes made by other machines at most this often while reading,
+# so reading tags of the whole library doesn't stat log for every directory
+RELOAD_CHECK_INTERVAL = 1.0
+
+
+class TagStorage(ABC):
+    """Base class of places where tags of music directories are kept.
+
+    Storages are keyed by music directory path, `MusicDirTags.path` stays the path of
+    tag file inside music directory in all of them, so tags can be moved between storages.
+    """
+
+    name: str
+
+    @abstractmethod
+    def read(self, music_dir_path: Path) -> MusicDirTags | None:
+        """Tags of music directory or None if it isn't tagged."""
+
+    def read_once(self, music_dir_path: Path) -> MusicDirTags | None:
+        """Tags of music directory that aren't cached, e.g. when whole library is exported."""
+        return self.read(music_dir_path)
+
+    @abstractmethod
+    def write(self, tags: MusicDirTags) -> None:
+        """Save tags of music directory."""
+
+    @abstractmethod
+    def mtime_ns(self, music_dir_path: Path) -> int | None:
+        """Time when tags were written last, None if music directory isn't tagged."""
+
+    def remember(self, tags: MusicDirTags, mtime_ns: int) -> None:
+        """Keep tags read elsewhere, e.g. from library index, if storage caches them."""
+
+    def close(self) -> None:
+        pass
+
+
+class TextFileStorage(TagStorage):
+    """Tags in `music_tag.txt` file inside every music directory."""
+
+    name = TEXT_STORAGE
+
+    def __init__(self, tag_options: TagOptions):
+        """Initialize class instance."""
+        self.tag_options = tag_options
+
+    def read(self, music_dir_path: Path) -> MusicDirTags | None:
+        try:
+            return tag_cache.get(music_dir_path / TAG_FILE, self.tag_options)
+        except FileNotFoundError:
+            return None
+
+    def read_once(self, music_dir_path: Path) -> MusicDirTags | None:
+        try:
+            return MusicDirTags.from_file(music_dir_path / TAG_FILE, self.tag_options)
+        except FileNotFoundError:
+            return None
+
+    def write(self, tags: MusicDirTags) -> None:
+        tags.to_file()
+
+    def mtime_ns(self, music_dir_path: Path) -> int | None:
+        try:
+            return os.stat(music_dir_path / TAG_FILE).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def remember(self, tags: MusicDirTags, mtime_ns: int) -> None:
+        tag_cache.put(tags, mtime_ns)
+
+
+class JsonLinesStorage(TagStorage):
+    """Tags of all music directories in one append-only JSON lines file.
+
+    Whole file is read sequentially once, so reading tags of the library doesn't open
+    a file per directory. Every save appends a line and the latest line of directory wins.
+    Log is rewritten with only the latest lines when it grows too much.
+    """
+
+    name = JSON_LINES_STORAGE
+
+    def __init__(self, path: Path, tag_options: TagOptions):
+        """Initialize class instance."""
+        self.path = path
+        self.tag_options = tag_options
+        self.records: dict[Path, dict] = {}
+        self.lines = 0
+        self.file: IO[str] | None = None
+        # (mtime, size) of log after it was read or written here, other changes come from
+        # another machine through sync client and log is read again
+        self.stat: tuple[int, int] | None = None
+        # Last line wasn't finished, e.g. app was killed while writing it
+        self.truncated = False
+        # Monotonic time when log was checked for changes last
+        self.checked = 0.0
+        self.lock = threading.Lock()
+
+        with self.lock:
+            self.load()
+            if self.lines > max(COMPACT_MIN_LINES, COMPACT_RATIO * len(self.records)):
+                self.rewrite()
+
+    def load(self) -> None:
+        self.records = {}
+        self.lines = 0
+        self.truncated = False
+
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    self.truncated = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Last line is truncated if writing it was interrupted
+                        continue
+
+                    self.records[Path(record["path"])] = record
+                    self.lines += 1
+        except FileNotFoundError:
+            pass
+
+        self.stat = self.get_stat()
+
+    def get_stat(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload_if_changed(self) -> None:
+        self.checked = time.monotonic()
+        if self.get_stat() != self.stat:
+            self.close_file()
+            self.load()
+
+    def reload_if_stale(self) -> None:
+        """Reload log if it changed, but check it at most once per interval, lock must be held."""
+        if time.monotonic() - self.checked > RELOAD_CHECK_INTERVAL:
+            self.reload_if_changed()
+
+    def read(self, music_dir_path: Path) -> MusicDirTags | None:
+        with self.lock:
+            self.reload_if_stale()
+            record = self.records.get(music_dir_path)
+
+        if record is None:
+            return None
+
+        return MusicDirTags.from_dict(music_dir_path / TAG_FILE, record, self.tag_options)
+
+    def write(self, tags: MusicDirTags) -> None:
+        record = {
+            "path": str(tags.path.parent),
+            "mtime_ns": time.time_ns(),
+            **tags.to_dict(),
+        }
+
+        with self.lock:
+            self.reload_if_changed()
+            if self.file is None:
+                self.file = open(self.path, "a")
+
+            # Line is flushed right away, but synced to disk only on close and compaction
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            self.file.write("\n" + line if self.truncated else line)
+            self.file.flush()
+            self.truncated = False
+
+            self.records[tags.path.parent] = record
+            self.lines += 1
+            self.stat = self.get_stat()
+
+    def mtime_ns(self, music_dir_path: Path) -> int | None:
+        with self.lock:
+            self.reload_if_stale()
+            record = self.records.get(music_dir_path)
+
+        return record["mtime_ns"] if record else None
+
+    def compact(self) -> None:
+        with self.lock:
+            self.reload_if_changed()
+            self.rewrite()
+
+    def rewrite(self) -> None:
+        """Rewrite log with the latest line of every music directory, lock must be held."""
+        self.close_file()
+        text = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in self.records.values())
+        atomic_write(self.path, text)
+
+        self.lines = len(self.records)
+        self.truncated = False
+        self.stat = self.get_stat()
+
+    def close_file(self) -> None:
+        if self.file:
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+
+    def close(self) -> None:
+        with self.lock:
+            self.close_file()
+
+
+def create_storage(name: str, tag_options: TagOptions, path: Path | None = None) -> TagStorage:
+    if name == TEXT_STORAGE:
+        return TextFileStorage(tag_options)
+
+    if name == JSON_LINES_STORAGE:
+        if path is None:
+            raise ValueError("Path of JSON lines tag storage is required")
+        return JsonLinesStorage(path, tag_options)
+
+    raise ValueError(f"Unknown tag storage {name!r}")
+
+
+@dataclass
+class SyncResult:
+    """Number of music directories whose tags were copied to each storage."""
+
+    to_first: int = 0
+    to_second: int = 0
+
+
+def same_tags(first: MusicDirTags, second: MusicDirTags) -> bool:
+    # Text format is compared, e.g. multiselect tag with one value is read from file as string
+    return first.to_text() == second.to_text()
+
+
+def copy_tags(source: TagStorage, target: TagStorage, music_dir_paths: Iterable[Path]) -> int:
+    """Copy tags of music directories one way, e.g. to import text files into JSON lines log.
+
+    Returns number of music directories whose tags were written to target.
+    """
+    copied = 0
+    for path in music_dir_paths:
+        tags = source.read(path)
+        if tags is None:
+            continue
+
+        current = target.read(path)
+        if current is None or not same_tags(tags, current):
+            target.write(tags)
+            copied += 1
+
+    return copied
+
+
+def sync_storages(
+    first: TagStorage,
+    second: TagStorage,
+    music_dir_paths: Iterable[Path],
+) -> SyncResult:
+    """Make tags of music directories the same in both storages, the latest written wins."""
+    result = SyncResult()
+
+    for path in music_dir_paths:
+        first_tags = first.read(path)
+        second_tags = second.read(path)
+
+        if first_tags is None and second_tags is None:
+            continue
+
+        if second_tags is None:
+            copy_to_second = True
+        elif first_tags is None:
+            copy_to_second = False
+        elif same_tags(first_tags, second_tags):
+            continue
+        else:
+            copy_to_second = (first.mtime_ns(path) or 0) > (second.mtime_ns(path) or 0)
+
+        if copy_to_second and first_tags:
+            second.write(first_tags)
+            result.to_second += 1
+        elif second_tags:
+            first.write(second_tags)
+            result.to_first += 1
+
+    return result
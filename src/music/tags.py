@@ -1,7 +1,14 @@
+import os
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Union
 
+from .files import atomic_write
+from .profiling import (
+    profiler,
+    timed,
+)
+
 # Tagging
 TAG_FILE = "music_tag.txt"
 TAG_FILE_DESCRIPTION_SEPARATOR = "--- Music Description ---"
@@ -36,8 +43,11 @@ class MusicDirTags:
     description: str
 
     def is_selected(self, tag: Tag, value: str) -> bool:
-        current_value = self.tags[tag]
-        if isinstance(current_value, str):
+        current_value = self.tags.get(tag)
+        if current_value is None:
+            # Tag isn't set, e.g. it's optional and nothing was selected
+            return False
+        elif isinstance(current_value, str):
             return value == current_value
         elif isinstance(current_value, list):
             return value in current_value
@@ -45,31 +55,43 @@ class MusicDirTags:
             raise TypeError(f"tag value has incompatible type: {type(current_value)}")
 
     @classmethod
+    @timed("MusicDirTags.from_file")
     def from_file(cls, file_path: Path, tag_options: TagOptions) -> "MusicDirTags":
+        with open(file_path, "r") as f:
+            text = f.read()
+
+        if profiler.enabled:
+            profiler.count("open")
+            profiler.count("bytes_read", len(text.encode()))
+
+        return cls.from_text(file_path, text, tag_options)
+
+    @classmethod
+    def from_text(cls, file_path: Path, text: str, tag_options: TagOptions) -> "MusicDirTags":
+        """Parse text of tag file, see `to_text`."""
         tags: dict[Tag, TagValue] = {}
         description = ""
 
-        with open(file_path, "r") as f:
-            description_started = False
-            for line in f.readlines():
-                line = line.strip()
+        description_started = False
+        for line in text.splitlines():
+            line = line.strip()
 
-                if line == TAG_FILE_DESCRIPTION_SEPARATOR:
-                    description_started = True
-                elif description_started:
-                    description += line
-                else:
-                    value_list = None
-                    key, value = line.split(TAG_FILE_KEY_VALUE_SEPARATOR)
+            if line == TAG_FILE_DESCRIPTION_SEPARATOR:
+                description_started = True
+            elif description_started:
+                description += line
+            else:
+                value_list = None
+                key, value = line.split(TAG_FILE_KEY_VALUE_SEPARATOR)
 
-                    if TAG_FILE_LIST_SEPARATOR in value:
-                        value_list = value.split(TAG_FILE_LIST_SEPARATOR)
+                if TAG_FILE_LIST_SEPARATOR in value:
+                    value_list = value.split(TAG_FILE_LIST_SEPARATOR)
 
-                    tag = tag_options.get(key)
-                    if not tag:
-                        raise ValueError(f"Tag with name {key} not found")
+                tag = tag_options.get(key)
+                if not tag:
+                    raise ValueError(f"Tag with name {key} not found")
 
-                    tags[tag] = value_list or value
+                tags[tag] = value_list or value
 
         return cls(
             path=file_path,
@@ -77,19 +99,87 @@ class MusicDirTags:
             description=description,
         )
 
+    @timed("MusicDirTags.to_file")
     def to_file(self) -> None:
-        with open(self.path, "w") as f:
-            for k, v in self.tags.items():
-                if isinstance(v, list):
-                    v = TAG_FILE_LIST_SEPARATOR.join(v)
-                f.write(f"{k}{TAG_FILE_KEY_VALUE_SEPARATOR}{v}\n")
+        text = self.to_text()
+        atomic_write(self.path, text)
+        if profiler.enabled:
+            profiler.count("bytes_written", len(text.encode()))
+
+        tag_cache.invalidate(self.path)
 
-            if self.description:
-                f.write(f"{TAG_FILE_DESCRIPTION_SEPARATOR}\n{self.description}\n")
+    def to_text(self) -> str:
+        lines = []
+        for k, v in self.tags.items():
+            if isinstance(v, list):
+                v = TAG_FILE_LIST_SEPARATOR.join(v)
+            lines.append(f"{k.name}{TAG_FILE_KEY_VALUE_SEPARATOR}{v}\n")
+
+        if self.description:
+            lines.append(f"{TAG_FILE_DESCRIPTION_SEPARATOR}\n{self.description}\n")
+
+        return "".join(lines)
+
+    def to_dict(self) -> dict:
+        return {
+            "tags": {tag.name: value for tag, value in self.tags.items()},
+            "description": self.description,
+        }
+
+    @classmethod
+    def from_dict(cls, file_path: Path, data: dict, tag_options: TagOptions) -> "MusicDirTags":
+        tags: dict[Tag, TagValue] = {}
+        for key, value in data["tags"].items():
+            tag = tag_options.get(key)
+            if not tag:
+                raise ValueError(f"Tag with name {key} not found")
+
+            tags[tag] = value
+
+        return cls(
+            path=file_path,
+            tags=tags,
+            description=data["description"],
+        )
 
     @classmethod
     def from_music_dir(cls, music_dir_path: Path, tag_options: TagOptions) -> "MusicDirTags":
-        return cls.from_file(
+        return tag_cache.get(
             file_path=music_dir_path / TAG_FILE,
             tag_options=tag_options,
         )
+
+
+class TagCache:
+    """Parsed tag files keyed by path and mtime.
+
+    Tag file is parsed again only if it was modified since previous read. Cached tags are
+    shared between callers, so they must not be changed without saving them with `to_file`.
+    """
+
+    def __init__(self) -> None:
+        """Initialize class instance."""
+        self.entries: dict[Path, tuple[int, MusicDirTags]] = {}
+
+    def get(self, file_path: Path, tag_options: TagOptions) -> MusicDirTags:
+        mtime_ns = os.stat(file_path).st_mtime_ns
+        if profiler.enabled:
+            profiler.count("stat")
+
+        cached = self.entries.get(file_path)
+        if cached and cached[0] == mtime_ns:
+            return cached[1]
+
+        tags = MusicDirTags.from_file(file_path, tag_options)
+        self.entries[file_path] = (mtime_ns, tags)
+        return tags
+
+    def put(self, tags: MusicDirTags, mtime_ns: int) -> None:
+        """Add tags that were parsed elsewhere, e.g. restored from library index."""
+        self.entries[tags.path] = (mtime_ns, tags)
+
+    def invalidate(self, file_path: Path) -> None:
+        self.entries.pop(file_path, None)
+
+
+tag_cache = TagCache()
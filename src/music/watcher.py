@@ -0,0 +1,305 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from abc import (
+    ABC,
+    abstractmethod,
+)
+from pathlib import Path
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+)
+
+from .files import LOGICX_EXT
+from .tags import TAG_FILE
+
+# Changed paths are reported after this long without new events, so a file written
+# in many chunks or a copied directory produces one notification
+DEBOUNCE_INTERVAL = 0.5
+# But changes are reported at least this often during long copying
+MAX_REPORT_DELAY = 2.0
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_ONLYDIR = 0x01000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+# Return values of callbacks are ignored
+Callback = Callable[[set[Path]], object]
+RescanCallback = Callable[[], object]
+ErrorCallback = Callable[[Exception], object]
+
+
+def iter_dirs(path: Path) -> Iterator[Path]:
+    """Directory and all its subdirectories, Logic X bundles are not entered."""
+    yield path
+    try:
+        with os.scandir(path) as it:
+            subdirs = [
+                Path(entry.path)
+                for entry in it
+                if entry.is_dir(follow_symlinks=False) and not entry.name.endswith(LOGICX_EXT)
+            ]
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return
+
+    for subdir in subdirs:
+        yield from iter_dirs(subdir)
+
+
+class Watcher(ABC):
+    """Base class of filesystem watchers.
+
+    Watcher runs in background thread and calls `callback` with set of changed paths.
+    If changes were lost, `on_rescan` is called instead, or `callback` with all paths.
+    Errors don't stop watcher, they are passed to `on_error`.
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[Path],
+        callback: Callback,
+        on_rescan: RescanCallback | None = None,
+        on_error: ErrorCallback | None = None,
+    ):
+        """Initialize class instance."""
+        self.paths = list(paths)
+        self.callback = callback
+        self.on_rescan = on_rescan
+        self.on_error = on_error
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="watcher", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    @abstractmethod
+    def run(self) -> None:
+        """Watch paths until stopped, runs in watcher thread."""
+
+    def rescan(self) -> None:
+        if self.on_rescan:
+            self.on_rescan()
+        else:
+            self.callback(set(self.paths))
+
+    def report(self, error: Exception) -> None:
+        if self.on_error:
+            self.on_error(error)
+
+
+class InotifyWatcher(Watcher):
+    """Linux watcher based on inotify, every directory of library gets its own watch."""
+
+    def __init__(
+        self,
+        paths: Iterable[Path],
+        callback: Callback,
+        on_rescan: RescanCallback | None = None,
+        on_error: ErrorCallback | None = None,
+    ):
+        """Initialize class instance."""
+        super().__init__(paths, callback, on_rescan, on_error)
+        self.overflowed = False
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.watches: dict[int, Path] = {}
+        try:
+            for path in self.paths:
+                self.add_watches(path)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def add_watches(self, path: Path) -> None:
+        for directory in iter_dirs(path):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error in (errno.ENOENT, errno.ENOTDIR):
+                    # Directory was removed while watches were added
+                    continue
+
+                # E.g. ENOSPC if fs.inotify.max_user_watches is exceeded
+                raise OSError(error, f"inotify_add_watch failed for {directory}")
+
+            self.watches[wd] = directory
+
+    def try_add_watches(self, path: Path) -> None:
+        try:
+            self.add_watches(path)
+        except OSError as e:
+            # E.g. no watches left, changes of other directories are still watched
+            self.report(e)
+
+    def run(self) -> None:
+        changed: set[Path] = set()
+        first_change = 0.0
+
+        try:
+            while not self.stopped.is_set():
+                try:
+                    ready, _, _ = select.select([self.fd], [], [], DEBOUNCE_INTERVAL)
+                    if ready:
+                        if not changed:
+                            first_change = time.monotonic()
+                        changed.update(self.read_events())
+
+                    if self.overflowed:
+                        # Queue of events overflowed, so changes are unknown
+                        self.overflowed = False
+                        changed = set()
+                        for path in self.paths:
+                            self.try_add_watches(path)
+                        self.rescan()
+                    elif changed and (
+                        not ready or time.monotonic() - first_change > MAX_REPORT_DELAY
+                    ):
+                        self.callback(changed)
+                        changed = set()
+                except Exception as e:
+                    # Watcher keeps running, changes of failed report are dropped
+                    changed = set()
+                    self.report(e)
+        finally:
+            os.close(self.fd)
+
+    def read_events(self) -> Iterator[Path]:
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                self.overflowed = True
+                continue
+
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+
+            if mask & IN_IGNORED:
+                del self.watches[wd]
+                continue
+
+            path = directory / os.fsdecode(name) if name else directory
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                if not path.name.endswith(LOGICX_EXT):
+                    self.try_add_watches(path)
+
+            yield path
+
+
+class PollingWatcher(Watcher):
+    """Portable watcher that compares mtimes of all directories every `interval` seconds.
+
+    Files are created and deleted through directories, so their mtimes are enough, except
+    for files modified in place. Those are detected by tag file mtimes.
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[Path],
+        callback: Callback,
+        on_rescan: RescanCallback | None = None,
+        on_error: ErrorCallback | None = None,
+        interval: float = 5.0,
+    ):
+        """Initialize class instance."""
+        super().__init__(paths, callback, on_rescan, on_error)
+        self.interval = interval
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self) -> dict[Path, int]:
+        snapshot = {}
+        for path in self.paths:
+            for directory in iter_dirs(path):
+                for item in (directory, directory / TAG_FILE):
+                    try:
+                        snapshot[item] = os.stat(item).st_mtime_ns
+                    except (FileNotFoundError, NotADirectoryError):
+                        pass
+
+        return snapshot
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            try:
+                snapshot = self.take_snapshot()
+                changed = {
+                    path
+                    for path in snapshot.keys() | self.snapshot.keys()
+                    if snapshot.get(path) != self.snapshot.get(path)
+                }
+                self.snapshot = snapshot
+
+                if changed:
+                    self.callback(changed)
+            except Exception as e:
+                # Watcher keeps running, changes of failed report are dropped
+                self.report(e)
+
+
+def create_watcher(
+    paths: Iterable[Path],
+    callback: Callback,
+    on_rescan: RescanCallback | None = None,
+    on_error: ErrorCallback | None = None,
+    interval: float = 5.0,
+) -> Watcher:
+    """Use inotify on Linux and fall back to polling if it's not available.
+
+    Every directory is walked here, so it should be called in background for large library.
+    """
+    paths = list(paths)
+
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(paths, callback, on_rescan, on_error)
+        except (OSError, AttributeError):
+            pass
+
+    return PollingWatcher(paths, callback, on_rescan, on_error, interval)